@@ -1,10 +1,14 @@
-from fastapi import APIRouter, HTTPException, Response
-from controllers.story_controller import generate_fairy_tale, generate_image_from_fairy_tale, generate_openai_voice, save_story_to_db, get_user_images
-from controllers.music_controller import search_tracks_by_tag
-from controllers.video_controller import search_videos
-from scheme_files.stories_schemes import StoryRequest, TTSRequest, ImageRequest, MusicRequest, VideoRequest, SaveStoryRequest
+from fastapi import APIRouter, HTTPException, Request, Response, Depends, Query
+from sqlalchemy.orm import Session
+from controllers.story_controller import generate_fairy_tale, generate_image_from_fairy_tale, generate_openai_voice, save_story_to_db, get_user_images, get_user_story_page, search_user_stories
+from controllers.dependencies import get_db
+from controllers.user_stats import get_user_stats, get_user_version
+from controllers.etag import make_etag, etag_matches, not_modified, set_etag
+from controllers.media_catalog import media_catalog, MUSIC, VIDEO
+from scheme_files.stories_schemes import StoryRequest, TTSRequest, ImageRequest, MusicRequest, VideoRequest, SaveStoryRequest, StoryPageResponse, UserStatsResponse, StorySearchResponse
 from scheme_files.users_schemes import UserIdRequest
 from datetime import datetime
+from typing import Optional
 import base64
 
 
@@ -86,14 +90,63 @@ def get_bw_images(req: UserIdRequest):
     images = get_user_images(req.user_id)
     return {"images": images}
 
+# 동화 목록 라우터 (created_at, id 키셋 페이지네이션)
+@router.get("/gallery/stories", response_model=StoryPageResponse)
+def list_stories(
+    request: Request,
+    response: Response,
+    user_id: int,
+    limit: int = Query(9, ge=1, le=50),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    # 사용자 데이터 버전이 같으면 목록 조회 없이 304
+    etag = make_etag(user_id, get_user_version(db, user_id), "stories", limit, cursor)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    try:
+        stories, next_cursor = get_user_story_page(db, user_id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"stories": stories, "next_cursor": next_cursor}
+
+# 동화 검색 라우터 (본문/테마 전문 검색, 관련도 순)
+@router.get("/stories/search", response_model=StorySearchResponse)
+def search_stories(
+    request: Request,
+    response: Response,
+    user_id: int,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(9, ge=1, le=50),
+    offset: int = Query(0, ge=0, le=1000),
+    db: Session = Depends(get_db),
+):
+    etag = make_etag(user_id, get_user_version(db, user_id), "search", q, limit, offset)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    stories, has_more = search_user_stories(db, user_id, q, limit=limit, offset=offset)
+    return {"stories": stories, "next_offset": offset + limit if has_more else None}
+
+# 사용자별 동화 통계 라우터 (user_stats 한 행 조회)
+@router.get("/gallery/stats", response_model=UserStatsResponse)
+def story_stats(request: Request, response: Response, user_id: int, db: Session = Depends(get_db)):
+    stats = get_user_stats(db, user_id)
+    etag = make_etag(user_id, stats["version"], "stats")
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    return stats
+
 # 음악 검색 라우터
 @router.post("/search/url")
 def get_music(req: MusicRequest):
-    results = search_tracks_by_tag(req.theme)
+    results = media_catalog.get(MUSIC, req.theme) # 미리 받아 둔 테마별 목록 (외부 API 는 주기적으로만 호출)
     return {"music_results": results}
 
 # 영상 검색 라우터
 @router.post("/search/video")
 def get_video(req: VideoRequest):
-    results = search_videos(req.theme)
+    results = media_catalog.get(VIDEO, req.theme)
     return {"video_results": results}
\ No newline at end of file
@@ -0,0 +1,272 @@
+import os
+import time
+import logging
+import threading
+from typing import Optional, List, Dict, Set, Any
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from models_dir.database import SessionLocal
+from models_dir.models import Story, StoryContent, Blob, UploadJob
+from controllers.cache import Config
+from controllers.cache_backends import LocalDiskCacheBackend
+from controllers.storage import StorageBackend, LocalStorage
+from controllers.blob_store import blob_store
+from controllers.asset_naming import parse_digest
+from controllers.content_store import unreferenced_contents, delete_unreferenced_contents
+
+logger = logging.getLogger(__name__)
+
+# 가비지 컬렉션 설정
+GC_BATCH_SIZE = int(os.getenv('GC_BATCH_SIZE', '200'))  # 한 배치에서 삭제할 최대 파일 수
+GC_BATCH_PAUSE = float(os.getenv('GC_BATCH_PAUSE', '0.5'))  # 배치 사이 대기 시간(초)
+GC_GRACE_SECONDS = int(os.getenv('GC_GRACE_SECONDS', '3600'))  # 이 시간보다 새 파일은 저장 중일 수 있으므로 건너뜀
+GC_MIN_INTERVAL = int(os.getenv('GC_MIN_INTERVAL', '300'))  # 삭제 요청으로 시작되는 수집의 최소 간격(초)
+GC_S3_PREFIX = os.getenv('GC_S3_PREFIX', 'images')  # S3 에서 검사할 객체 경로
+ASSET_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".gif", ".mp3", ".wav")
+
+STORY_IMAGE_COLUMNS = ("image", "bw_image")
+
+
+def default_targets() -> List[StorageBackend]:
+    """검사 대상 저장소 (내용 주소 저장소, 예전 static/images, 로컬 캐시 디렉토리, S3)"""
+    targets: List[StorageBackend] = [LocalStorage(Config.BLOB_DIR), LocalStorage(Config.STATIC_DIR)]
+    # Redis 캐시는 CACHE_DIR 에 조회용 사본만 두므로 로컬 캐시일 때만 검사
+    if Config.CACHE_BACKEND == "local":
+        targets.append(LocalStorage(Config.CACHE_DIR))
+    if Config.USE_S3:
+        from controllers.storage_s3 import S3Storage
+        targets.append(S3Storage(Config.S3_BUCKET, prefix=GC_S3_PREFIX))
+    return targets
+
+
+# 참조 없는 파일 수집기
+class AssetGarbageCollector:
+    """Story 가 참조하지 않는 이미지/오디오 파일을 찾아(mark) 배치 단위로 삭제(sweep)한다.
+
+    아래 항목은 참조 중인 것으로 본다.
+    - Story.image / Story.bw_image
+    - 참조 수가 남아있는 blobs 행 (캐시 엔트리 등)
+    - 대기/진행 중인 업로드 작업의 로컬 경로와 S3 객체
+    - 로컬 캐시 메타데이터에 등록된 파일
+
+    수집할 때마다 어떤 동화도 참조하지 않는 본문(story_contents)도 함께 정리한다.
+    """
+
+    def __init__(
+        self,
+        targets: Optional[List[StorageBackend]] = None,
+        batch_size: int = GC_BATCH_SIZE,
+        batch_pause: float = GC_BATCH_PAUSE,
+        grace_seconds: int = GC_GRACE_SECONDS,
+        min_interval: float = GC_MIN_INTERVAL,
+    ):
+        self._targets = targets
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.grace_seconds = grace_seconds
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pending = False  # 실행 중에 들어온 요청이 있으면 끝난 뒤 한 번 더 실행
+        self._last_started = 0.0
+        self.last_report: Optional[Dict[str, Any]] = None
+
+    @property
+    def targets(self) -> List[StorageBackend]:
+        # S3 클라이언트 생성을 실제 수집 시점까지 미룸
+        if self._targets is None:
+            self._targets = default_targets()
+        return self._targets
+
+    def _referenced_locations(self, db: Session) -> Set[str]:
+        """mark 단계: 참조 중인 location 목록"""
+        locations: Set[str] = set()
+
+        # 본문 등 큰 컬럼은 읽지 않고 이미지 경로만 조회
+        rows = db.query(Story.image, Story.bw_image).execution_options(yield_per=1000)
+        for image, bw_image in rows:
+            locations.update(location for location in (image, bw_image) if location)
+
+        for digest, ext in db.query(Blob.digest, Blob.ext).filter(Blob.refcount > 0):
+            locations.add(blob_store.path_for(digest, ext))
+
+        active_jobs = db.query(UploadJob.local_path, UploadJob.object_name).filter(
+            UploadJob.status.in_(("pending", "running"))
+        )
+        for local_path, object_name in active_jobs:
+            locations.add(local_path)
+            for target in self.targets:
+                if hasattr(target, "url_for"):
+                    locations.add(target.url_for(object_name))
+
+        if Config.CACHE_BACKEND == "local":
+            cache_backend = LocalDiskCacheBackend(Config.CACHE_DIR)
+            for _, entry in cache_backend.entries():
+                path = entry.get('blob_path') or cache_backend.blob_path(entry)
+                if path:
+                    locations.add(path)
+        return locations
+
+    def _is_referenced(self, db: Session, target: StorageBackend, key: str) -> bool:
+        """sweep 직전 재확인 (mark 이후 새로 저장된 동화 대비)"""
+        location = target.location(key)
+        column_filters = [getattr(Story, column_name) == location for column_name in STORY_IMAGE_COLUMNS]
+        if db.query(Story.id).filter(or_(*column_filters)).first() is not None:
+            return True
+        digest = parse_digest(key.rsplit("/", 1)[-1])
+        if digest and isinstance(target, LocalStorage) and blob_store.digest_from_path(location) == digest:
+            blob = db.get(Blob, digest)
+            return blob is not None and blob.refcount > 0
+        return False
+
+    def _find_candidates(self, target: StorageBackend, referenced_keys: Set[str]) -> List[Dict[str, Any]]:
+        now = time.time()
+        candidates = []
+        for key, size, modified_at in target.list_keys():
+            if not key.lower().endswith(ASSET_EXTENSIONS) or key in referenced_keys:
+                continue
+            if now - modified_at < self.grace_seconds:
+                continue
+            candidates.append({"key": key, "size": size})
+        return candidates
+
+    def _sweep_batch(self, target: StorageBackend, batch: List[Dict[str, Any]]) -> int:
+        """한 배치 삭제 후 실제로 확보한 바이트 수 반환"""
+        db: Session = SessionLocal()
+        try:
+            deletable = [item for item in batch if not self._is_referenced(db, target, item["key"])]
+        finally:
+            db.close()
+
+        reclaimed = 0
+        plain_keys = []
+        for item in deletable:
+            location = target.location(item["key"])
+            digest = blob_store.digest_from_path(location) if isinstance(target, LocalStorage) else None
+            if digest:
+                # blobs 행이 남아있으면 행과 파일을 함께 정리
+                if blob_store.purge_if_unreferenced(digest) or not os.path.exists(location):
+                    reclaimed += item["size"]
+                    continue
+            plain_keys.append(item["key"])
+
+        if plain_keys:
+            target.delete_many(plain_keys)
+            deleted_keys = set(plain_keys)
+            reclaimed += sum(item["size"] for item in deletable if item["key"] in deleted_keys)
+        return reclaimed
+
+    def _sweep_contents(self, dry_run: bool) -> int:
+        """참조 없는 본문 삭제, 대상 수 반환 (dry_run 이면 개수만 셈)"""
+        db: Session = SessionLocal()
+        try:
+            if dry_run:
+                return db.query(StoryContent.hash).filter(unreferenced_contents()).count()
+            deleted = delete_unreferenced_contents(db)
+            db.commit()
+            return deleted
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def collect(self, dry_run: bool = False, max_batches: Optional[int] = None) -> Dict[str, Any]:
+        """mark & sweep 실행 후 결과 보고서 반환 (dry_run 이면 삭제 없이 회수 가능 용량만 계산)"""
+        started = time.time()
+        db: Session = SessionLocal()
+        try:
+            referenced = self._referenced_locations(db)
+        finally:
+            db.close()
+
+        report: Dict[str, Any] = {
+            "dry_run": dry_run,
+            "referenced": len(referenced),
+            "candidates": 0,
+            "reclaimable_bytes": 0,
+            "deleted_bytes": 0,
+            "storages": {},
+        }
+        batches_run = 0
+        for target in self.targets:
+            referenced_keys = {key for key in map(target.key_from_location, referenced) if key}
+            candidates = self._find_candidates(target, referenced_keys)
+            label = f"{target.name}:{getattr(target, 'base', None) or getattr(target, 'bucket_name', '')}"
+            storage_report = {
+                "candidates": len(candidates),
+                "reclaimable_bytes": sum(item["size"] for item in candidates),
+                "deleted_bytes": 0,
+            }
+            report["storages"][label] = storage_report
+            report["candidates"] += storage_report["candidates"]
+            report["reclaimable_bytes"] += storage_report["reclaimable_bytes"]
+            if dry_run:
+                continue
+
+            for i in range(0, len(candidates), self.batch_size):
+                if max_batches is not None and batches_run >= max_batches:
+                    break
+                reclaimed = self._sweep_batch(target, candidates[i:i + self.batch_size])
+                storage_report["deleted_bytes"] += reclaimed
+                report["deleted_bytes"] += reclaimed
+                batches_run += 1
+                # 저장소/DB 에 부담이 몰리지 않도록 배치 사이에 쉼
+                time.sleep(self.batch_pause)
+
+        report["orphan_contents"] = self._sweep_contents(dry_run)
+        report["elapsed_seconds"] = round(time.time() - started, 2)
+        self.last_report = report
+        action = "회수 가능" if dry_run else "삭제"
+        logger.info(
+            f"파일 정리 완료: 후보 {report['candidates']}개, "
+            f"{action} {report['reclaimable_bytes'] if dry_run else report['deleted_bytes']} bytes"
+        )
+        return report
+
+    def request_collection(self):
+        """삭제 작업 후 호출: 백그라운드 스레드에서 수집 시작
+
+        이미 실행(또는 최소 간격 대기) 중이면 요청을 기억해 두고, 현재 실행이 끝난 뒤 최소 간격을 지켜 한 번 더 실행한다.
+        """
+        with self._lock:
+            if self._thread is not None:
+                self._pending = True
+                return
+            self._thread = threading.Thread(target=self._run, name="asset-gc", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            # 최근 수집 후 최소 간격이 지나지 않았으면 기다렸다가 실행 (그 사이 요청은 이번 실행에 합쳐짐)
+            delay = self._last_started + self.min_interval - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            with self._lock:
+                self._pending = False
+                self._last_started = time.time()
+            try:
+                self.collect()
+            except Exception as e:
+                logger.error(f"파일 정리 중 오류: {e}")
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+
+
+# 전역 파일 수집기
+asset_gc = AssetGarbageCollector()
+
+
+def release_story_assets(db: Session, paths: List[Optional[str]]) -> List[str]:
+    """삭제된 동화들의 이미지 참조 해제, 정리할 digest 목록 반환 (동화 삭제와 같은 트랜잭션에서 호출)"""
+    return blob_store.decref_many(paths, db)
+
+
+def purge_released_assets(digests: List[str]):
+    """참조 수가 0이 된 파일 삭제 (커밋 후 백그라운드에서 실행, 실패하거나 건너뛰어도 다음 수집에서 정리)"""
+    for digest in digests:
+        blob_store.purge_if_unreferenced(digest)
+    # 예전 경로/S3 에 남은 파일 정리
+    asset_gc.request_collection()
@@ -0,0 +1,48 @@
+import os
+import hashlib
+from typing import Optional
+
+# 파일 이름/경로 규칙
+# - 이름은 파일 내용의 SHA-256 으로 정하므로 중복 확인(os.path.exists 반복, os.listdir)이 필요 없다.
+# - 한 디렉토리에 파일이 몰리지 않도록 ab/cd/<digest><ext> 형태로 나눠 저장한다.
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def digest_bytes(data: bytes) -> str:
+    """바이트 데이터의 SHA-256"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def digest_file(file_path: str) -> str:
+    """파일 내용을 나눠 읽어 SHA-256 계산"""
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def sharded_relpath(digest: str, ext: str) -> str:
+    """ab/cd/<digest><ext> 형태의 상대 경로"""
+    return f"{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+def sharded_path(root: str, digest: str, ext: str) -> str:
+    """root 아래의 샤딩된 파일 경로"""
+    return os.path.join(root, digest[:2], digest[2:4], f"{digest}{ext}")
+
+
+def object_key(digest: str, ext: str, prefix: str = "images") -> str:
+    """객체 저장소(S3) 키"""
+    return f"{prefix}/{sharded_relpath(digest, ext)}"
+
+
+def parse_digest(name: Optional[str]) -> Optional[str]:
+    """경로나 키의 파일 이름이 digest 형식이면 digest 반환"""
+    if not name:
+        return None
+    stem = os.path.splitext(os.path.basename(name))[0]
+    if len(stem) == 64 and all(c in "0123456789abcdef" for c in stem):
+        return stem
+    return None
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from typing import Optional
+import mimetypes
+import logging
+import os
+from controllers.blob_store import blob_store
+from controllers.asset_naming import parse_digest
+from controllers.etag import etag_matches
+
+router = APIRouter()
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 내용 주소 파일은 내용이 절대 바뀌지 않으므로 1년간 캐시
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+ALLOWED_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".mp3", ".wav"}
+
+
+# 저장된 이미지/오디오 제공
+@router.get("/assets/{filename}")
+async def get_asset(filename: str, request: Request, download: Optional[str] = None):
+    digest = parse_digest(filename)
+    ext = os.path.splitext(filename)[1].lower()
+    if not digest or ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(status_code=404, detail="파일을 찾을 수 없습니다.")
+
+    file_path = blob_store.path_for(digest, ext)
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="파일을 찾을 수 없습니다.")
+
+    # 파일 이름이 곧 내용의 해시이므로 강한 ETag 로 사용
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    # FileResponse 는 파일을 메모리에 올리지 않고 스트리밍(서버가 지원하면 sendfile)으로 전송
+    return FileResponse(
+        file_path,
+        media_type=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        headers=headers,
+        filename=download,
+    )
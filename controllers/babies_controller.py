@@ -1,10 +1,17 @@
-from fastapi import Request, Depends, HTTPException, APIRouter, BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi import Request, Response, Depends, HTTPException, APIRouter, BackgroundTasks
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from models_dir.models import User, Baby, Story # 모델 import
 from scheme_files.babies_schemes import CreateBaby
 import logging
 import re
-from controllers.dependencies import get_db
+from controllers.dependencies import get_async_db
+from controllers.asset_gc import release_story_assets, purge_released_assets
+from controllers.content_store import delete_unreferenced_contents
+from controllers.user_stats import reset_user_stats, bump_version, get_user_version
+from controllers.etag import make_etag, etag_matches, not_modified, set_etag
+from controllers.identity_cache import identity_cache, get_baby_list_async
+from models_dir.search_index import remove_user_stories
 from datetime import date, timedelta
 import streamlit as st
 import requests
@@ -29,20 +36,20 @@ logger = logging.getLogger(__name__)
 
 # 아이 추가
 @router.post("/babies/create_baby")
-async def create_baby(baby_data: CreateBaby, db: Session = Depends(get_db)):
+async def create_baby(baby_data: CreateBaby, db: AsyncSession = Depends(get_async_db)):
     try:
         logger.info(f"아이 정보 추가 요청: {baby_data}")
         
         # 사용자 존재 확인
-        user = db.query(User).filter(User.id == baby_data.user_id).first()
+        user = (await db.execute(select(User).where(User.id == baby_data.user_id))).scalars().first()
         if not user:
             raise HTTPException(status_code=404, detail="사용자를 찾을 수 없습니다.")
 
         # 중복 이름 체크
-        existing_baby = db.query(Baby).filter(
+        existing_baby = (await db.execute(select(Baby).where(
             Baby.user_id == baby_data.user_id,
             Baby.baby_name == baby_data.baby_name
-        ).first()
+        ))).scalars().first()
         
         if existing_baby:
             raise HTTPException(status_code=400, detail="동일한 아이 이름이 이미 존재합니다.")
@@ -56,8 +63,10 @@ async def create_baby(baby_data: CreateBaby, db: Session = Depends(get_db)):
         )
         
         db.add(new_baby)
-        db.commit()
-        db.refresh(new_baby)
+        await db.run_sync(bump_version, baby_data.user_id)  # 아이 목록 ETag 갱신
+        await db.commit()
+        await db.refresh(new_baby)
+        identity_cache.invalidate_user(baby_data.user_id)
         
         return {
             "message": "아이 정보가 추가되었습니다.",
@@ -70,7 +79,7 @@ async def create_baby(baby_data: CreateBaby, db: Session = Depends(get_db)):
         }
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"아이 추가 중 오류: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -102,18 +111,16 @@ def display_baby_name():
         st.error("아이 정보 조회에 실패했습니다.")
 
 @router.get("/babies/list/{user_id}")
-async def get_user_babies(user_id: int, db: Session = Depends(get_db)):
+async def get_user_babies(user_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
     try:
-        babies = db.query(Baby).filter(Baby.user_id == user_id).all()
-        return [
-            {
-                "id": baby.id,
-                "baby_name": baby.baby_name,
-                "baby_gender": baby.baby_gender,
-                "baby_bday": str(baby.baby_bday)
-            }
-            for baby in babies
-        ]
+        # 리런마다 호출되므로 버전이 같으면 목록 조회 없이 304 응답
+        version = await db.run_sync(get_user_version, user_id)
+        etag = make_etag(user_id, version, "babies")
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+        # TTL 캐시 우선 조회 (추가/삭제 시 무효화)
+        return await get_baby_list_async(db, user_id, version)
     except Exception as e:
         logger.error(f"아이 목록 조회 중 오류: {str(e)}")
         raise HTTPException(status_code=500, detail="아이 목록을 가져오는데 실패했습니다.")
@@ -121,7 +128,7 @@ async def get_user_babies(user_id: int, db: Session = Depends(get_db)):
 
 # 아이 삭제
 @router.delete("/babies/delete/{baby_id}")
-async def delete_baby(request: Request, id: int, db: Session = Depends(get_db)):
+async def delete_baby(request: Request, id: int, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_async_db)):
     logger.info(f"아기 정보 삭제 요청: {id}")
 
     user_id = request.session.get("id") # 사용자 ID
@@ -131,40 +138,54 @@ async def delete_baby(request: Request, id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=401, detail="Not Authorized")
 
     # 사용자를 user_id로 조회
-    user_query = db.query(User)
+    user_query = select(User)
 
     if user_id is not None:
-        user_query = user_query.filter(User.id == user_id)
+        user_query = user_query.where(User.id == user_id)
 
-    user = user_query.first()
+    user = (await db.execute(user_query)).scalars().first()
 
     if user is None:
         logger.error(f"사용자 찾기 실패: ID {user_id}에 대한 사용자가 존재하지 않음")
         raise HTTPException(status_code=404, detail="User를 찾을 수 없습니다")
     
     # 아이 조회
-    baby = db.query(Baby).filter(Baby.id == id, Baby.user_id == user_id).first()
+    baby = (await db.execute(select(Baby).where(Baby.id == id, Baby.user_id == user_id))).scalars().first()
 
     if baby is None:
         logger.error(f"아이 정보 찾기 실패: ID {id}에 대한 아이가 존재하지 않음")
         raise HTTPException(status_code=404, detail="해당 아이 정보를 찾을 수 없습니다.")
     
-    # 아이의 이름으로 작성된 모든 동화 삭제
-    stories = db.query(Story).filter(Story.user_id == user_id).all()
-    logger.info(f"{len(stories)}개의 동화를 삭제합니다.")
-    for story in stories:
-        db.delete(story)
-    
-    # 아이 정보 삭제
-    db.delete(baby)
-
+    bulk = {"synchronize_session": False}
     try:
-        db.commit()
+        # 아이의 이름으로 작성된 모든 동화를 DELETE 한 번으로 삭제 (이미지 정리를 위해 경로만 돌려받음)
+        deleted_stories = (await db.execute(
+            delete(Story).where(Story.user_id == user_id).returning(Story.image, Story.bw_image, Story.content_hash),
+            execution_options=bulk,
+        )).all()
+        logger.info(f"{len(deleted_stories)}개의 동화를 삭제합니다.")
+        # 사용자의 동화가 모두 지워졌으므로 통계와 검색 인덱스도 같은 트랜잭션에서 정리
+        await db.run_sync(reset_user_stats, user_id)
+        await db.run_sync(remove_user_stories, user_id)
+        # 다른 동화가 공유하지 않는 본문도 함께 삭제
+        await db.run_sync(delete_unreferenced_contents, [row.content_hash for row in deleted_stories])
+        # 이미지 참조 수도 같은 트랜잭션에서 감소 (커밋되지 않으면 참조 수도 그대로)
+        released = await db.run_sync(release_story_assets, [path for row in deleted_stories for path in (row.image, row.bw_image)])
+
+        # 아이 정보 삭제
+        await db.execute(delete(Baby).where(Baby.id == baby.id), execution_options=bulk)
+        await db.run_sync(bump_version, user_id)
+
+        await db.commit()
+        identity_cache.invalidate_user(user_id)
         logger.info(f"{baby.baby_name} 아이 정보가 삭제되었습니다.")
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"아이 정보 삭제 오류: {e}") # 탈퇴 에러 내용 출력
         raise HTTPException(status_code=500, detail="아이 정보 삭제에 실패하였습니다. 다시 시도해 주세요")
+
+    # 참조가 없어진 파일 삭제는 응답 후 백그라운드에서 처리
+    background_tasks.add_task(purge_released_assets, released)
     
     # 세션 비우기
     request.session.clear()
@@ -0,0 +1,230 @@
+import os
+import time
+import logging
+import tempfile
+from collections import Counter
+from pathlib import Path
+from typing import Optional, Iterable, List
+from sqlalchemy import update, case, bindparam
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from models_dir.database import SessionLocal
+from models_dir.models import Blob
+from controllers.cache import Config
+from controllers.asset_naming import digest_bytes, sharded_path, parse_digest
+
+
+# 내용 주소(SHA-256) 기반 파일 저장소
+class BlobStore:
+    """같은 내용의 파일은 한 번만 저장하고, 참조 수(refcount)로 수명을 관리한다.
+
+    파일은 <root>/ab/cd/<digest><ext> 에 저장되며, 참조 수는 blobs 테이블에 기록된다.
+    동화 저장/삭제와 같은 트랜잭션에서 참조 수를 바꿀 수 있도록 db 세션을 받는다.
+    저장 직후 아직 참조가 없는 파일은 grace_seconds 동안 purge_if_unreferenced 가 지우지 않는다.
+    """
+
+    def __init__(self, root: str, grace_seconds: int = 0):
+        self.root = Path(root)
+        self.grace_seconds = grace_seconds
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, digest: str, ext: str) -> str:
+        """digest 에 해당하는 파일 경로"""
+        return sharded_path(str(self.root), digest, ext)
+
+    def digest_from_path(self, path: Optional[str]) -> Optional[str]:
+        """저장소 안의 파일 경로이면 digest 반환, 아니면 None"""
+        if not path or path.startswith(("http://", "https://")):
+            return None
+        try:
+            relative = Path(path).resolve().relative_to(self.root.resolve())
+        except ValueError:
+            return None
+        return parse_digest(relative.name)
+
+    def url_for(self, path: Optional[str]) -> Optional[str]:
+        """저장소 파일이면 /assets 경로의 URL 반환 (기준 URL 이 없거나 저장소 밖이면 그대로 반환)"""
+        digest = self.digest_from_path(path)
+        base_url = os.getenv('ASSET_BASE_URL') or os.getenv('API_URL')
+        if not digest or not base_url:
+            return path
+        return f"{base_url.rstrip('/')}/assets/{digest}{os.path.splitext(path)[1]}"
+
+    def put_bytes(self, data: bytes, ext: str, db: Optional[Session] = None, referenced: bool = False) -> str:
+        """바이트 데이터를 저장하고 파일 경로 반환 (이미 있으면 복사하지 않음)
+
+        referenced 이면 행 등록과 같은 트랜잭션에서 참조 수 +1 (따로 incref 하는 사이에 purge 되지 않도록)
+        """
+        digest = digest_bytes(data)
+        target = self.path_for(digest, ext)
+        # 행을 먼저 등록한 뒤 파일 확인: purge 는 행을 잠근 채 파일을 지우므로, 지워졌다면 아래에서 다시 씀
+        self._ensure_row(digest, ext, len(data), db, refcount=1 if referenced else 0)
+        if os.path.exists(target):
+            # 최근에 다시 저장된 파일임을 표시 (purge 유예 기준)
+            os.utime(target)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            # 임시 파일에 쓴 뒤 교체하여 다른 프로세스가 반쯤 쓰인 파일을 읽지 않도록 함
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(target), delete=False) as tmp_file:
+                tmp_file.write(data)
+                tmp_path = tmp_file.name
+            os.replace(tmp_path, target)
+        return target
+
+    def put_file(self, file_path: str, db: Optional[Session] = None, referenced: bool = False) -> str:
+        """로컬 파일을 저장소에 넣고 저장소 경로 반환"""
+        if self.digest_from_path(file_path):
+            if referenced:
+                self.incref(file_path, db)
+            return file_path
+        ext = os.path.splitext(file_path)[1] or ".bin"
+        with open(file_path, "rb") as f:
+            return self.put_bytes(f.read(), ext, db, referenced)
+
+    def _add_refs(self, db: Session, digest: str, refcount: int) -> int:
+        return (
+            db.query(Blob)
+            .filter(Blob.digest == digest)
+            .update({Blob.refcount: Blob.refcount + refcount}, synchronize_session=False)
+        )
+
+    def _ensure_row(self, digest: str, ext: str, size: int, db: Optional[Session], refcount: int = 0):
+        """blobs 테이블에 행이 없으면 추가하고, 있으면 참조 수에 refcount 를 더함"""
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            exists = self._add_refs(db, digest, refcount) if refcount else db.get(Blob, digest) is not None
+            if not exists:
+                try:
+                    if own_session:
+                        db.add(Blob(digest=digest, ext=ext, size=size, refcount=refcount))
+                        db.commit()
+                    else:
+                        # 호출자의 트랜잭션은 유지하도록 savepoint 사용
+                        with db.begin_nested():
+                            db.add(Blob(digest=digest, ext=ext, size=size, refcount=refcount))
+                except IntegrityError:
+                    # 다른 요청이 먼저 같은 파일을 등록한 경우
+                    if own_session:
+                        db.rollback()
+                    if refcount:
+                        self._add_refs(db, digest, refcount)
+            if own_session:
+                db.commit()
+        except Exception:
+            if own_session:
+                db.rollback()
+            raise
+        finally:
+            if own_session:
+                db.close()
+
+    def incref(self, path: Optional[str], db: Optional[Session] = None) -> Optional[str]:
+        """경로가 저장소 파일이면 참조 수 +1 (커밋은 db 를 넘긴 호출자가 담당)"""
+        digest = self.digest_from_path(path)
+        if not digest:
+            return None
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            updated = (
+                db.query(Blob)
+                .filter(Blob.digest == digest)
+                .update({Blob.refcount: Blob.refcount + 1}, synchronize_session=False)
+            )
+            if not updated:
+                db.add(Blob(digest=digest, ext=os.path.splitext(path)[1], size=os.path.getsize(path), refcount=1))
+            if own_session:
+                db.commit()
+            return digest
+        except Exception:
+            if own_session:
+                db.rollback()
+            raise
+        finally:
+            if own_session:
+                db.close()
+
+    def decref(self, path: Optional[str], db: Optional[Session] = None) -> Optional[str]:
+        """경로가 저장소 파일이면 참조 수 -1, 해당 digest 반환"""
+        digest = self.digest_from_path(path)
+        if not digest:
+            return None
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            (
+                db.query(Blob)
+                .filter(Blob.digest == digest, Blob.refcount > 0)
+                .update({Blob.refcount: Blob.refcount - 1}, synchronize_session=False)
+            )
+            if own_session:
+                db.commit()
+            return digest
+        except Exception:
+            if own_session:
+                db.rollback()
+            raise
+        finally:
+            if own_session:
+                db.close()
+
+    def decref_many(self, paths: Iterable[Optional[str]], db: Optional[Session] = None) -> List[str]:
+        """여러 경로의 참조 수를 digest 별로 묶어 한 번에 감소, 해당 digest 목록 반환"""
+        counts = Counter(digest for digest in map(self.digest_from_path, paths) if digest)
+        if not counts:
+            return []
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            # ORM 일괄 UPDATE 는 기본키 기준으로만 동작하므로 테이블 수준 UPDATE 를 executemany 로 실행
+            blobs = Blob.__table__
+            amount = bindparam("amount")
+            statement = (
+                update(blobs)
+                .where(blobs.c.digest == bindparam("target_digest"))
+                .values(refcount=case((blobs.c.refcount > amount, blobs.c.refcount - amount), else_=0))
+            )
+            db.execute(statement, [{"target_digest": digest, "amount": n} for digest, n in counts.items()])
+            if own_session:
+                db.commit()
+            return list(counts)
+        except Exception:
+            if own_session:
+                db.rollback()
+            raise
+        finally:
+            if own_session:
+                db.close()
+
+    def purge_if_unreferenced(self, digest: Optional[str]) -> bool:
+        """참조 수가 0이면 파일과 행을 삭제 (커밋 이후에 호출)"""
+        if not digest:
+            return False
+        db: Session = SessionLocal()
+        try:
+            blob = db.query(Blob).filter(Blob.digest == digest).with_for_update().first()
+            if blob is None or blob.refcount > 0:
+                return False
+            file_path = self.path_for(blob.digest, blob.ext)
+            # 방금 저장되어 아직 동화에 연결되지 않은 파일은 남겨 둠 (유예 시간이 지나면 asset_gc 가 정리)
+            if os.path.exists(file_path) and time.time() - os.path.getmtime(file_path) < self.grace_seconds:
+                return False
+            db.delete(blob)
+            db.flush()
+            # 행 잠금을 쥔 채 파일을 지워, 같은 내용을 다시 저장하는 put_bytes 가 지워진 파일을 참조하지 않도록 함
+            if os.path.exists(file_path):
+                os.unlink(file_path)
+            db.commit()
+            logging.info(f"참조가 없는 파일 삭제: {file_path}")
+            return True
+        except Exception as e:
+            db.rollback()
+            logging.error(f"파일 정리 실패 ({digest}): {e}")
+            return False
+        finally:
+            db.close()
+
+
+# 전역 파일 저장소
+blob_store = BlobStore(Config.BLOB_DIR, Config.BLOB_GRACE_SECONDS)
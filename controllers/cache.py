@@ -2,10 +2,12 @@ import os
 import logging
 from pathlib import Path
 from typing import Optional, Tuple, Dict, Any
+from collections import Counter, defaultdict
 import threading
-import json
+import time
 import hashlib
 import pandas as pd
+from controllers.cache_backends import CacheBackend, LocalDiskCacheBackend, MemoryCacheBackend, RedisCacheBackend
 
 # 설정 클래스
 class Config:
@@ -14,57 +16,240 @@ class Config:
     IMAGE_SIZE = "512x512"
     STATIC_DIR = "static/images"
     CACHE_DIR = "cache"
+    BLOB_DIR = os.getenv('BLOB_DIR', 'static/blobs')  # 내용 주소 기반 파일 저장 위치
+    BLOB_GRACE_SECONDS = int(os.getenv('BLOB_GRACE_SECONDS', '3600'))  # 참조 수가 0이어도 이 시간 안에 저장된 파일은 동화에 연결 전일 수 있으므로 삭제하지 않음
     USE_S3 = os.getenv('USE_S3', 'false').lower() == 'true'
     S3_BUCKET = os.getenv('S3_BUCKET', 'my-fairytale-bucket')
     MAX_CACHE_SIZE = 100  # 캐시할 최대 파일 수
+    NEGATIVE_CACHE_TTL = int(os.getenv('NEGATIVE_CACHE_TTL', '300'))  # 실패 결과를 기억하는 시간(초)
+    CACHE_TOP_KEYS = 200  # 인기 키 샘플로 유지할 최대 키 수
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'local')  # local / memory / redis
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_INLINE_LIMIT = int(os.getenv('CACHE_INLINE_LIMIT', str(256 * 1024)))  # 이 크기 이하만 Redis 에 직접 저장
+    CACHE_S3_PREFIX = os.getenv('CACHE_S3_PREFIX', 'cache')  # Redis 캐시의 큰 파일을 두는 S3 경로 (USE_S3 일 때만, 아니면 Redis 에 저장)
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', '300'))  # 사용자 프로필 캐시 유지 시간(초)
+    BABY_CACHE_TTL = int(os.getenv('BABY_CACHE_TTL', '60'))  # 아이 목록 캐시 유지 시간(초), 다른 프로세스의 변경은 이 시간 안에 반영
+    IDENTITY_CACHE_SIZE = int(os.getenv('IDENTITY_CACHE_SIZE', '10000'))  # 종류별 최대 캐시 항목 수
+    MEDIA_CATALOG_TTL = int(os.getenv('MEDIA_CATALOG_TTL', '21600'))  # 자장가 음악/영상 목록을 새로 받아올 주기(초)
+    MEDIA_CATALOG_STALE_TTL = int(os.getenv('MEDIA_CATALOG_STALE_TTL', '604800'))  # 외부 API 장애 시 오래된 목록을 계속 제공할 최대 시간(초)
+    MEDIA_CATALOG_CHECK_INTERVAL = int(os.getenv('MEDIA_CATALOG_CHECK_INTERVAL', '60'))  # 갱신할 목록이 있는지 확인하는 주기(초)
+    MEDIA_CATALOG_EXTRA_SIZE = int(os.getenv('MEDIA_CATALOG_EXTRA_SIZE', '50'))  # 테마 목록에 없는 검색어를 기억할 최대 개수
+    MEDIA_CATALOG_EXTRA_RATE = os.getenv('MEDIA_CATALOG_EXTRA_RATE', '10/60')  # 테마 목록에 없는 검색어로 외부 API 를 호출할 수 있는 횟수/초 (전체 공유)
+    MEDIA_CATALOG_SNAPSHOT = os.getenv('MEDIA_CATALOG_SNAPSHOT', 'cache/media_catalog.json')  # 재시작/다른 워커와 공유하는 목록 파일
+
+# 캐시 통계 클래스
+class CacheStats:
+    """cache_type 별 히트/미스/삽입/제거 횟수와 조회 지연 시간 집계"""
+    EVENTS = ("hits", "misses", "negative_hits", "inserts", "evictions")
+
+    def __init__(self, max_tracked_keys: int = Config.CACHE_TOP_KEYS):
+        self.max_tracked_keys = max_tracked_keys
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """모든 통계 초기화"""
+        with self._lock:
+            self._events = defaultdict(lambda: dict.fromkeys(self.EVENTS, 0))
+            self._latency = defaultdict(lambda: {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            self._bytes = defaultdict(int)
+            self._key_hits = Counter()
+
+    def record(self, cache_type: str, event: str, cache_key: Optional[str] = None):
+        """이벤트 카운트 증가 (히트인 경우 키별 히트 수도 기록)"""
+        with self._lock:
+            self._events[cache_type][event] += 1
+            if event == "hits" and cache_key:
+                self._key_hits[(cache_type, cache_key)] += 1
+                # 추적 키가 너무 많아지면 상위 절반만 남김
+                if len(self._key_hits) > self.max_tracked_keys:
+                    self._key_hits = Counter(dict(self._key_hits.most_common(self.max_tracked_keys // 2)))
+
+    def record_latency(self, cache_type: str, elapsed_seconds: float):
+        """조회 지연 시간 기록"""
+        elapsed_ms = elapsed_seconds * 1000
+        with self._lock:
+            latency = self._latency[cache_type]
+            latency["count"] += 1
+            latency["total_ms"] += elapsed_ms
+            latency["max_ms"] = max(latency["max_ms"], elapsed_ms)
+
+    def add_bytes(self, cache_type: str, size: int):
+        """저장된 바이트 수 증감 (삭제 시 음수)"""
+        with self._lock:
+            self._bytes[cache_type] += size
+
+    def snapshot(self, top_n: int = 10) -> Dict[str, Any]:
+        """JSON 응답용 통계 스냅샷"""
+        with self._lock:
+            cache_types = set(self._events) | set(self._latency) | set(self._bytes)
+            by_type = {}
+            for cache_type in sorted(cache_types):
+                events = dict(self._events.get(cache_type) or dict.fromkeys(self.EVENTS, 0))
+                latency = self._latency.get(cache_type) or {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+                lookups = events["hits"] + events["misses"] + events["negative_hits"]
+                by_type[cache_type] = {
+                    **events,
+                    "bytes_stored": self._bytes.get(cache_type, 0),
+                    "hit_ratio": round((events["hits"] + events["negative_hits"]) / lookups, 4) if lookups else None,
+                    "lookup_latency_ms": {
+                        "count": latency["count"],
+                        "avg": round(latency["total_ms"] / latency["count"], 3) if latency["count"] else 0.0,
+                        "max": round(latency["max_ms"], 3),
+                    },
+                }
+            top_keys = [
+                {"cache_type": cache_type, "key": cache_key, "hits": hits}
+                for (cache_type, cache_key), hits in self._key_hits.most_common(top_n)
+            ]
+        return {"cache_types": by_type, "top_keys": top_keys}
+
+    def to_prometheus(self) -> str:
+        """Prometheus 텍스트 포맷으로 변환"""
+        snapshot = self.snapshot(top_n=0)
+        lines = []
+        for event in self.EVENTS:
+            lines.append(f"# TYPE fairytale_cache_{event}_total counter")
+            for cache_type, values in snapshot["cache_types"].items():
+                lines.append(f'fairytale_cache_{event}_total{{cache_type="{cache_type}"}} {values[event]}')
+        lines.append("# TYPE fairytale_cache_bytes_stored gauge")
+        for cache_type, values in snapshot["cache_types"].items():
+            lines.append(f'fairytale_cache_bytes_stored{{cache_type="{cache_type}"}} {values["bytes_stored"]}')
+        lines.append("# TYPE fairytale_cache_lookup_latency_ms summary")
+        with self._lock:
+            for cache_type, latency in sorted(self._latency.items()):
+                lines.append(f'fairytale_cache_lookup_latency_ms_count{{cache_type="{cache_type}"}} {latency["count"]}')
+                lines.append(f'fairytale_cache_lookup_latency_ms_sum{{cache_type="{cache_type}"}} {round(latency["total_ms"], 3)}')
+        return "\n".join(lines) + "\n"
+
+# 전역 캐시 통계 (프로세스 단위)
+cache_stats = CacheStats()
+
+# 설정에 맞는 캐시 저장소 생성
+def create_cache_backend(cache_dir: str = Config.CACHE_DIR, backend_name: str = Config.CACHE_BACKEND) -> CacheBackend:
+    if backend_name == "memory":
+        return MemoryCacheBackend()
+    if backend_name == "redis":
+        # 큰 파일은 모든 노드가 읽을 수 있는 S3 에 두고 참조만 저장 (노드 로컬 디렉토리는 공유되지 않음)
+        blob_storage = None
+        if Config.USE_S3:
+            from controllers.storage_s3 import S3Storage
+            blob_storage = S3Storage(Config.S3_BUCKET, prefix=Config.CACHE_S3_PREFIX)
+        return RedisCacheBackend(
+            url=Config.REDIS_URL,
+            inline_limit=Config.CACHE_INLINE_LIMIT,
+            blob_storage=blob_storage,
+            materialize_dir=cache_dir,
+        )
+    if backend_name != "local":
+        logging.warning(f"알 수 없는 캐시 백엔드 '{backend_name}', 로컬 디스크를 사용합니다.")
+    return LocalDiskCacheBackend(cache_dir)
 
 # 캐시 관리 클래스
 class CacheManager:
-    def __init__(self, cache_dir: str = Config.CACHE_DIR):
+    def __init__(
+        self,
+        cache_dir: str = Config.CACHE_DIR,
+        stats: CacheStats = cache_stats,
+        backend: Optional[CacheBackend] = None,
+        blob_store=None,
+    ):
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
-        self.metadata_file = self.cache_dir / "cache_metadata.json"
-        self.metadata = self._load_metadata()
+        self.backend = backend if backend is not None else create_cache_backend(cache_dir)
+        # 이미지/오디오는 BlobStore 에 한 번만 저장하고 엔트리에는 경로만 기록
+        self.blob_store = blob_store
         self._lock = threading.Lock()
+        self.stats = stats
+        self._init_bytes_stats()
+
+    def _init_bytes_stats(self):
+        """기존 캐시 파일 크기를 통계에 반영"""
+        for cache_key, entry in self.backend.entries():
+            if not entry.get('filename') and not entry.get('blob_path'):
+                continue
+            size = entry.get('size')
+            if size is None:
+                file_path = self._entry_path(entry)
+                size = os.path.getsize(file_path) if file_path else 0
+                entry['size'] = size
+                self.backend.put_entry(cache_key, entry)
+            self.stats.add_bytes(entry.get('cache_type', 'unknown'), size)
     
-    def _load_metadata(self) -> Dict[str, Any]:
-        """캐시 메타데이터 로드"""
-        if self.metadata_file.exists():
-            try:
-                with open(self.metadata_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                logging.warning(f"캐시 메타데이터 로드 실패: {e}")
-        return {}
-    
-    def _save_metadata(self):
-        """캐시 메타데이터 저장"""
-        try:
-            with open(self.metadata_file, 'w', encoding='utf-8') as f:
-                json.dump(self.metadata, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logging.error(f"캐시 메타데이터 저장 실패: {e}")
-    
+    def _entry_path(self, entry: Dict[str, Any]) -> Optional[str]:
+        """엔트리가 가리키는 로컬 파일 경로"""
+        if entry.get('blob_path'):
+            return entry['blob_path'] if os.path.exists(entry['blob_path']) else None
+        return self.backend.blob_path(entry)
+
+    def _release_entry(self, entry: Dict[str, Any]):
+        """엔트리가 붙잡고 있던 파일 해제"""
+        if entry.get('blob_path') and self.blob_store is not None:
+            digest = self.blob_store.decref(entry['blob_path'])
+            self.blob_store.purge_if_unreferenced(digest)
+        else:
+            self.backend.delete_blob(entry)
+
     def _generate_cache_key(self, content: str, cache_type: str) -> str:
         """캐시 키 생성"""
         return hashlib.md5(f"{cache_type}_{content}".encode()).hexdigest()
+
+    def lookup(self, content: str, cache_type: str) -> Tuple[Optional[str], bool]:
+        """캐시 조회: (캐시된 파일 경로, 실패 결과 캐시 여부) 반환"""
+        started = time.perf_counter()
+        try:
+            with self._lock:
+                cache_key = self._generate_cache_key(content, cache_type)
+                entry = self.backend.get_entry(cache_key)
+                if entry is None:
+                    self.stats.record(cache_type, "misses")
+                    return None, False
+
+                # 실패 결과 캐시 (업스트림 재호출 방지)
+                if entry.get('negative'):
+                    if entry.get('expires_at', 0) > time.time():
+                        self.stats.record(cache_type, "negative_hits", cache_key)
+                        return None, True
+                    self.backend.delete_entry(cache_key)
+                    self.stats.record(cache_type, "misses")
+                    return None, False
+
+                file_path = self._entry_path(entry)
+                if file_path:
+                    # 접근 시간 업데이트
+                    entry['last_accessed'] = pd.Timestamp.now().isoformat()
+                    self.backend.put_entry(cache_key, entry)
+                    self.stats.record(cache_type, "hits", cache_key)
+                    return file_path, False
+
+                # 공유 저장소는 이 노드에서만 파일을 못 여는 것일 수 있으므로 엔트리를 남겨 두고 미스로 처리
+                if not self.backend.shared:
+                    self.backend.delete_entry(cache_key)
+                    self.stats.add_bytes(cache_type, -entry.get('size', 0))
+                self.stats.record(cache_type, "misses")
+                return None, False
+        finally:
+            self.stats.record_latency(cache_type, time.perf_counter() - started)
     
     def get_cached_file(self, content: str, cache_type: str) -> Optional[str]:
         """캐시된 파일 경로 반환"""
+        cached_path, _ = self.lookup(content, cache_type)
+        return cached_path
+
+    def cache_negative(self, content: str, cache_type: str, ttl: int = Config.NEGATIVE_CACHE_TTL):
+        """업스트림 실패 결과를 ttl 초 동안 캐시"""
         with self._lock:
             cache_key = self._generate_cache_key(content, cache_type)
-            if cache_key in self.metadata:
-                file_path = self.cache_dir / self.metadata[cache_key]['filename']
-                if file_path.exists():
-                    # 접근 시간 업데이트
-                    self.metadata[cache_key]['last_accessed'] = pd.Timestamp.now().isoformat()
-                    self._save_metadata()
-                    return str(file_path)
-                else:
-                    # 파일이 없으면 메타데이터에서 제거
-                    del self.metadata[cache_key]
-                    self._save_metadata()
-        return None
+            now = pd.Timestamp.now().isoformat()
+            self.backend.put_entry(cache_key, {
+                'negative': True,
+                'content_hash': cache_key,
+                'cache_type': cache_type,
+                'expires_at': time.time() + ttl,
+                'created_at': now,
+                'last_accessed': now
+            })
+            self._manage_cache_size()
     
     def cache_file(self, content: str, cache_type: str, file_path: str) -> str:
         """파일을 캐시에 저장"""
@@ -80,28 +265,43 @@ class CacheManager:
                 ext = ".bin"
             
             cached_filename = f"{cache_key}{ext}"
-            cached_path = self.cache_dir / cached_filename
             
             try:
                 # 파일 복사
                 if os.path.exists(file_path):
-                    import shutil
-                    shutil.copy2(file_path, cached_path)
+                    # BlobStore 는 노드 로컬 디렉토리이므로 공유 저장소(Redis)에서는 저장소 쪽에 보관
+                    if self.blob_store is not None and not self.backend.shared and cache_type in ("image", "audio"):
+                        # 같은 내용이면 복사 없이 기존 파일을 참조 (등록과 참조 수 증가를 한 번에 처리)
+                        stored_path = self.blob_store.put_file(file_path, referenced=True)
+                        blob_info = {'blob_path': stored_path, 'size': os.path.getsize(stored_path)}
+                    else:
+                        blob_info = self.backend.write_blob(cache_key, cached_filename, file_path)
+
+                    # 같은 키를 덮어쓰는 경우 이전 크기 차감
+                    previous = self.backend.get_entry(cache_key)
+                    if previous:
+                        self.stats.add_bytes(cache_type, -previous.get('size', 0))
+                        if previous.get('blob_path'):
+                            self._release_entry(previous)
+                        elif previous.get('storage') and previous.get('storage') != blob_info.get('storage'):
+                            # inline ↔ ref 로 저장 위치가 바뀌면 예전 위치의 blob 정리
+                            self.backend.delete_blob(previous)
                     
                     # 메타데이터 업데이트
-                    self.metadata[cache_key] = {
-                        'filename': cached_filename,
+                    self.backend.put_entry(cache_key, {
+                        **blob_info,
                         'content_hash': cache_key,
                         'cache_type': cache_type,
                         'created_at': pd.Timestamp.now().isoformat(),
                         'last_accessed': pd.Timestamp.now().isoformat()
-                    }
+                    })
+                    self.stats.record(cache_type, "inserts")
+                    self.stats.add_bytes(cache_type, blob_info['size'])
                     
                     # 캐시 크기 관리
                     self._manage_cache_size()
-                    self._save_metadata()
                     
-                    return str(cached_path)
+                    return self._entry_path(blob_info) or file_path
             except Exception as e:
                 logging.error(f"파일 캐싱 실패: {e}")
         
@@ -109,23 +309,24 @@ class CacheManager:
     
     def _manage_cache_size(self):
         """캐시 크기 관리 - LRU 방식으로 오래된 파일 삭제"""
-        if len(self.metadata) <= Config.MAX_CACHE_SIZE:
+        if len(self.backend) <= Config.MAX_CACHE_SIZE:
             return
         
         # 마지막 접근 시간 기준으로 정렬
         sorted_items = sorted(
-            self.metadata.items(),
+            self.backend.entries(),
             key=lambda x: x[1]['last_accessed']
         )
         
         # 오래된 파일들 삭제
-        items_to_remove = sorted_items[:len(self.metadata) - Config.MAX_CACHE_SIZE]
+        items_to_remove = sorted_items[:len(sorted_items) - Config.MAX_CACHE_SIZE]
         
         for cache_key, metadata in items_to_remove:
             try:
-                file_path = self.cache_dir / metadata['filename']
-                if file_path.exists():
-                    file_path.unlink()
-                del self.metadata[cache_key]
+                self._release_entry(metadata)
+                self.backend.delete_entry(cache_key)
+                cache_type = metadata.get('cache_type', 'unknown')
+                self.stats.add_bytes(cache_type, -metadata.get('size', 0))
+                self.stats.record(cache_type, "evictions")
             except Exception as e:
                 logging.error(f"캐시 파일 삭제 실패: {e}")
@@ -0,0 +1,294 @@
+import os
+import json
+import hashlib
+import shutil
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterator, Tuple
+
+# redis 는 멀티 호스트 구성에서만 필요하므로 선택적 의존성으로 처리
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis 미설치 환경
+    redis = None
+
+
+# 캐시 저장소 인터페이스
+class CacheBackend:
+    """CacheManager 가 사용하는 저장소 인터페이스
+
+    엔트리(메타데이터 dict)와 파일 데이터(blob)를 함께 관리한다.
+    blob_path()는 호출한 노드에서 바로 열 수 있는 로컬 파일 경로를 돌려준다.
+    shared 가 True 인 저장소는 여러 노드가 엔트리를 공유하므로, 이 노드에서 파일을 열 수 없어도 엔트리를 지우지 않는다.
+    """
+
+    shared = False
+
+    def get_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def put_entry(self, key: str, entry: Dict[str, Any]):
+        raise NotImplementedError
+
+    def delete_entry(self, key: str):
+        raise NotImplementedError
+
+    def entries(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        raise NotImplementedError
+
+    def write_blob(self, key: str, filename: str, source_path: str) -> Dict[str, Any]:
+        """source_path 파일을 저장하고 엔트리에 합칠 정보(size 등) 반환"""
+        raise NotImplementedError
+
+    def blob_path(self, entry: Dict[str, Any]) -> Optional[str]:
+        raise NotImplementedError
+
+    def delete_blob(self, entry: Dict[str, Any]):
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.entries())
+
+
+# 로컬 디스크 저장소 (기존 cache/ 디렉토리 구조)
+class LocalDiskCacheBackend(CacheBackend):
+    def __init__(self, cache_dir: str):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.metadata_file = self.cache_dir / "cache_metadata.json"
+        self.metadata = self._load_metadata()
+
+    def _load_metadata(self) -> Dict[str, Any]:
+        """캐시 메타데이터 로드"""
+        if self.metadata_file.exists():
+            try:
+                with open(self.metadata_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                logging.warning(f"캐시 메타데이터 로드 실패: {e}")
+        return {}
+
+    def _save_metadata(self):
+        """캐시 메타데이터 저장"""
+        try:
+            with open(self.metadata_file, 'w', encoding='utf-8') as f:
+                json.dump(self.metadata, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logging.error(f"캐시 메타데이터 저장 실패: {e}")
+
+    def get_entry(self, key):
+        return self.metadata.get(key)
+
+    def put_entry(self, key, entry):
+        self.metadata[key] = entry
+        self._save_metadata()
+
+    def delete_entry(self, key):
+        if self.metadata.pop(key, None) is not None:
+            self._save_metadata()
+
+    def entries(self):
+        return iter(list(self.metadata.items()))
+
+    def write_blob(self, key, filename, source_path):
+        cached_path = self.cache_dir / filename
+        shutil.copy2(source_path, cached_path)
+        return {'filename': filename, 'size': cached_path.stat().st_size}
+
+    def blob_path(self, entry):
+        if not entry.get('filename'):
+            return None
+        file_path = self.cache_dir / entry['filename']
+        return str(file_path) if file_path.exists() else None
+
+    def delete_blob(self, entry):
+        if entry.get('filename'):
+            file_path = self.cache_dir / entry['filename']
+            if file_path.exists():
+                file_path.unlink()
+
+    def __len__(self):
+        return len(self.metadata)
+
+
+# 메모리 저장소 (테스트 및 단일 프로세스용)
+class MemoryCacheBackend(CacheBackend):
+    def __init__(self, materialize_dir: Optional[str] = None):
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._blobs: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        # st.image 등은 파일 경로를 요구하므로 조회 시 임시 디렉토리에 파일로 꺼내 둔다
+        self.materialize_dir = Path(materialize_dir or tempfile.mkdtemp(prefix="fairytale_cache_"))
+        self.materialize_dir.mkdir(parents=True, exist_ok=True)
+
+    def get_entry(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return dict(entry) if entry is not None else None
+
+    def put_entry(self, key, entry):
+        with self._lock:
+            self._entries[key] = dict(entry)
+
+    def delete_entry(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def entries(self):
+        with self._lock:
+            return iter([(key, dict(entry)) for key, entry in self._entries.items()])
+
+    def write_blob(self, key, filename, source_path):
+        with open(source_path, 'rb') as f:
+            data = f.read()
+        with self._lock:
+            self._blobs[filename] = data
+        stale_path = self.materialize_dir / filename
+        if stale_path.exists():
+            stale_path.unlink()
+        return {'filename': filename, 'size': len(data)}
+
+    def blob_path(self, entry):
+        filename = entry.get('filename')
+        with self._lock:
+            data = self._blobs.get(filename) if filename else None
+        if data is None:
+            return None
+        file_path = self.materialize_dir / filename
+        if not file_path.exists():
+            file_path.write_bytes(data)
+        return str(file_path)
+
+    def delete_blob(self, entry):
+        filename = entry.get('filename')
+        if not filename:
+            return
+        with self._lock:
+            self._blobs.pop(filename, None)
+        file_path = self.materialize_dir / filename
+        if file_path.exists():
+            file_path.unlink()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Redis 프로토콜 저장소 (여러 노드가 같은 캐시를 공유)
+class RedisCacheBackend(CacheBackend):
+    """작은 blob 은 Redis 에 직접(inline), 큰 blob 은 객체 저장소(S3 등)에 두고 키만(ref) 저장
+
+    엔트리에 내용 SHA-256 을 함께 기록하고, 각 노드는 조회 시 materialize_dir 에 `<키>.<해시 앞 16자><확장자>` 로 꺼내 둔다.
+    다른 노드가 같은 키를 덮어쓰면 해시가 바뀌므로 예전 사본을 쓰지 않는다.
+    객체 저장소가 없으면 큰 blob 도 Redis 에 저장한다. (노드 로컬 디렉토리는 다른 노드에서 열 수 없음)
+    """
+
+    shared = True
+
+    def __init__(
+        self,
+        url: str = "redis://localhost:6379/0",
+        client=None,
+        prefix: str = "fairytale:cache",
+        inline_limit: int = 256 * 1024,
+        blob_storage=None,
+        materialize_dir: str = "cache",
+    ):
+        if client is None:
+            if redis is None:
+                raise RuntimeError("redis 패키지가 설치되어 있지 않습니다. (pip install redis)")
+            client = redis.Redis.from_url(url)
+        self.client = client  # fakeredis.FakeRedis() 등 호환 클라이언트 주입 가능
+        self.prefix = prefix
+        self.inline_limit = inline_limit
+        self.blob_storage = blob_storage  # controllers.storage.StorageBackend (모든 노드가 같은 객체를 읽을 수 있어야 함)
+        self.materialize_dir = Path(materialize_dir)
+        self.materialize_dir.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def _meta_key(self) -> str:
+        return f"{self.prefix}:meta"
+
+    def _blob_key(self, filename: str) -> str:
+        return f"{self.prefix}:blob:{filename}"
+
+    def get_entry(self, key):
+        raw = self.client.hget(self._meta_key, key)
+        return json.loads(raw) if raw else None
+
+    def put_entry(self, key, entry):
+        self.client.hset(self._meta_key, key, json.dumps(entry, ensure_ascii=False))
+
+    def delete_entry(self, key):
+        self.client.hdel(self._meta_key, key)
+
+    def entries(self):
+        for key, raw in self.client.hgetall(self._meta_key).items():
+            key = key.decode() if isinstance(key, bytes) else key
+            yield key, json.loads(raw)
+
+    def write_blob(self, key, filename, source_path):
+        with open(source_path, 'rb') as f:
+            data = f.read()
+        info = {'filename': filename, 'size': len(data), 'digest': hashlib.sha256(data).hexdigest()}
+        if len(data) <= self.inline_limit or self.blob_storage is None:
+            self.client.set(self._blob_key(filename), data)
+            return {**info, 'storage': 'inline'}
+
+        self.blob_storage.write_bytes(data, filename)
+        return {**info, 'storage': 'ref', 'ref': filename}
+
+    def _local_path(self, entry: Dict[str, Any]) -> Path:
+        """이 노드에 꺼내 둘 사본 경로 (내용이 바뀌면 경로도 바뀜)"""
+        filename = Path(entry['filename'])
+        return self.materialize_dir / f"{filename.stem}.{entry.get('digest', '')[:16]}{filename.suffix}"
+
+    def _remove_local_copies(self, filename: str, keep: Optional[Path] = None):
+        name = Path(filename)
+        for path in self.materialize_dir.glob(f"{name.stem}.*{name.suffix}"):
+            if path != keep:
+                path.unlink(missing_ok=True)
+
+    def _read_blob(self, entry: Dict[str, Any]) -> Optional[bytes]:
+        if entry.get('storage') == 'ref':
+            if self.blob_storage is None:
+                return None
+            try:
+                return self.blob_storage.read(entry['ref'])
+            except Exception as e:
+                logging.warning(f"캐시 파일 읽기 실패 ({entry['ref']}): {e}")
+                return None
+        return self.client.get(self._blob_key(entry['filename']))
+
+    def blob_path(self, entry):
+        """이 노드의 사본 경로, 원본을 읽을 수 없거나 내용이 엔트리와 다르면 None (공유 엔트리는 그대로 둠)"""
+        if not entry.get('filename'):
+            return None
+        file_path = self._local_path(entry)
+        if file_path.exists():
+            return str(file_path)
+        data = self._read_blob(entry)
+        # 다른 노드가 엔트리를 덮어쓰는 중이면 blob 과 엔트리의 해시가 다를 수 있음
+        if data is None or ('digest' in entry and hashlib.sha256(data).hexdigest() != entry['digest']):
+            return None
+        fd, temp_path = tempfile.mkstemp(dir=self.materialize_dir, suffix=".tmp")
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, file_path)
+        self._remove_local_copies(entry['filename'], keep=file_path)
+        return str(file_path)
+
+    def delete_blob(self, entry):
+        filename = entry.get('filename')
+        if not filename:
+            return
+        if entry.get('storage') == 'ref':
+            if self.blob_storage is not None:
+                self.blob_storage.delete(entry['ref'])
+        else:
+            self.client.delete(self._blob_key(filename))
+        self._remove_local_copies(filename)
+
+    def __len__(self):
+        return self.client.hlen(self._meta_key)
@@ -0,0 +1,109 @@
+from fastapi import Request, Depends, HTTPException, APIRouter
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from jinja2 import TemplateError
+from models_dir.models import User, Role, EmailCampaign, EmailCampaignFailure # 모델 import
+from scheme_files.campaigns_schemes import CampaignCreate, CampaignResponse, CampaignFailuresResponse
+from controllers.dependencies import get_async_db # 의존성 import
+from emails.campaigns import create_campaign, campaign_progress, CAMPAIGN_FINISHED
+import logging
+import os
+
+router = APIRouter()
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CAMPAIGN_ADMIN_ROLE = os.getenv('CAMPAIGN_ADMIN_ROLE', 'admin')  # 캠페인을 등록/취소할 수 있는 역할 이름
+
+
+# 관리자 확인 (세션의 사용자 역할로 판단)
+async def require_admin(request: Request, db: AsyncSession) -> int:
+    user_id = request.session.get("id")
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Not Authorized")
+    role_name = (await db.execute(
+        select(Role.role_name).join(User, User.role_id == Role.id).where(User.id == user_id)
+    )).scalar()
+    if role_name != CAMPAIGN_ADMIN_ROLE:
+        logger.warning(f"캠페인 권한 없음: 사용자 ID {user_id}")
+        raise HTTPException(status_code=403, detail="권한이 없습니다.")
+    return user_id
+
+
+def _campaign_response(campaign: EmailCampaign) -> dict:
+    return {
+        "id": campaign.id, "template": campaign.template, "status": campaign.status,
+        "total": campaign.total, "sent": campaign.sent, "failed": campaign.failed,
+        "last_error": campaign.last_error, "created_at": campaign.created_at,
+        "started_at": campaign.started_at, "finished_at": campaign.finished_at,
+        **campaign_progress(campaign),
+    }
+
+
+async def _get_campaign(db: AsyncSession, campaign_id: int) -> EmailCampaign:
+    campaign = await db.get(EmailCampaign, campaign_id)
+    if campaign is None:
+        raise HTTPException(status_code=404, detail="캠페인을 찾을 수 없습니다.")
+    return campaign
+
+
+# 캠페인 등록 (발송은 캠페인 워커가 담당하고 바로 응답)
+@router.post("/campaigns", response_model=CampaignResponse)
+async def register_campaign(request: Request, req: CampaignCreate, db: AsyncSession = Depends(get_async_db)):
+    admin_id = await require_admin(request, db)
+    try:
+        campaign = await db.run_sync(create_campaign, req.template, req.params, admin_id)
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"알 수 없는 템플릿입니다: {req.template}")
+    except TemplateError as e:
+        raise HTTPException(status_code=400, detail=f"템플릿 변수가 올바르지 않습니다: {e}")
+    try:
+        await db.commit()
+        await db.refresh(campaign)
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"캠페인 등록 실패: {e}")
+        raise HTTPException(status_code=500, detail="캠페인 등록에 실패하였습니다.")
+    logger.info(f"캠페인 {campaign.id} 등록: {campaign.template} (관리자 {admin_id})")
+    return _campaign_response(campaign)
+
+
+# 캠페인 진행 상황 조회
+@router.get("/campaigns/{campaign_id}", response_model=CampaignResponse)
+async def get_campaign(request: Request, campaign_id: int, db: AsyncSession = Depends(get_async_db)):
+    await require_admin(request, db)
+    return _campaign_response(await _get_campaign(db, campaign_id))
+
+
+# 캠페인 발송 실패 목록 (ID 기준 페이지 조회)
+@router.get("/campaigns/{campaign_id}/failures", response_model=CampaignFailuresResponse)
+async def get_campaign_failures(request: Request, campaign_id: int, after_id: int = 0, limit: int = 100,
+                                db: AsyncSession = Depends(get_async_db)):
+    await require_admin(request, db)
+    limit = max(1, min(limit, 1000))
+    rows = (await db.execute(
+        select(EmailCampaignFailure)
+        .where(EmailCampaignFailure.campaign_id == campaign_id, EmailCampaignFailure.id > after_id)
+        .order_by(EmailCampaignFailure.id)
+        .limit(limit + 1)
+    )).scalars().all()
+    items = [{"id": row.id, "user_id": row.user_id, "recipient": row.recipient, "error": row.error} for row in rows[:limit]]
+    return {"items": items, "next_after_id": items[-1]["id"] if len(rows) > limit else None}
+
+
+# 캠페인 취소 (발송 중이면 현재 묶음까지만 보내고 중단)
+@router.post("/campaigns/{campaign_id}/cancel", response_model=CampaignResponse)
+async def cancel_campaign(request: Request, campaign_id: int, db: AsyncSession = Depends(get_async_db)):
+    await require_admin(request, db)
+    await db.execute(
+        update(EmailCampaign)
+        .where(EmailCampaign.id == campaign_id, EmailCampaign.status.notin_(CAMPAIGN_FINISHED))
+        .values(status="cancelled", finished_at=func.now())
+    )
+    await db.commit()
+    campaign = await _get_campaign(db, campaign_id)
+    await db.refresh(campaign)
+    logger.info(f"캠페인 {campaign_id} 취소 요청: {campaign.status}")
+    return _campaign_response(campaign)
@@ -0,0 +1,49 @@
+import logging
+from typing import Optional, Iterable
+from sqlalchemy import select, delete
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from models_dir.models import Story, StoryContent
+from models_dir.content_codec import content_hash, compress_text
+
+
+# 동화 본문 저장 (같은 내용은 한 번만 저장)
+def get_or_create_content(db: Session, text: str) -> StoryContent:
+    """본문을 압축해 story_contents 에 저장하고 행 반환 (이미 있으면 기존 행, 커밋은 호출자가 담당)"""
+    digest = content_hash(text)
+    existing = db.get(StoryContent, digest)
+    if existing is not None:
+        return existing
+
+    codec, data = compress_text(text)
+    row = StoryContent(hash=digest, codec=codec, data=data, size=len(text.encode("utf-8")))
+    try:
+        # 호출자의 트랜잭션은 유지하도록 savepoint 사용
+        with db.begin_nested():
+            db.add(row)
+        logging.info(f"동화 본문 저장: {digest[:12]} ({row.size} → {len(data)} bytes, {codec})")
+        return row
+    except IntegrityError:
+        # 다른 요청이 먼저 같은 본문을 저장한 경우
+        return db.get(StoryContent, digest)
+
+
+def unreferenced_contents():
+    """어떤 동화도 참조하지 않는 본문 조건"""
+    referenced = select(Story.content_hash).where(Story.content_hash.is_not(None))
+    return StoryContent.hash.not_in(referenced)
+
+
+# 동화 삭제 후 본문 정리
+def delete_unreferenced_contents(db: Session, hashes: Optional[Iterable[Optional[str]]] = None) -> int:
+    """참조가 없어진 본문 삭제, 삭제한 수 반환 (hashes 를 주면 그 본문만 확인, 커밋은 호출자가 담당)
+
+    탈퇴한 사용자의 동화 본문이 남지 않도록 동화 삭제와 같은 트랜잭션에서 호출한다.
+    """
+    statement = delete(StoryContent).where(unreferenced_contents())
+    if hashes is not None:
+        hashes = {digest for digest in hashes if digest}
+        if not hashes:
+            return 0
+        statement = statement.where(StoryContent.hash.in_(hashes))
+    return db.execute(statement, execution_options={"synchronize_session": False}).rowcount
@@ -1,9 +1,11 @@
 from sqlalchemy.orm import sessionmaker, Session, relationship
-from passlib.context import CryptContext
-from models_dir.database import SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator
+from models_dir.database import SessionLocal, AsyncSessionLocal
+from controllers.password_hasher import build_context
 
-# passlib 사용한 사용자 인증
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# passlib 사용한 사용자 인증 (동기 코드용, async 라우트는 password_hasher 사용)
+pwd_context = build_context()
 
 def get_db():
     db = SessionLocal()
@@ -12,6 +14,10 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def get_password_hash(password:str) -> str:
     return pwd_context.hash(password)
 
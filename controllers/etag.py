@@ -0,0 +1,32 @@
+import hashlib
+from typing import Any
+from fastapi import Request, Response
+
+# 브라우저/프록시가 재검증 없이 쓰지 않도록 매번 If-None-Match 로 확인하게 함
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(user_id: int, version: int, *parts: Any) -> str:
+    """사용자 데이터 버전과 요청 파라미터로 만든 weak ETag (데이터가 바뀌면 version 이 증가)"""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:12]
+    return f'W/"u{user_id}-v{version}-{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match 에 같은 ETag 가 있는지 (weak 비교)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    expected = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == expected for candidate in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
@@ -0,0 +1,101 @@
+import time
+import threading
+from typing import Any, Callable, Dict, List, Optional
+from cachetools import TTLCache
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from models_dir.models import User, Baby
+from controllers.cache import Config, cache_stats
+
+USER_PROFILE = "user_profile"
+BABY_LIST = "baby_list"
+
+
+def _user_profile(user: User) -> Dict[str, Any]:
+    # 비밀번호 해시는 캐시에 두지 않음
+    return {"id": user.id, "username": user.username, "nickname": user.nickname, "email": user.email, "role_id": user.role_id}
+
+
+def _baby_item(baby: Baby) -> Dict[str, Any]:
+    return {"id": baby.id, "baby_name": baby.baby_name, "baby_gender": baby.baby_gender, "baby_bday": str(baby.baby_bday)}
+
+
+# 사용자/아이 정보 읽기 캐시
+class IdentityCache:
+    """사용자 프로필과 아이 목록을 user_id 기준으로 TTL 동안 메모리에 보관 (프로세스 단위)
+
+    값은 세션과 무관한 dict 로 저장하며, 없는 사용자(None)는 캐시하지 않는다.
+    아이 목록은 (데이터 버전, 목록) 으로 저장해 ETag 응답이 다른 프로세스의 오래된 목록을 쓰지 않게 한다.
+    변경 시 invalidate_user() 로 즉시 제거하고, 다른 프로세스의 변경은 TTL 이 지나면 반영된다.
+    """
+
+    def __init__(self, maxsize: int = Config.IDENTITY_CACHE_SIZE):
+        self._lock = threading.Lock()
+        self._caches = {
+            USER_PROFILE: TTLCache(maxsize=maxsize, ttl=Config.USER_CACHE_TTL),
+            BABY_LIST: TTLCache(maxsize=maxsize, ttl=Config.BABY_CACHE_TTL),
+        }
+
+    def get(self, kind: str, user_id: int) -> Optional[Any]:
+        started = time.perf_counter()
+        with self._lock:
+            value = self._caches[kind].get(user_id)
+        cache_stats.record(kind, "hits" if value is not None else "misses", str(user_id))
+        cache_stats.record_latency(kind, time.perf_counter() - started)
+        return value
+
+    def put(self, kind: str, user_id: int, value: Any):
+        if value is None:
+            return
+        with self._lock:
+            self._caches[kind][user_id] = value
+        cache_stats.record(kind, "inserts")
+
+    def invalidate_user(self, user_id: int, kinds=(USER_PROFILE, BABY_LIST)):
+        with self._lock:
+            for kind in kinds:
+                self._caches[kind].pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            for cache in self._caches.values():
+                cache.clear()
+
+    def read_through(self, kind: str, user_id: int, loader: Callable[[], Any]) -> Any:
+        value = self.get(kind, user_id)
+        if value is None:
+            value = loader()
+            self.put(kind, user_id, value)
+        return value
+
+
+# 전역 사용자/아이 정보 캐시
+identity_cache = IdentityCache()
+
+
+# 동기 세션용 (Streamlit 페이지, 동기 컨트롤러)
+def get_user_profile(db: Session, user_id: int) -> Optional[Dict[str, Any]]:
+    def load():
+        user = db.get(User, user_id)
+        return _user_profile(user) if user else None
+    return identity_cache.read_through(USER_PROFILE, user_id, load)
+
+
+def get_baby_list(db: Session, user_id: int) -> List[Dict[str, Any]]:
+    def load():
+        babies = db.query(Baby).filter(Baby.user_id == user_id).order_by(Baby.id).all()
+        return None, [_baby_item(baby) for baby in babies]
+    return identity_cache.read_through(BABY_LIST, user_id, load)[1]
+
+
+# 비동기 세션용 (async 라우트)
+async def get_baby_list_async(db: AsyncSession, user_id: int, version: Optional[int] = None) -> List[Dict[str, Any]]:
+    """version 을 주면 같은 버전으로 캐시된 목록만 사용"""
+    cached = identity_cache.get(BABY_LIST, user_id)
+    if cached is not None and (version is None or cached[0] == version):
+        return cached[1]
+    rows = (await db.execute(select(Baby).where(Baby.user_id == user_id).order_by(Baby.id))).scalars().all()
+    babies = [_baby_item(baby) for baby in rows]
+    identity_cache.put(BABY_LIST, user_id, (version, babies))
+    return babies
@@ -0,0 +1,263 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from controllers.cache import Config, cache_stats
+from controllers.rate_limit import MemoryRateLimitBackend, parse_rate
+from controllers.music_controller import search_tracks_by_tag, THEME_KEYWORDS as MUSIC_THEMES
+from controllers.video_controller import search_videos, THEME_KEYWORDS as VIDEO_THEMES
+
+logger = logging.getLogger(__name__)
+
+MUSIC = "music"
+VIDEO = "video"
+
+# 테마 키워드 → 테마 이름 (search_videos 는 테마 이름을 받음)
+_VIDEO_THEME_NAMES = {keyword: theme for theme, keyword in VIDEO_THEMES.items()}
+
+# (종류, 검색 키워드)
+CatalogKey = Tuple[str, str]
+
+
+def _fetch_music(keyword: str) -> Optional[List[Dict[str, Any]]]:
+    return search_tracks_by_tag(keyword)
+
+
+def _fetch_video(keyword: str) -> Optional[List[Dict[str, Any]]]:
+    return search_videos(_VIDEO_THEME_NAMES[keyword])
+
+
+# 자장가 음악/영상 목록 카탈로그
+class MediaCatalog:
+    """테마별 Jamendo/YouTube 검색 결과를 미리 받아 메모리에서 제공 (TTL + stale-while-revalidate)
+
+    - TTL 이내: 메모리 결과 그대로 반환
+    - TTL 이 지났지만 STALE_TTL 이내: 기존 결과를 바로 반환하고 백그라운드에서 갱신
+    - 외부 API 실패/빈 결과: 기존 결과 유지, NEGATIVE_CACHE_TTL 동안 다시 호출하지 않음
+    같은 키를 동시에 갱신하지 않으며(single-flight), 스케줄러가 TTL 이 다 되기 전에 테마 전체를 미리 갱신한다.
+    테마 목록에 없는 음악 검색어는 MEDIA_CATALOG_EXTRA_RATE 한도 안에서만 외부 API 를 호출하고, 한도를 넘으면 기존 결과(없으면 빈 목록)를 반환한다.
+    """
+
+    def __init__(self, fetchers: Optional[Dict[str, Callable[[str], Optional[list]]]] = None,
+                 ttl: int = Config.MEDIA_CATALOG_TTL, stale_ttl: int = Config.MEDIA_CATALOG_STALE_TTL,
+                 snapshot_path: Optional[str] = Config.MEDIA_CATALOG_SNAPSHOT,
+                 extra_rate: str = Config.MEDIA_CATALOG_EXTRA_RATE):
+        self.fetchers = fetchers or {MUSIC: _fetch_music, VIDEO: _fetch_video}
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.snapshot_path = snapshot_path
+        self._entries: Dict[CatalogKey, Dict[str, Any]] = {}
+        self._extra_keys: "OrderedDict[CatalogKey, None]" = OrderedDict()  # 테마 목록에 없는 음악 검색어 (LRU)
+        self._extra_rate = parse_rate(extra_rate)
+        self._extra_bucket = MemoryRateLimitBackend(max_keys=1)
+        self._failed_at: Dict[CatalogKey, float] = {}
+        self._inflight: Dict[CatalogKey, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="media-catalog")
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._snapshot_mtime = 0.0
+        self._theme_keys = set(self.catalog_keys())
+        self.stats: Counter = Counter()
+
+    # 미리 받아 둘 키 (모든 테마 × 음악/영상)
+    @staticmethod
+    def catalog_keys() -> List[CatalogKey]:
+        return [(MUSIC, keyword) for keyword in MUSIC_THEMES.values()] + [(VIDEO, keyword) for keyword in VIDEO_THEMES.values()]
+
+    @staticmethod
+    def resolve(kind: str, theme: str) -> Optional[CatalogKey]:
+        """테마 이름 또는 키워드를 카탈로그 키로 변환 (영상은 정해진 테마만 지원)"""
+        themes = MUSIC_THEMES if kind == MUSIC else VIDEO_THEMES
+        keyword = themes.get(theme, theme)
+        if kind == VIDEO and keyword not in _VIDEO_THEME_NAMES:
+            return None
+        return (kind, keyword) if keyword else None
+
+    def get(self, kind: str, theme: str) -> List[Dict[str, Any]]:
+        key = self.resolve(kind, theme)
+        if key is None:
+            return []
+        started = time.perf_counter()
+        cache_type = f"media_{kind}"
+        entry = self._entries.get(key)
+        age = time.time() - entry["fetched_at"] if entry else None
+        if entry and age < self.ttl:
+            cache_stats.record(cache_type, "hits", key[1])
+        elif entry and age < self.stale_ttl:
+            # 오래된 결과를 바로 주고 갱신은 백그라운드에서
+            cache_stats.record(cache_type, "hits", key[1])
+            self.count("stale_served")
+            if key not in self._inflight and self._allow_upstream(key):
+                self._executor.submit(self.refresh, key)
+        else:
+            cache_stats.record(cache_type, "misses")
+            if self._allow_upstream(key):
+                entry = self.refresh(key) or entry
+        cache_stats.record_latency(cache_type, time.perf_counter() - started)
+        if key not in self._theme_keys:
+            self._touch_extra(key)
+        return entry["results"] if entry else []
+
+    def _allow_upstream(self, key: CatalogKey) -> bool:
+        """테마 키는 항상 허용, 그 외 검색어는 전체 공유 토큰 버킷으로 외부 호출 횟수 제한"""
+        if key in self._theme_keys:
+            return True
+        allowed, _ = self._extra_bucket.take("extra", *self._extra_rate)
+        if not allowed:
+            self.count("extra_rate_limited")
+        return allowed
+
+    def _touch_extra(self, key: CatalogKey):
+        """테마 목록에 없는 검색어는 최근 사용한 것만 메모리에 유지 (스케줄러는 갱신하지 않음)"""
+        with self._lock:
+            self._extra_keys[key] = None
+            self._extra_keys.move_to_end(key)
+            while len(self._extra_keys) > Config.MEDIA_CATALOG_EXTRA_SIZE:
+                old_key, _ = self._extra_keys.popitem(last=False)
+                self._entries.pop(old_key, None)
+                self._failed_at.pop(old_key, None)
+                cache_stats.record(f"media_{old_key[0]}", "evictions")
+
+    def refresh(self, key: CatalogKey) -> Optional[Dict[str, Any]]:
+        """외부 API 로 키 하나 갱신 (같은 키를 이미 갱신 중이면 그 결과를 기다림), 갱신 후 항목 반환"""
+        with self._lock:
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+        if not leader:
+            event.wait(30)
+            return self._entries.get(key)
+        try:
+            failed_at = self._failed_at.get(key)
+            if failed_at and time.time() - failed_at < Config.NEGATIVE_CACHE_TTL:
+                cache_stats.record(f"media_{key[0]}", "negative_hits")
+                return self._entries.get(key)
+            self.count(f"upstream_{key[0]}")
+            try:
+                results = self.fetchers[key[0]](key[1])
+            except Exception as e:
+                logger.warning(f"자장가 {key[0]} 목록 갱신 실패 ({key[1]}): {e}")
+                results = None
+            return self._store(key, results)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def _store(self, key: CatalogKey, results: Optional[list]) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        if results:
+            cache_stats.record(f"media_{key[0]}", "inserts")
+        else:
+            self.count("upstream_failures" if results is None else "upstream_empty")
+        with self._lock:
+            if results:
+                self._entries[key] = {"results": results, "fetched_at": now}
+                self._failed_at.pop(key, None)
+            else:
+                # 실패나 빈 결과는 기존 목록을 덮어쓰지 않음 (빈 결과만 있던 키는 NEGATIVE_CACHE_TTL 동안만 유지)
+                self._failed_at[key] = now
+                if key not in self._entries and results is not None:
+                    self._entries[key] = {"results": [], "fetched_at": now - self.ttl + Config.NEGATIVE_CACHE_TTL}
+            return self._entries.get(key)
+
+    def refresh_due(self) -> int:
+        """TTL 의 80% 가 지난(또는 없는) 테마를 갱신, 갱신 시도한 키 수 반환"""
+        self.load_snapshot()
+        refresh_after = self.ttl * 0.8
+        now = time.time()
+        due = [key for key in self.catalog_keys()
+               if key not in self._entries or now - self._entries[key]["fetched_at"] >= refresh_after]
+        for key in due:
+            if self._stop_event.is_set():
+                break
+            self.refresh(key)
+        if due:
+            self.save_snapshot()
+        return len(due)
+
+    # 스냅샷 파일 (재시작 시 외부 호출 없이 복원, 같은 파일을 쓰는 다른 워커가 갱신한 결과도 반영)
+    def load_snapshot(self):
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        try:
+            mtime = os.path.getmtime(self.snapshot_path)
+            if mtime <= self._snapshot_mtime:
+                return
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._snapshot_mtime = mtime
+        except (OSError, ValueError) as e:
+            logger.warning(f"자장가 목록 파일 읽기 실패: {e}")
+            return
+        with self._lock:
+            for item in data.get("entries", []):
+                key = (item["kind"], item["keyword"])
+                current = self._entries.get(key)
+                if item["results"] and (current is None or current["fetched_at"] < item["fetched_at"]):
+                    self._entries[key] = {"results": item["results"], "fetched_at": item["fetched_at"]}
+
+    def save_snapshot(self):
+        if not self.snapshot_path:
+            return
+        with self._lock:
+            entries = [
+                {"kind": kind, "keyword": keyword, "fetched_at": entry["fetched_at"], "results": entry["results"]}
+                for (kind, keyword), entry in self._entries.items() if entry["results"]
+            ]
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+            temp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"entries": entries}, f, ensure_ascii=False)
+            os.replace(temp_path, self.snapshot_path)
+            self._snapshot_mtime = os.path.getmtime(self.snapshot_path)
+        except OSError as e:
+            logger.warning(f"자장가 목록 파일 저장 실패: {e}")
+
+    def start(self, check_interval: float = Config.MEDIA_CATALOG_CHECK_INTERVAL):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, args=(check_interval,), name="media-catalog", daemon=True)
+        self._thread.start()
+        logger.info(f"자장가 목록 갱신 스케줄러 시작 (TTL {self.ttl}초)")
+
+    def stop(self, timeout: float = 10):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("자장가 목록 갱신 스케줄러 종료")
+
+    def _run(self, check_interval: float):
+        while not self._stop_event.is_set():
+            try:
+                self.refresh_due()
+            except Exception as e:
+                logger.error(f"자장가 목록 갱신 중 오류: {e}")
+            self._stop_event.wait(check_interval)
+
+    def count(self, key: str, value: int = 1):
+        with self._lock:
+            self.stats[key] += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            entries = {
+                f"{kind}:{keyword}": {"results": len(entry["results"]), "age_seconds": int(now - entry["fetched_at"])}
+                for (kind, keyword), entry in self._entries.items()
+            }
+            stats = dict(self.stats)
+        return {"ttl": self.ttl, "stale_ttl": self.stale_ttl, "counters": stats, "entries": entries}
+
+
+# 전역 자장가 목록 카탈로그
+media_catalog = MediaCatalog()
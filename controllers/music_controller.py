@@ -38,7 +38,7 @@ def search_tracks_by_tag(tag="lullaby", limit=5):
         "audioformat": "mp32"
     }
 
-    response = requests.get(url, params=params)
+    response = requests.get(url, params=params, timeout=10)
     if response.status_code == 200:
         return response.json()["results"]
     else:
@@ -0,0 +1,23 @@
+import json
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+
+
+# 키셋 페이지네이션 커서
+def encode_cursor(created_at: datetime, story_id: int) -> str:
+    """마지막 항목의 (created_at, id)를 URL 에 넣을 수 있는 문자열로 변환"""
+    raw = json.dumps({"c": created_at.isoformat(), "i": story_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """커서를 (created_at, id)로 변환 (형식이 잘못되면 ValueError)"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data["c"]), int(data["i"])
+    except Exception as e:
+        raise ValueError(f"잘못된 커서입니다: {cursor}") from e
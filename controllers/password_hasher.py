@@ -0,0 +1,104 @@
+import os
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+# 비밀번호 해시 설정 (값을 바꾸면 다음 로그인 때 새 설정으로 다시 해시됨)
+PASSWORD_SCHEME = os.getenv('PASSWORD_SCHEME', 'argon2')  # 새 해시에 쓸 방식 (argon2 / bcrypt)
+PASSWORD_BCRYPT_ROUNDS = int(os.getenv('PASSWORD_BCRYPT_ROUNDS', '12'))  # bcrypt work factor (2^rounds)
+PASSWORD_ARGON2_TIME_COST = int(os.getenv('PASSWORD_ARGON2_TIME_COST', '3'))  # argon2 반복 횟수
+PASSWORD_ARGON2_MEMORY_COST = int(os.getenv('PASSWORD_ARGON2_MEMORY_COST', '65536'))  # argon2 메모리 (KiB)
+PASSWORD_ARGON2_PARALLELISM = int(os.getenv('PASSWORD_ARGON2_PARALLELISM', '2'))  # argon2 병렬도
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))  # 해시 전용 프로세스 수
+PASSWORD_HASH_EXECUTOR = os.getenv('PASSWORD_HASH_EXECUTOR', 'process')  # process / thread
+
+SUPPORTED_SCHEMES = ("argon2", "bcrypt")
+
+
+def build_context() -> CryptContext:
+    """현재 설정의 CryptContext (기본 방식 외의 해시와 설정이 다른 해시는 needs_update 대상)"""
+    if PASSWORD_SCHEME not in SUPPORTED_SCHEMES:
+        raise ValueError(f"지원하지 않는 PASSWORD_SCHEME 입니다: {PASSWORD_SCHEME}")
+    schemes = [PASSWORD_SCHEME] + [scheme for scheme in SUPPORTED_SCHEMES if scheme != PASSWORD_SCHEME]
+    return CryptContext(
+        schemes=schemes,
+        deprecated="auto",
+        bcrypt__rounds=PASSWORD_BCRYPT_ROUNDS,
+        argon2__time_cost=PASSWORD_ARGON2_TIME_COST,
+        argon2__memory_cost=PASSWORD_ARGON2_MEMORY_COST,
+        argon2__parallelism=PASSWORD_ARGON2_PARALLELISM,
+    )
+
+
+# 워커 프로세스에서 실행되는 함수 (프로세스마다 컨텍스트를 한 번만 생성)
+_worker_context: Optional[CryptContext] = None
+
+
+def _context() -> CryptContext:
+    global _worker_context
+    if _worker_context is None:
+        _worker_context = build_context()
+    return _worker_context
+
+
+def _hash(password: str) -> str:
+    return _context().hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    try:
+        return _context().verify_and_update(password, hashed_password)
+    except ValueError:
+        # 알 수 없는 형식의 해시는 인증 실패로 처리
+        return False, None
+
+
+# 비밀번호 해시 서비스
+class PasswordHasher:
+    """bcrypt/argon2 계산을 별도 프로세스에서 실행해 이벤트 루프를 막지 않도록 하는 서비스"""
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, executor_type: str = PASSWORD_HASH_EXECUTOR):
+        self.workers = max(1, workers)
+        self.executor_type = executor_type
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "thread":
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hasher")
+            else:
+                # 실행 중인 서버 프로세스를 fork 하지 않도록 spawn 사용
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_context,
+                )
+            logger.info(f"비밀번호 해시 워커 시작: {self.executor_type} {self.workers}개 ({PASSWORD_SCHEME})")
+        return self._executor
+
+    async def hash(self, password: str) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), _hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """(일치 여부, 새 해시) 반환, 새 해시는 방식이나 설정이 바뀌어 다시 저장해야 할 때만 반환"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), _verify_and_update, password, hashed_password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        valid, _ = await self.verify_and_update(password, hashed_password)
+        return valid
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# 전역 비밀번호 해시 서비스
+password_hasher = PasswordHasher()
@@ -0,0 +1,181 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict, Counter
+from typing import Dict, List, Optional, Tuple
+from fastapi import Request, HTTPException
+
+# redis 는 여러 워커/호스트가 한도를 공유할 때만 필요하므로 선택적 의존성으로 처리
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis 미설치 환경
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# 요청 제한 설정
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')  # memory / redis
+RATE_LIMIT_REDIS_URL = os.getenv('RATE_LIMIT_REDIS_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', '100000'))  # 메모리 백엔드가 기억하는 최대 버킷 수
+RATE_LIMIT_TRUST_PROXY = os.getenv('RATE_LIMIT_TRUST_PROXY', 'false').lower() == 'true'  # X-Forwarded-For 의 첫 IP 사용 여부
+
+
+def parse_rate(value: str) -> Tuple[int, float]:
+    """"5/60" → (버킷 크기 5, 60초마다 5개 충전)"""
+    capacity, _, period = value.partition("/")
+    return int(capacity), float(period or 60)
+
+
+# 경로별 한도: (기준, 환경변수, 기본값) - 기준은 ip 또는 요청 본문의 식별자(아이디/이메일)
+RATE_LIMIT_RULES: Dict[str, List[Tuple[str, Tuple[int, float]]]] = {
+    "login": [
+        ("ip", parse_rate(os.getenv('RATE_LIMIT_LOGIN_IP', '20/60'))),
+        ("account", parse_rate(os.getenv('RATE_LIMIT_LOGIN_ACCOUNT', '5/300'))),
+    ],
+    "reset_password": [
+        ("ip", parse_rate(os.getenv('RATE_LIMIT_RESET_IP', '5/300'))),
+        ("account", parse_rate(os.getenv('RATE_LIMIT_RESET_ACCOUNT', '3/3600'))),
+    ],
+    "find_id": [
+        ("ip", parse_rate(os.getenv('RATE_LIMIT_FIND_ID_IP', '5/300'))),
+        ("account", parse_rate(os.getenv('RATE_LIMIT_FIND_ID_ACCOUNT', '3/3600'))),
+    ],
+}
+
+
+# 토큰 버킷 저장소 인터페이스
+class RateLimitBackend:
+    def take(self, key: str, capacity: int, period: float) -> Tuple[bool, float]:
+        """토큰 하나 사용 시도, (허용 여부, 다음 토큰까지 남은 초) 반환"""
+        raise NotImplementedError
+
+
+# 프로세스 메모리 저장소 (단일 워커)
+class MemoryRateLimitBackend(RateLimitBackend):
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, key, capacity, period):
+        rate = capacity / period
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            # 가장 오래 쓰이지 않은 버킷부터 제거 (오래된 버킷은 이미 가득 찬 상태와 같음)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+
+# Redis 저장소 (여러 워커/호스트가 한도 공유)
+class RedisRateLimitBackend(RateLimitBackend):
+    # 충전 계산과 차감을 한 번에 처리 (서버 시간을 사용해 워커 간 시계 차이 영향 없음)
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local time = redis.call('TIME')
+    local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + (now - updated) * rate)
+    local allowed = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate))
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url: str = RATE_LIMIT_REDIS_URL, client=None, prefix: str = "fairytale:ratelimit"):
+        if client is None:
+            if redis is None:
+                raise RuntimeError("redis 패키지가 설치되어 있지 않습니다. (pip install redis)")
+            client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(self.SCRIPT)
+
+    def take(self, key, capacity, period):
+        rate = capacity / period
+        allowed, tokens = self._script(keys=[f"{self.prefix}:{key}"], args=[capacity, rate])
+        if int(allowed):
+            return True, 0.0
+        return False, (1 - float(tokens)) / rate
+
+
+def create_rate_limit_backend(backend_name: str = RATE_LIMIT_BACKEND) -> RateLimitBackend:
+    if backend_name == "redis":
+        return RedisRateLimitBackend()
+    if backend_name != "memory":
+        logger.warning(f"알 수 없는 요청 제한 백엔드 '{backend_name}', 메모리를 사용합니다.")
+    return MemoryRateLimitBackend()
+
+
+# 요청 제한기
+class RateLimiter:
+    """IP 와 계정(아이디/이메일) 기준 토큰 버킷으로 인증 관련 요청 횟수 제한"""
+
+    def __init__(self, backend: Optional[RateLimitBackend] = None, rules=RATE_LIMIT_RULES, enabled: bool = RATE_LIMIT_ENABLED):
+        self._backend = backend
+        self.rules = rules
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.rejections: Counter = Counter()
+
+    @property
+    def backend(self) -> RateLimitBackend:
+        if self._backend is None:
+            self._backend = create_rate_limit_backend()
+        return self._backend
+
+    @staticmethod
+    def client_ip(request: Request) -> str:
+        if RATE_LIMIT_TRUST_PROXY:
+            forwarded = request.headers.get("x-forwarded-for")
+            if forwarded:
+                return forwarded.split(",")[0].strip()
+        return request.client.host if request.client else "unknown"
+
+    def check(self, request: Request, action: str, account: Optional[str] = None):
+        """한도를 넘으면 429 발생 (DB 조회/해시 전에 호출)"""
+        if not self.enabled:
+            return
+        identities = {"ip": self.client_ip(request), "account": (account or "").strip().lower()}
+        for scope, (capacity, period) in self.rules.get(action, []):
+            identity = identities[scope]
+            if not identity:
+                continue
+            try:
+                allowed, retry_after = self.backend.take(f"{action}:{scope}:{identity}", capacity, period)
+            except Exception as e:
+                # 공유 저장소 장애로 로그인 자체가 막히지 않도록 통과시킴
+                logger.error(f"요청 제한 확인 실패 ({action}): {e}")
+                return
+            if not allowed:
+                with self._lock:
+                    self.rejections[f"{action}:{scope}"] += 1
+                logger.warning(f"요청 제한 초과: {action} ({scope}={identity})")
+                raise HTTPException(
+                    status_code=429,
+                    detail="요청이 너무 많습니다. 잠시 후 다시 시도해 주세요.",
+                    headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+                )
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.rejections)
+
+
+# 전역 요청 제한기
+rate_limiter = RateLimiter()
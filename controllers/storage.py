@@ -0,0 +1,208 @@
+import os
+import hashlib
+import time
+import logging
+import tempfile
+import threading
+from typing import Optional, Dict, Iterator, List, Tuple
+from controllers.cache import Config
+from controllers.asset_naming import HASH_CHUNK_SIZE
+
+
+# 파일 저장소 인터페이스
+class StorageBackend:
+    """이미지/오디오 파일 저장소 공통 인터페이스
+
+    key 는 저장소와 무관한 논리 경로(ab/cd/<digest>.png)이고,
+    location 은 Story.image 처럼 DB 에 기록되는 값(로컬 경로 또는 URL)이다.
+    """
+    name = "base"
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def read(self, key: str) -> bytes:
+        raise NotImplementedError
+
+    def write_bytes(self, data: bytes, key: str, content_type: Optional[str] = None) -> str:
+        """저장 후 location 반환"""
+        raise NotImplementedError
+
+    def write_file(self, local_path: str, key: str, content_type: Optional[str] = None) -> str:
+        with open(local_path, "rb") as f:
+            return self.write_bytes(f.read(), key, content_type)
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def size(self, key: str) -> int:
+        raise NotImplementedError
+
+    def list_keys(self, prefix: str = "") -> Iterator[Tuple[str, int, float]]:
+        """(key, 크기, 수정 시각 timestamp) 목록"""
+        raise NotImplementedError
+
+    def delete_many(self, keys: List[str]):
+        """여러 파일 삭제 (일괄 삭제를 지원하는 저장소는 재정의)"""
+        for key in keys:
+            self.delete(key)
+
+    def location(self, key: str) -> str:
+        raise NotImplementedError
+
+    def key_from_location(self, location: Optional[str]) -> Optional[str]:
+        """이 저장소의 location 이면 key 반환, 아니면 None"""
+        raise NotImplementedError
+
+    def owns(self, location: Optional[str]) -> bool:
+        """location 이 이 저장소에 있는 파일인지"""
+        return self.key_from_location(location) is not None
+
+    def read_location(self, location: str) -> bytes:
+        key = self.key_from_location(location)
+        if key is None:
+            raise FileNotFoundError(f"{self.name} 저장소의 경로가 아닙니다: {location}")
+        return self.read(key)
+
+    def checksum(self, key: str) -> str:
+        """저장된 내용의 SHA-256"""
+        return hashlib.sha256(self.read(key)).hexdigest()
+
+
+# 로컬 디스크 저장소
+class LocalStorage(StorageBackend):
+    name = "local"
+
+    def __init__(self, root: str = Config.BLOB_DIR):
+        self.base = root  # DB 에 기록되는 경로는 BlobStore 와 같은 형태(root/ab/cd/...)로 유지
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"잘못된 key 입니다: {key}")
+        return path
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def read(self, key):
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def write_bytes(self, data, key, content_type=None):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 임시 파일에 쓴 뒤 교체하여 반쯤 쓰인 파일이 보이지 않도록 함
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as tmp_file:
+            tmp_file.write(data)
+            tmp_path = tmp_file.name
+        os.replace(tmp_path, path)
+        return self.location(key)
+
+    def delete(self, key):
+        path = self._path(key)
+        if os.path.exists(path):
+            os.unlink(path)
+
+    def size(self, key):
+        return os.path.getsize(self._path(key))
+
+    def list_keys(self, prefix=""):
+        for dirpath, _, filenames in os.walk(os.path.join(self.root, prefix)):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                stat = os.stat(path)
+                yield os.path.relpath(path, self.root).replace(os.sep, "/"), stat.st_size, stat.st_mtime
+
+    def location(self, key):
+        self._path(key)  # key 검증
+        return os.path.join(self.base, *key.split("/"))
+
+    def key_from_location(self, location):
+        if not location or location.startswith(("http://", "https://")):
+            return None
+        path = os.path.abspath(location)
+        if not path.startswith(self.root + os.sep):
+            return None
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def owns(self, location):
+        # 저장소 밖의 예전 로컬 파일(static/images, cache 등)도 로컬 저장소 소유로 본다
+        return bool(location) and not location.startswith(("http://", "https://")) and os.path.exists(location)
+
+    def read_location(self, location):
+        with open(location, "rb") as f:
+            return f.read()
+
+    def checksum(self, key):
+        sha256 = hashlib.sha256()
+        with open(self._path(key), "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+
+# 메모리 저장소 (테스트/시험 이전용)
+class MemoryStorage(StorageBackend):
+    name = "memory"
+
+    def __init__(self):
+        self._objects: Dict[str, bytes] = {}
+        self._modified: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def exists(self, key):
+        with self._lock:
+            return key in self._objects
+
+    def read(self, key):
+        with self._lock:
+            if key not in self._objects:
+                raise FileNotFoundError(key)
+            return self._objects[key]
+
+    def write_bytes(self, data, key, content_type=None):
+        with self._lock:
+            self._objects[key] = bytes(data)
+            self._modified[key] = time.time()
+        return self.location(key)
+
+    def delete(self, key):
+        with self._lock:
+            self._objects.pop(key, None)
+            self._modified.pop(key, None)
+
+    def size(self, key):
+        return len(self.read(key))
+
+    def list_keys(self, prefix=""):
+        with self._lock:
+            items = [
+                (key, len(data), self._modified[key])
+                for key, data in self._objects.items()
+                if key.startswith(prefix)
+            ]
+        return iter(items)
+
+    def location(self, key):
+        return f"memory://{key}"
+
+    def key_from_location(self, location):
+        if location and location.startswith("memory://"):
+            return location[len("memory://"):]
+        return None
+
+
+# 이름으로 저장소 생성
+def get_storage(name: Optional[str] = None) -> StorageBackend:
+    name = name or ("s3" if Config.USE_S3 else "local")
+    if name == "local":
+        return LocalStorage(Config.BLOB_DIR)
+    if name == "s3":
+        from controllers.storage_s3 import S3Storage
+        return S3Storage(Config.S3_BUCKET)
+    if name == "memory":
+        return MemoryStorage()
+    raise ValueError(f"알 수 없는 저장소입니다: {name}")
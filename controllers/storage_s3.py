@@ -1,10 +1,228 @@
 # s3 용 함수
+import os
+import logging
+import hashlib
+import mimetypes
+import threading
+from io import BytesIO
+from typing import Optional, Union, BinaryIO
+from urllib.parse import urlparse, unquote
 import boto3
 import requests
-from io import BytesIO
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config as BotoConfig
+from botocore.exceptions import ClientError
+from controllers.storage import StorageBackend
+from controllers.asset_naming import digest_file
+
+# S3 연결 설정
+S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL')  # moto 서버, MinIO 등 로컬 대체 서버 주소
+S3_REGION = os.getenv('AWS_DEFAULT_REGION', 'ap-northeast-2')
+S3_MAX_POOL_CONNECTIONS = int(os.getenv('S3_MAX_POOL_CONNECTIONS', '20'))
+S3_MULTIPART_THRESHOLD = int(os.getenv('S3_MULTIPART_THRESHOLD', str(8 * 1024 * 1024)))  # 이 크기 이상은 멀티파트 업로드
+S3_MULTIPART_CHUNKSIZE = int(os.getenv('S3_MULTIPART_CHUNKSIZE', str(8 * 1024 * 1024)))
+S3_MAX_CONCURRENCY = int(os.getenv('S3_MAX_CONCURRENCY', '4'))
+
+# 멀티파트 전송 설정 (작은 파일은 단일 PUT, 큰 파일은 청크 병렬 업로드)
+transfer_config = TransferConfig(
+    multipart_threshold=S3_MULTIPART_THRESHOLD,
+    multipart_chunksize=S3_MULTIPART_CHUNKSIZE,
+    max_concurrency=S3_MAX_CONCURRENCY,
+    use_threads=True,
+)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    """프로세스 전체에서 공유하는 S3 클라이언트 (boto3 클라이언트는 스레드 안전)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = boto3.client(
+                    "s3",
+                    endpoint_url=S3_ENDPOINT_URL,
+                    region_name=S3_REGION,
+                    config=BotoConfig(
+                        max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                        retries={"max_attempts": 3, "mode": "standard"},
+                    ),
+                )
+    return _client
+
+
+def set_s3_client(client):
+    """공유 클라이언트 교체 (moto 등 테스트용 클라이언트 주입)"""
+    global _client
+    with _client_lock:
+        _client = client
+
+
+# S3 저장소
+class S3Storage(StorageBackend):
+    """S3 저장소 (StorageBackend 의 key 는 prefix 아래 객체 이름으로 저장)"""
+    name = "s3"
+
+    def __init__(self, bucket_name: str, client=None, prefix: str = "images"):
+        self.bucket_name = bucket_name
+        self._client = client
+        self.prefix = prefix.strip("/")
+
+    @property
+    def client(self):
+        return self._client or get_s3_client()
+
+    def url_for(self, object_name: str) -> str:
+        """객체의 공개 URL"""
+        if S3_ENDPOINT_URL:
+            return f"{S3_ENDPOINT_URL.rstrip('/')}/{self.bucket_name}/{object_name}"
+        return f"https://{self.bucket_name}.s3.amazonaws.com/{object_name}"
+
+    def _extra_args(self, object_name: str, content_type: Optional[str]) -> dict:
+        content_type = content_type or mimetypes.guess_type(object_name)[0]
+        return {"ContentType": content_type} if content_type else {}
+
+    def upload_file(self, local_path: str, object_name: str, content_type: Optional[str] = None) -> str:
+        """로컬 파일을 그대로 업로드 (메모리로 읽어들이지 않음)"""
+        self.client.upload_file(
+            local_path,
+            self.bucket_name,
+            object_name,
+            ExtraArgs=self._extra_args(object_name, content_type),
+            Config=transfer_config,
+        )
+        return self.url_for(object_name)
+
+    def upload_bytes(self, data: Union[bytes, BinaryIO], object_name: str, content_type: Optional[str] = None) -> str:
+        """메모리 버퍼 또는 파일 객체 업로드"""
+        fileobj = BytesIO(data) if isinstance(data, (bytes, bytearray)) else data
+        self.client.upload_fileobj(
+            fileobj,
+            self.bucket_name,
+            object_name,
+            ExtraArgs=self._extra_args(object_name, content_type),
+            Config=transfer_config,
+        )
+        return self.url_for(object_name)
+
+    def upload_from_source(self, source: str, object_name: str, content_type: Optional[str] = None) -> str:
+        """로컬 경로면 파일 업로드, URL 이면 응답을 스트리밍으로 업로드"""
+        if source.startswith(("http://", "https://")):
+            with requests.get(source, stream=True, timeout=30) as response:
+                response.raise_for_status()
+                response.raw.decode_content = True
+                return self.upload_bytes(response.raw, object_name, content_type)
+
+        if not os.path.exists(source):
+            raise FileNotFoundError(f"업로드할 파일이 없습니다: {source}")
+        return self.upload_file(source, object_name, content_type)
+
+    # StorageBackend 구현
+    def _object_name(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket_name, Key=self._object_name(key))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def read(self, key):
+        buffer = BytesIO()
+        self.client.download_fileobj(self.bucket_name, self._object_name(key), buffer, Config=transfer_config)
+        return buffer.getvalue()
+
+    def write_bytes(self, data, key, content_type=None):
+        # 이전/검증 시 객체를 다시 받지 않도록 SHA-256 을 메타데이터로 기록
+        object_name = self._object_name(key)
+        extra_args = self._extra_args(object_name, content_type)
+        extra_args["Metadata"] = {"sha256": hashlib.sha256(data).hexdigest()}
+        self.client.upload_fileobj(BytesIO(data), self.bucket_name, object_name, ExtraArgs=extra_args, Config=transfer_config)
+        return self.url_for(object_name)
+
+    def write_file(self, local_path, key, content_type=None):
+        # write_bytes 와 같이 SHA-256 을 기록 (파일은 청크 단위로 해시하고 그대로 업로드)
+        object_name = self._object_name(key)
+        extra_args = self._extra_args(object_name, content_type)
+        extra_args["Metadata"] = {"sha256": digest_file(local_path)}
+        self.client.upload_file(local_path, self.bucket_name, object_name, ExtraArgs=extra_args, Config=transfer_config)
+        return self.url_for(object_name)
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket_name, Key=self._object_name(key))
+
+    def size(self, key):
+        return self.client.head_object(Bucket=self.bucket_name, Key=self._object_name(key))["ContentLength"]
+
+    def list_keys(self, prefix=""):
+        paginator = self.client.get_paginator("list_objects_v2")
+        start = len(self.prefix) + 1 if self.prefix else 0
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=self._object_name(prefix)):
+            for obj in page.get("Contents", []):
+                yield obj["Key"][start:], obj["Size"], obj["LastModified"].timestamp()
+
+    def delete_many(self, keys):
+        # DeleteObjects 는 요청당 최대 1000개
+        keys = list(keys)
+        for i in range(0, len(keys), 1000):
+            objects = [{"Key": self._object_name(key)} for key in keys[i:i + 1000]]
+            response = self.client.delete_objects(Bucket=self.bucket_name, Delete={"Objects": objects, "Quiet": True})
+            for error in response.get("Errors", []):
+                logging.error(f"S3 객체 삭제 실패: {error.get('Key')} ({error.get('Message')})")
+
+    def location(self, key):
+        return self.url_for(self._object_name(key))
+
+    def key_from_location(self, location):
+        if not location or not location.startswith(("http://", "https://")):
+            return None
+        parsed = urlparse(location)
+        path = unquote(parsed.path).lstrip("/")
+        if S3_ENDPOINT_URL and location.startswith(S3_ENDPOINT_URL.rstrip("/")):
+            bucket, _, object_name = path.partition("/")
+        elif parsed.netloc.startswith(f"{self.bucket_name}.s3"):
+            bucket, object_name = self.bucket_name, path
+        else:
+            return None
+        if bucket != self.bucket_name:
+            return None
+        if self.prefix:
+            if not object_name.startswith(self.prefix + "/"):
+                return None
+            return object_name[len(self.prefix) + 1:]
+        return object_name
+
+    def read_location(self, location):
+        # prefix 밖에 있는 예전 객체(사용자명_color_N.png 등)도 읽을 수 있도록 처리
+        parsed = urlparse(location)
+        path = unquote(parsed.path).lstrip("/")
+        if S3_ENDPOINT_URL and location.startswith(S3_ENDPOINT_URL.rstrip("/")):
+            path = path.partition("/")[2]
+        buffer = BytesIO()
+        self.client.download_fileobj(self.bucket_name, path, buffer, Config=transfer_config)
+        return buffer.getvalue()
+
+    def owns(self, location):
+        if not location or not location.startswith(("http://", "https://")):
+            return False
+        parsed = urlparse(location)
+        if S3_ENDPOINT_URL and location.startswith(S3_ENDPOINT_URL.rstrip("/")):
+            return unquote(parsed.path).lstrip("/").startswith(self.bucket_name + "/")
+        return parsed.netloc.startswith(f"{self.bucket_name}.s3")
+
+    def checksum(self, key):
+        head = self.client.head_object(Bucket=self.bucket_name, Key=self._object_name(key))
+        recorded = head.get("Metadata", {}).get("sha256")
+        return recorded or super().checksum(key)
+
 
 def save_image_s3(image_url: str, bucket_name: str, object_name: str) -> str:
-    s3 = boto3.client("s3")
-    response = requests.get(image_url)
-    s3.upload_fileobj(BytesIO(response.content), bucket_name, object_name)
-    return f"https://{bucket_name}.s3.amazonaws.com/{object_name}"
\ No newline at end of file
+    """이미지(로컬 경로 또는 URL)를 S3에 저장하고 URL 반환"""
+    url = S3Storage(bucket_name).upload_from_source(image_url, object_name, content_type="image/png")
+    logging.info(f"S3 업로드 완료: {url}")
+    return url
@@ -6,7 +6,8 @@ from dotenv import load_dotenv
 import streamlit as st
 from openai import OpenAI
 from models_dir.models import Story
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, load_only, selectinload
 from models_dir.database import SessionLocal
 from io import BytesIO
 import requests
@@ -16,11 +17,18 @@ from PIL import Image
 import logging
 from uuid import uuid4
 from models_dir.models import User
-from controllers.storage_s3 import save_image_s3
+from controllers.upload_queue import enqueue_story_uploads
 from controllers.cache import CacheManager, Config
+from controllers.blob_store import blob_store
+from controllers.asset_gc import asset_gc
+from controllers.pagination import encode_cursor, decode_cursor
+from controllers.content_store import get_or_create_content, delete_unreferenced_contents
+from controllers.user_stats import record_story_created, record_stories_deleted, get_user_stats
+from controllers.identity_cache import get_user_profile
+from models_dir.search_index import index_stories, remove_stories, search_story_ids
 import sys
 from functools import lru_cache
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from frontend.utils import ImageSharingUtils
 import base64
@@ -49,8 +57,8 @@ openai.api_key = openai_api_key
 
 client = OpenAI(api_key=openai_api_key)
 
-# 전역 캐시 매니저
-cache_manager = CacheManager()
+# 전역 캐시 매니저 (이미지는 blob_store 의 파일을 참조)
+cache_manager = CacheManager(blob_store=blob_store)
 
 
 # 동화 생성 함수 (캐싱 적용)
@@ -198,27 +206,17 @@ def generate_image_prompt_from_story(fairy_tale_text: str) -> Optional[str]:
 #         logging.error(f"이미지 생성 중 오류 발생: {e}")
 #         return None
 
-# 중복되지 않는 파일명 생성 함수
-def get_available_filename(base_name: str, extension: str = ".png", folder: str = ".") -> str:
-    """
-    중복되지 않는 파일명을 자동으로 생성
-    예: fairy_tale_image.png, fairy_tale_image_1.png, ...
-    """
-    counter = 0
-    while True:
-        filename = f"{base_name}{f'_{counter}' if counter > 0 else ''}{extension}"
-        filepath = os.path.join(folder, filename)
-        if not os.path.exists(filepath):
-            return filepath
-        counter += 1
-
 # 이미지 생성 함수 (캐싱 적용)
 def generate_image_from_prompt(fairy_tale_text: str, image_key: str) -> Optional[str]:
-    cached_image = cache_manager.get_cached_file(image_key, "image")
+    cached_image, known_failure = cache_manager.lookup(image_key, "image")
     
     if cached_image:
         logging.info("캐시된 이미지를 사용합니다.")
         return cached_image
+
+    if known_failure:
+        logging.info("최근 생성에 실패한 프롬프트이므로 재요청하지 않습니다.")
+        return None
     
     try:
         endpoint = "https://api.stability.ai/v2beta/stable-image/generate/core"
@@ -255,14 +253,17 @@ def generate_image_from_prompt(fairy_tale_text: str, image_key: str) -> Optional
         response = requests.post(endpoint, headers=headers, files=files)
 
         if response.status_code == 200:
-            save_path = get_available_filename("fairy_tale_image", ".png", folder=".")
-            with open(save_path, "wb") as f:
-                f.write(response.content)
+            # 내용 주소 저장소에 한 번만 저장하고 캐시는 같은 파일을 참조
+            save_path = blob_store.put_bytes(response.content, ".png")
+            cache_manager.cache_file(image_key, "image", save_path)
             print(f"이미지 저장 완료: {save_path}")
             return save_path
         else:
             print("이미지 생성 실패:", response.status_code)
             print("응답 내용:", response.text)
+            # 요청 자체가 거절된 경우(4xx)는 같은 프롬프트로 다시 호출하지 않도록 기록
+            if 400 <= response.status_code < 500 and response.status_code != 429:
+                cache_manager.cache_negative(image_key, "image")
             return None
 
     except Exception as e:
@@ -312,17 +313,13 @@ def convert_bw_image(image_path: str) -> Optional[str]:
         # 흰 배경에 검은 선
         line_drawing = 255 - dilated_edges
         
-        # 이미지 저장
+        # 이미지 저장 (임시 파일 없이 메모리에서 PNG 인코딩)
         pil_image = Image.fromarray(line_drawing)
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_file:
-            pil_image.save(tmp_file.name)
-            tmp_path = tmp_file.name
+        buffer = BytesIO()
+        pil_image.save(buffer, format="PNG")
+        bw_path = blob_store.put_bytes(buffer.getvalue(), ".png")
         
-        cached_path = cache_manager.cache_file(bw_key, "image", tmp_path)
-        os.unlink(tmp_path)  # 임시 파일 삭제
-        
-        return cached_path
+        return cache_manager.cache_file(bw_key, "image", bw_path)
 
     except Exception as e:
         logging.error(f"흑백 변환 오류: {e}")
@@ -368,66 +365,33 @@ def generate_image_from_fairy_tale(fairy_tale_text: str) -> Optional[str]:
 # 사용자 정보 받아오기
 def get_username_by_id(user_id: int, db: Session) -> str:
     try:
-        user = db.query(User).filter(User.id == user_id).first()
-        return user.username if user else f"user_{user_id}"
+        user = get_user_profile(db, user_id)  # TTL 캐시 우선 조회
+        return user["username"] if user else f"user_{user_id}"
     except Exception as e:
         print(f"사용자 정보 조회 중 오류 발생: {e}")
         return f"user_{user_id}"
 
 # 이미지 저장 (S3/로컬 선택)
-def save_image_locally(image_path: str, save_path: str) -> Optional[str]:
+def save_image_locally(image_path: str) -> Optional[str]:
+    """이미지를 내용 주소 저장소에 저장 (같은 내용이면 기존 파일 경로 반환)"""
     try:
         if image_path.startswith("http"):
             image_data = requests.get(image_path).content
-            with open(save_path, "wb") as f:
-                f.write(image_data)
-        else:
-            img = Image.open(image_path)
-            img.save(save_path)
-        return save_path
+            return blob_store.put_bytes(image_data, ".png")
+        return blob_store.put_file(image_path)
     except Exception as e:
         logging.error(f"이미지 저장 중 오류 발생: {e}")
         return None
 
 
 # 사용자 이미지 저장 함수 
-def download_and_save_image_with_custom_name(
-    user_id: int, 
-    image_source: str, 
-    is_bw: bool, 
-    db: Session,
-    save_dir: str = Config.STATIC_DIR
-) -> Optional[str]:
+def download_and_save_image_with_custom_name(image_source: str) -> Optional[str]:
+    """이미지를 로컬 저장소에 바로 저장하고 경로 반환
     
+    S3 업로드는 요청 경로에서 하지 않고, 동화 저장 시 업로드 대기열에 등록된다. (upload_queue 참고)
+    """
     try:
-        os.makedirs(save_dir, exist_ok=True)
-        
-        username = get_username_by_id(db, user_id)
-        image_type = "wb" if is_bw else "color"
-        
-        # 해당 유저가 만든 동일 타입 이미지 파일 개수 세기
-        existing_files = [f for f in os.listdir(save_dir) if f.startswith(f"{username}_{image_type}_")]
-        next_index = len(existing_files) + 1
-        
-        filename = f"{username}_{image_type}_{next_index}.png"
-        
-        # S3 사용 여부에 따라 분기
-        if Config.USE_S3:
-            try:
-                # S3에 저장
-                s3_path = save_image_s3(
-                    image_source, 
-                    bucket_name=Config.S3_BUCKET, 
-                    object_name=filename
-                )
-                return s3_path
-            except Exception as e:
-                logging.warning(f"S3 저장 실패, 로컬 저장으로 전환: {e}")
-                # S3 실패시 로컬로 폴백
-        
-        # 로컬에 저장
-        file_path = os.path.join(save_dir, filename)
-        return save_image_locally(image_source, file_path)
+        return save_image_locally(image_source)
         
     except Exception as e:
         logging.error(f"이미지 저장 중 오류 발생: {e}")
@@ -469,8 +433,8 @@ def generate_and_save_images_parallel(
             bw_image_path = convert_bw_image(color_image_path)
             
             # 이미지 저장
-            color_path = download_and_save_image_with_custom_name(user_id, color_image_path, False, db)
-            bw_path = download_and_save_image_with_custom_name(user_id, bw_image_path, True, db) if bw_image_path else None
+            color_path = download_and_save_image_with_custom_name(color_image_path)
+            bw_path = download_and_save_image_with_custom_name(bw_image_path) if bw_image_path else None
             
             # DB에 저장
             return save_story_to_db(
@@ -495,16 +459,27 @@ def save_story_to_db(user_id: int, theme: str, voice: str,
                      content: str, voice_content: str, image: str, bw_image: str):
     db: Session = SessionLocal()
     try:
+        body = get_or_create_content(db, content)  # 같은 본문은 story_contents 한 행을 공유
         story = Story(
             user_id=user_id,
             theme=theme,
             voice=voice,
-            content=content,
+            body=body,
             voice_content=voice_content,
             image=image,
             bw_image=bw_image,
         )
         db.add(story)
+        # 같은 트랜잭션에서 사용자 통계와 이미지 파일 참조 수 증가
+        record_story_created(db, user_id, theme, voice, body.size)
+        # 검색 인덱스도 같은 트랜잭션에서 추가 (story.id 가 필요하므로 flush 후)
+        db.flush()
+        index_stories(db, [(story.id, user_id, theme, content)])
+        blob_store.incref(image, db)
+        blob_store.incref(bw_image, db)
+        # S3 사용 시 업로드는 백그라운드 대기열에서 처리 (커밋 후 경로가 원격 URL로 교체됨)
+        if Config.USE_S3:
+            enqueue_story_uploads(db, story)
         db.commit()
         db.refresh(story)
         return story
@@ -516,35 +491,109 @@ def save_story_to_db(user_id: int, theme: str, voice: str,
     
 
 # 이미지 불러오는 함수
+# 목록 화면에서 쓰는 컬럼 (본문/음성 등 큰 컬럼 제외)
+STORY_SUMMARY_COLUMNS = (Story.id, Story.user_id, Story.theme, Story.voice, Story.image, Story.bw_image, Story.created_at)
+
+
 def get_user_images(db: Session, user_id: int):
+    """사용자의 모든 동화 이미지 정보 (일괄 다운로드용, 본문은 읽지 않음)"""
     return (
         db.query(Story)
+        .options(load_only(*STORY_SUMMARY_COLUMNS))
         .filter(Story.user_id == user_id)
-        .order_by(Story.created_at.desc())
+        .order_by(Story.created_at.desc(), Story.id.desc())
         .all()
     )
 
+
+def get_user_story_page(
+    db: Session,
+    user_id: int,
+    limit: int = 9,
+    cursor: Optional[str] = None,
+    include_content: bool = False,
+) -> Tuple[List[Story], Optional[str]]:
+    """(created_at, id) 키셋 페이지네이션으로 한 페이지만 조회하고 다음 페이지 커서를 함께 반환"""
+    columns = STORY_SUMMARY_COLUMNS + ((Story.content_hash, Story.legacy_content) if include_content else ())
+    query = (
+        db.query(Story)
+        .options(load_only(*columns))
+        .filter(Story.user_id == user_id)
+    )
+    if include_content:
+        # 본문은 현재 페이지 항목만 한 번에 조회
+        query = query.options(selectinload(Story.body))
+    position = decode_cursor(cursor)
+    if position:
+        created_at, story_id = position
+        query = query.filter(
+            or_(
+                Story.created_at < created_at,
+                and_(Story.created_at == created_at, Story.id < story_id),
+            )
+        )
+    # 다음 페이지 존재 여부 확인을 위해 하나 더 조회
+    stories = query.order_by(Story.created_at.desc(), Story.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(stories) > limit:
+        stories = stories[:limit]
+        next_cursor = encode_cursor(stories[-1].created_at, stories[-1].id)
+    return stories, next_cursor
+
+
+def search_user_stories(
+    db: Session,
+    user_id: int,
+    query: str,
+    limit: int = 9,
+    offset: int = 0,
+    include_content: bool = False,
+) -> Tuple[List[Story], bool]:
+    """본문/테마 전문 검색 (관련도 순), 결과와 다음 페이지 존재 여부 반환"""
+    # 다음 페이지 존재 여부 확인을 위해 하나 더 조회
+    story_ids = search_story_ids(db, user_id, query, limit=limit + 1, offset=offset)
+    has_more = len(story_ids) > limit
+    story_ids = story_ids[:limit]
+    if not story_ids:
+        return [], False
+    columns = STORY_SUMMARY_COLUMNS + ((Story.content_hash, Story.legacy_content) if include_content else ())
+    query = db.query(Story).options(load_only(*columns)).filter(Story.id.in_(story_ids))
+    if include_content:
+        query = query.options(selectinload(Story.body))
+    stories = query.all()
+    order = {story_id: position for position, story_id in enumerate(story_ids)}
+    return sorted(stories, key=lambda story: order[story.id]), has_more
+
+
+def count_user_stories(db: Session, user_id: int) -> int:
+    """user_stats 한 행에서 동화 수 조회 (Story 테이블을 세지 않음)"""
+    return get_user_stats(db, user_id)["story_count"]
+
 def display_image_with_actions(story: Story, col_index: int, view_mode: str = "grid"):
     """이미지와 액션 버튼들을 표시하는 함수"""
     sharing_utils = ImageSharingUtils()
+
+    # 저장소 파일은 /assets URL 로 넘겨 브라우저가 직접 받아 캐시하도록 함
+    image_src = blob_store.url_for(story.image)
+    bw_image_src = blob_store.url_for(story.bw_image)
     
     if view_mode == "grid":
         # 그리드 모드: 이미지들을 세로로 배치
         if story.image:
-            st.image(story.image, caption="컬러 이미지", use_container_width=True)
+            st.image(image_src, caption="컬러 이미지", use_container_width=True)
         if story.bw_image:
-            st.image(story.bw_image, caption="흑백 이미지", use_container_width=True)
+            st.image(bw_image_src, caption="흑백 이미지", use_container_width=True)
     else:
         # 목록 모드: 이미지들을 가로로 배치
         img_cols = st.columns(2) if story.bw_image else st.columns(1)
         
         with img_cols[0]:
             if story.image:
-                st.image(story.image, caption="컬러 이미지", use_container_width=True)
+                st.image(image_src, caption="컬러 이미지", use_container_width=True)
         
         if story.bw_image and len(img_cols) > 1:
             with img_cols[1]:
-                st.image(story.bw_image, caption="흑백 이미지", use_container_width=True)
+                st.image(bw_image_src, caption="흑백 이미지", use_container_width=True)
     
     # 기본 정보 표시
     st.caption(f"**테마:** {story.theme}")
@@ -577,7 +626,7 @@ def display_image_with_actions(story: Story, col_index: int, view_mode: str = "g
     st.markdown("**📤 공유하기**")
     
     # 이미지 URL 준비 (실제 환경에서는 공개 URL이 필요)
-    image_url = story.image if story.image and story.image.startswith('http') else None
+    image_url = image_src if image_src and image_src.startswith('http') else None
     
     if image_url:
         share_urls = sharing_utils.get_social_sharing_urls(image_url, story.theme)
@@ -675,8 +724,19 @@ def delete_story_from_db(story_id: int) -> bool:
     try:
         story = db.query(Story).filter(Story.id == story_id).first()
         if story:
+            released = [blob_store.decref(story.image, db), blob_store.decref(story.bw_image, db)]
+            content_size = story.body.size if story.body is not None else len((story.legacy_content or "").encode("utf-8"))
             db.delete(story)
+            db.flush()
+            record_stories_deleted(db, story.user_id, [(story.theme, story.voice, content_size)])
+            remove_stories(db, [story.id])
+            delete_unreferenced_contents(db, [story.content_hash])
             db.commit()
+            # 더 이상 참조되지 않는 파일은 커밋 후 정리
+            for digest in released:
+                blob_store.purge_if_unreferenced(digest)
+            # 예전 경로/S3 에 남은 파일은 백그라운드 수집기로 정리
+            asset_gc.request_collection()
             return True
         return False
     except Exception as e:
@@ -0,0 +1,191 @@
+import os
+import random
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Optional, List
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from models_dir.database import SessionLocal
+from models_dir.models import Story, UploadJob
+from controllers.blob_store import blob_store
+from controllers.storage import get_storage
+from controllers.storage_s3 import S3Storage
+from controllers.asset_naming import digest_file, object_key
+from controllers.user_stats import bump_version
+
+logger = logging.getLogger(__name__)
+
+# 업로드 대기열 설정
+UPLOAD_POLL_INTERVAL = float(os.getenv('UPLOAD_POLL_INTERVAL', '2'))  # 대기열 확인 주기(초)
+UPLOAD_BATCH_SIZE = int(os.getenv('UPLOAD_BATCH_SIZE', '10'))  # 한 번에 가져올 작업 수
+UPLOAD_MAX_ATTEMPTS = int(os.getenv('UPLOAD_MAX_ATTEMPTS', '8'))  # 최대 재시도 횟수
+UPLOAD_BACKOFF_BASE = float(os.getenv('UPLOAD_BACKOFF_BASE', '5'))  # 첫 재시도 대기 시간(초)
+UPLOAD_BACKOFF_MAX = float(os.getenv('UPLOAD_BACKOFF_MAX', '600'))  # 최대 재시도 대기 시간(초)
+UPLOAD_STALE_AFTER = int(os.getenv('UPLOAD_STALE_AFTER', '300'))  # running 상태로 이 시간 이상 멈춘 작업은 다시 시도
+
+STORY_IMAGE_COLUMNS = ("image", "bw_image")
+
+
+# 동화 이미지 업로드 작업 등록
+def enqueue_story_uploads(db: Session, story: Story) -> List[UploadJob]:
+    """로컬 경로로 저장된 동화 이미지를 업로드 대기열에 추가 (커밋은 호출자가 담당)"""
+    jobs = []
+    for column_name in STORY_IMAGE_COLUMNS:
+        local_path = getattr(story, column_name)
+        if not local_path or local_path.startswith(("http://", "https://")):
+            continue
+        # 저장소 파일이면 경로에서 digest 를 바로 얻고, 그 외 파일만 내용을 해시
+        digest = blob_store.digest_from_path(local_path)
+        if digest is None:
+            if not os.path.exists(local_path):
+                logger.warning(f"업로드할 파일이 없어 대기열에 넣지 않습니다: {local_path}")
+                continue
+            digest = digest_file(local_path)
+        job = UploadJob(
+            story_id=story.id,
+            column_name=column_name,
+            local_path=local_path,
+            object_name=object_key(digest, os.path.splitext(local_path)[1] or ".png"),
+            status="pending",
+            attempts=0,
+            next_attempt_at=datetime.now(),  # 가져갈 때 datetime.now() 와 비교하므로 DB 기본값(SQLite 는 UTC) 대신 같은 시계로 기록
+        )
+        db.add(job)
+        jobs.append(job)
+    return jobs
+
+
+def _backoff_seconds(attempts: int) -> float:
+    """지수 백오프 + 지터"""
+    delay = min(UPLOAD_BACKOFF_BASE * (2 ** (attempts - 1)), UPLOAD_BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+# 업로드 워커
+class UploadWorker:
+    """upload_jobs 테이블을 주기적으로 확인해 S3 업로드 후 Story 경로를 원격 URL로 교체"""
+
+    def __init__(self, storage: Optional[S3Storage] = None, poll_interval: float = UPLOAD_POLL_INTERVAL):
+        self.storage = storage or get_storage("s3")
+        self.poll_interval = poll_interval
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="upload-worker", daemon=True)
+        self._thread.start()
+        logger.info("업로드 워커 시작")
+
+    def stop(self, timeout: float = 10):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+        logger.info("업로드 워커 종료")
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                processed = self.process_batch()
+            except Exception as e:
+                logger.error(f"업로드 대기열 처리 중 오류: {e}")
+                processed = 0
+            # 처리할 작업이 남아 있으면 바로 다음 배치 진행
+            if processed < UPLOAD_BATCH_SIZE:
+                self._stop_event.wait(self.poll_interval)
+
+    def _claim_jobs(self) -> List[int]:
+        """실행할 작업을 running 으로 바꾸고 ID 목록 반환"""
+        db: Session = SessionLocal()
+        try:
+            now = datetime.now()
+            stale_before = now - timedelta(seconds=UPLOAD_STALE_AFTER)
+            query = (
+                db.query(UploadJob)
+                .filter(
+                    or_(
+                        (UploadJob.status == "pending") & (UploadJob.next_attempt_at <= now),
+                        (UploadJob.status == "running") & (UploadJob.updated_at <= stale_before),
+                    )
+                )
+                .order_by(UploadJob.id)
+                .limit(UPLOAD_BATCH_SIZE)
+            )
+            # 여러 워커가 같은 작업을 가져가지 않도록 잠금 (PostgreSQL)
+            if db.bind.dialect.name == "postgresql":
+                query = query.with_for_update(skip_locked=True)
+            jobs = query.all()
+            for job in jobs:
+                job.status = "running"
+                job.updated_at = now
+            db.commit()
+            return [job.id for job in jobs]
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def process_batch(self) -> int:
+        """대기 중인 작업 한 묶음 처리, 처리한 작업 수 반환"""
+        job_ids = self._claim_jobs()
+        for job_id in job_ids:
+            self._process_job(job_id)
+        return len(job_ids)
+
+    def _process_job(self, job_id: int):
+        db: Session = SessionLocal()
+        try:
+            job = db.get(UploadJob, job_id)
+            if job is None:
+                return
+            try:
+                remote_url = self.storage.upload_from_source(job.local_path, job.object_name)
+            except Exception as e:
+                self._mark_failed(db, job, e)
+                return
+
+            # 업로드가 끝난 뒤에만 Story 경로를 교체 (그 사이 바뀐 경우는 건드리지 않음)
+            column = getattr(Story, job.column_name)
+            updated = (
+                db.query(Story)
+                .filter(Story.id == job.story_id, column == job.local_path)
+                .update({column: remote_url}, synchronize_session=False)
+            )
+            released = blob_store.decref(job.local_path, db) if updated else None
+            if updated:
+                # 이미지 URL 이 바뀌었으므로 갤러리 ETag 갱신
+                story_user_id = db.query(Story.user_id).filter(Story.id == job.story_id).scalar()
+                if story_user_id is not None:
+                    bump_version(db, story_user_id)
+            job.status = "done"
+            job.last_error = None
+            db.commit()
+            blob_store.purge_if_unreferenced(released)
+            logger.info(f"업로드 완료: story {job.story_id} {job.column_name} -> {remote_url}")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"업로드 작업 {job_id} 처리 실패: {e}")
+        finally:
+            db.close()
+
+    def _mark_failed(self, db: Session, job: UploadJob, error: Exception):
+        job.attempts += 1
+        job.last_error = str(error)[:1000]
+        # 로컬 파일이 사라진 경우는 재시도해도 소용없으므로 바로 실패 처리
+        if job.attempts >= UPLOAD_MAX_ATTEMPTS or isinstance(error, FileNotFoundError):
+            job.status = "failed"
+            logger.error(f"업로드 포기 (story {job.story_id}, {job.attempts}회 실패): {error}")
+        else:
+            delay = _backoff_seconds(job.attempts)
+            job.status = "pending"
+            job.next_attempt_at = datetime.now() + timedelta(seconds=delay)
+            logger.warning(f"업로드 실패, {delay:.0f}초 후 재시도 (story {job.story_id}): {error}")
+        db.commit()
+
+
+# 전역 업로드 워커
+upload_worker = UploadWorker()
@@ -0,0 +1,105 @@
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from models_dir.models import Story, UserStats
+
+# 삭제된 동화 한 건의 통계 정보 (theme, voice, 본문 크기)
+DeletedStory = Tuple[str, str, int]
+
+
+def _lock_stats(db: Session, user_id: int) -> UserStats:
+    """통계 행을 잠그고 반환 (없으면 생성), 동시에 저장/삭제해도 개수가 어긋나지 않도록 행 잠금 사용"""
+    stats = db.query(UserStats).filter(UserStats.user_id == user_id).with_for_update().first()
+    if stats is not None:
+        return stats
+    try:
+        # 다른 요청이 먼저 만든 경우에도 호출자의 트랜잭션은 유지되도록 savepoint 사용
+        with db.begin_nested():
+            stats = UserStats(user_id=user_id, story_count=0, theme_counts={}, voice_counts={}, content_bytes=0, version=0)
+            db.add(stats)
+        return stats
+    except IntegrityError:
+        return db.query(UserStats).filter(UserStats.user_id == user_id).with_for_update().first()
+
+
+def _adjust(counts: Optional[Dict[str, int]], key: str, delta: int) -> Dict[str, int]:
+    """JSON 컬럼은 변경 감지를 위해 새 dict 로 교체 (0 이하가 된 항목은 제거)"""
+    counts = dict(counts or {})
+    value = counts.get(key, 0) + delta
+    if value > 0:
+        counts[key] = value
+    else:
+        counts.pop(key, None)
+    return counts
+
+
+# 동화 저장 시 통계 갱신 (커밋은 호출자가 담당)
+def record_story_created(db: Session, user_id: int, theme: str, voice: str, content_size: int):
+    stats = _lock_stats(db, user_id)
+    stats.story_count += 1
+    stats.theme_counts = _adjust(stats.theme_counts, theme, 1)
+    stats.voice_counts = _adjust(stats.voice_counts, voice, 1)
+    stats.content_bytes += content_size
+    # 동화의 created_at 과 같은 DB 시각 사용
+    stats.last_created_at = func.now()
+    stats.version += 1
+
+
+# 동화 삭제 시 통계 갱신 (삭제 쿼리 실행 후, 커밋 전에 호출)
+def record_stories_deleted(db: Session, user_id: int, deleted: Iterable[DeletedStory]):
+    deleted = list(deleted)
+    if not deleted:
+        return
+    stats = _lock_stats(db, user_id)
+    theme_counts, voice_counts = stats.theme_counts, stats.voice_counts
+    for theme, voice, content_size in deleted:
+        theme_counts = _adjust(theme_counts, theme, -1)
+        voice_counts = _adjust(voice_counts, voice, -1)
+        stats.content_bytes = max((stats.content_bytes or 0) - (content_size or 0), 0)
+    stats.story_count = max(stats.story_count - len(deleted), 0)
+    stats.theme_counts, stats.voice_counts = theme_counts, voice_counts
+    # 가장 최근 동화가 지워졌을 수 있으므로 (user_id, created_at) 인덱스로 다시 조회
+    stats.last_created_at = (
+        db.query(func.max(Story.created_at)).filter(Story.user_id == user_id).scalar()
+        if stats.story_count else None
+    )
+    stats.version += 1
+
+
+# 사용자의 동화를 모두 삭제한 경우 (커밋은 호출자가 담당)
+def reset_user_stats(db: Session, user_id: int):
+    stats = _lock_stats(db, user_id)
+    stats.story_count = 0
+    stats.theme_counts = {}
+    stats.voice_counts = {}
+    stats.content_bytes = 0
+    stats.last_created_at = None
+    stats.version += 1
+
+
+# 동화 외 사용자 데이터(아이 목록, 이미지 경로 등)가 바뀐 경우 (커밋은 호출자가 담당)
+def bump_version(db: Session, user_id: int):
+    stats = _lock_stats(db, user_id)
+    stats.version += 1
+
+
+# 현재 데이터 버전 (ETag 비교용, 기본 키 조회 한 번)
+def get_user_version(db: Session, user_id: int) -> int:
+    version = db.query(UserStats.version).filter(UserStats.user_id == user_id).scalar()
+    return version or 0
+
+
+# 통계 조회 (동화 테이블을 읽지 않고 한 행만 조회)
+def get_user_stats(db: Session, user_id: int) -> Dict:
+    stats = db.get(UserStats, user_id)
+    if stats is None:
+        return {"story_count": 0, "theme_counts": {}, "voice_counts": {}, "content_bytes": 0, "last_created_at": None, "version": 0}
+    return {
+        "story_count": stats.story_count,
+        "theme_counts": stats.theme_counts or {},
+        "voice_counts": stats.voice_counts or {},
+        "content_bytes": stats.content_bytes,
+        "last_created_at": stats.last_created_at,
+        "version": stats.version,
+    }
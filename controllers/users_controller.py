@@ -1,11 +1,17 @@
 from fastapi import Request, Depends, HTTPException, APIRouter, BackgroundTasks, status
-from sqlalchemy.orm import Session
-from models_dir.models import User, Article, Story, Role # 모델 import
+from sqlalchemy import select, delete, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from models_dir.models import User, Article, Story, Role, Like, Baby, UserStats # 모델 import
 from scheme_files.users_schemes import UserCreate, UserLogin, UserResponse, UserUpdate
-from controllers.dependencies import get_db, get_password_hash, verify_password # 의존성 import
+from controllers.dependencies import get_async_db # 의존성 import
+from controllers.password_hasher import password_hasher
+from controllers.rate_limit import rate_limiter
+from controllers.identity_cache import identity_cache
+from controllers.asset_gc import release_story_assets, purge_released_assets
+from controllers.content_store import delete_unreferenced_contents
+from models_dir.search_index import remove_user_stories
 import re
 import logging
-from passlib.context import CryptContext
 from emails.email_class import EmailRequest, UsernameEmailRequest
 from emails.email_service import send_bye_email, send_welcome_email, send_username_email, generate_temp_pw, send_temp_pw_email, update_user_password, send_changed_pw_email
 
@@ -26,7 +32,7 @@ password_regex = re.compile(r"""
 
 # 회원가입
 @router.post("/signup")
-async def signup(signup_data: UserCreate, background_tasks: BackgroundTasks, db:Session=Depends(get_db)):
+async def signup(signup_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     logger.info(f"회원 가입 요청: 사용자 이름 {signup_data.username}, 이메일: {signup_data.email}")
 
     # ID 규칙 확인
@@ -45,19 +51,19 @@ async def signup(signup_data: UserCreate, background_tasks: BackgroundTasks, db:
         raise HTTPException(status_code=400, detail="비밀번호가 서로 일치하지 않습니다.")
     
     # username 중복 확인
-    existing_user = db.query(User).filter(User.username == signup_data.username).first()
+    existing_user = (await db.execute(select(User).where(User.username == signup_data.username))).scalars().first()
     if existing_user:
         logger.warning(f"회원 가입 실패: 이미 존재하는 사용자 이름 - {signup_data.username}")
         raise HTTPException(status_code=400, detail="이미 존재하는 사용자 이름입니다.")
     
     # nickname 중복 확인
-    existing_nick = db.query(User).filter(User.nickname == signup_data.nickname).first()
+    existing_nick = (await db.execute(select(User).where(User.nickname == signup_data.nickname))).scalars().first()
     if existing_nick:
         logger.warning(f"회원 가입 실패: 이미 존재하는 닉네임 - {signup_data.nickname}")
         raise HTTPException(status_code=400, detail="이미 존재하는 닉네임입니다.")
 
     # 모든 조건 만족 시
-    hashed_password = get_password_hash(signup_data.password) # 비밀번호 해시
+    hashed_password = await password_hasher.hash(signup_data.password) # 비밀번호 해시 (별도 프로세스에서 계산)
     # 기본 role_id 설정 (예: 일반 사용자)
     DEFAULT_ROLE_ID = 1
     new_user = User(username=signup_data.username,
@@ -70,32 +76,43 @@ async def signup(signup_data: UserCreate, background_tasks: BackgroundTasks, db:
     logger.info(f"{new_user.username} 사용자가 데이터베이스에 추가 되었습니다.")
 
     try:
-        db.commit()
+        # 환영 이메일은 사용자와 같은 트랜잭션으로 발송 대기열에 등록 (커밋 후 워커가 발송)
+        await db.run_sync(send_welcome_email, new_user.email)
+        await db.commit()
         logger.info("데이터베이스에 새로운 사용자가 추가되었습니다.")
     except Exception as e:
-        db.rollback() # 에러 발생 시 롤백
+        await db.rollback() # 에러 발생 시 롤백
         logger.error(f"회원 가입 오류: {e}") # 에러 내용 출력
         raise HTTPException(status_code=500, detail="회원 가입 실패. 다시 시도해 주세요")
-    db.refresh(new_user)
-
-    # 백그라운드 작업 등록
-    background_tasks.add_task(send_welcome_email, new_user.email)
-    logger.info(f"회원 가입 후 사용자 {new_user.username}에게 환영 이메일 발송")
+    await db.refresh(new_user)
+    logger.info(f"회원 가입 후 사용자 {new_user.username}에게 환영 이메일 발송 예약")
 
     return {"message": "회원가입을 성공하였습니다. 이메일을 확인해 주세요."}
 
 # 로그인
 @router.post("/login")
-async def login(request:Request, signin_data: UserLogin, db: Session=Depends(get_db)):
+async def login(request:Request, signin_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
     logger.info(f"로그인 시도: 사용자 이름 {signin_data.username}")
+    # DB 조회/비밀번호 해시 전에 IP·아이디별 시도 횟수 제한
+    rate_limiter.check(request, "login", signin_data.username)
 
-    user = db.query(User).filter(User.username ==  signin_data.username).first()
+    user = (await db.execute(select(User).where(User.username == signin_data.username))).scalars().first()
 
     if not user:
         logger.warning(f"로그인 실패: 사용자 {signin_data.username}이 존재하지 않음.")
         raise HTTPException(status_code=404, detail="존재하지 않는 사용자입니다.")
     
-    if user and verify_password(signin_data.password, user.hashed_password):
+    valid, new_hash = await password_hasher.verify_and_update(signin_data.password, user.hashed_password)
+    if valid:
+        # 해시 방식이나 work factor 가 바뀌었으면 로그인 성공 시 새 설정으로 다시 저장
+        if new_hash:
+            user.hashed_password = new_hash
+            try:
+                await db.commit()
+                logger.info(f"사용자 {user.username} 비밀번호 해시 갱신")
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"비밀번호 해시 갱신 실패: {e}")
         request.session["username"] = user.username
         request.session["id"] = user.id
         logger.info(f"사용자 {user.username} 로그인 성공")
@@ -110,22 +127,25 @@ async def login(request:Request, signin_data: UserLogin, db: Session=Depends(get
 
 # 아이디 찾기 (이메일 발송)
 @router.post("/find_id")
-async def find_id(req: EmailRequest, db:Session=Depends(get_db)):
+async def find_id(request: Request, req: EmailRequest, db: AsyncSession = Depends(get_async_db)):
     email = req.email
     logger.info(f"사용자 이름 요청: 이메일 {email}")
+    rate_limiter.check(request, "find_id", email)
 
-    user = db.query(User).filter(User.email == email).first()
+    user = (await db.execute(select(User).where(User.email == email))).scalars().first()
 
     if user is None:
         logger.warning(f"사용자 이름 요청 실패: 해당 이메일로 등록된 사용자가 없습니다. 이메일: {email}")
         raise HTTPException(status_code=404, detail="해당 이메일로 등록된 사용자가 없습니다.")
     
-    # 사용자 이름 이메일 발송
+    # 사용자 이름 이메일 발송 (대기열에 등록만 하고 바로 응답)
     try:
-        send_username_email(email=email, username=user.username)
-        logger.info(f"사용자 이름: {user.username}을 {email}로 성공적으로 발송하였습니다.")
+        await db.run_sync(send_username_email, email, user.username)
+        await db.commit()
+        logger.info(f"사용자 이름: {user.username}을 {email}로 발송 예약하였습니다.")
     except Exception as e:
-        logger.error(f"이메일 전송 실패: {e}")
+        await db.rollback()
+        logger.error(f"이메일 등록 실패: {e}")
         raise HTTPException(status_code=500, detail="이메일 전송에 실패하였습니다. 다시 시도해 주세요")
     
     return {"success": True, "message": "사용자 이름이 이메일로 발송되었습니다.",
@@ -134,12 +154,13 @@ async def find_id(req: EmailRequest, db:Session=Depends(get_db)):
 
 # 임시 비밀번호 이메일 발송
 @router.post("/reset_password")
-async def reset_password(req: UsernameEmailRequest, db: Session = Depends(get_db)):
+async def reset_password(request: Request, req: UsernameEmailRequest, db: AsyncSession = Depends(get_async_db)):
     username = req.username
     email = req.email
     logger.info(f"비밀번호 재설정 아이디: 아이디 {username}, 이메일 {email}")
+    rate_limiter.check(request, "reset_password", username)
 
-    user = db.query(User).filter(User.username == username, User.email == email).first()
+    user = (await db.execute(select(User).where(User.username == username, User.email == email))).scalars().first()
 
     if user is None:
         logger.warning(f"비밀번호 재설정 실패; 일치하는 정보가 없습니다. 아이디: {username}, 이메일: {email}")
@@ -148,26 +169,23 @@ async def reset_password(req: UsernameEmailRequest, db: Session = Depends(get_db
     # 임시비밀번호 생성 및 DB 업데이트
     temp_password = generate_temp_pw() # 임시 비밀번호 생성
 
-    # 비밀번호 DB 업데이트
+    # 비밀번호 DB 업데이트 + 임시비밀번호 이메일 등록 (같은 트랜잭션으로 커밋, 발송은 워커가 담당)
     try:
-        update_user_password(db, user, temp_password)
+        # 기존 동기 함수는 run_sync 로 같은 세션에서 실행
+        hashed_password = await password_hasher.hash(temp_password)
+        await db.run_sync(send_temp_pw_email, email, username, temp_password)
+        await db.run_sync(update_user_password, user, temp_password, hashed_password)
+        identity_cache.invalidate_user(user.id)
+        logger.info(f"임시 비밀번호를 {email}로 발송 예약했습니다.")
     except:
         logger.error(f"사용자 ID {user.username}에 대한 비밀번호 업데이트가 실패하였습니다.")
         raise HTTPException(status_code=500, detail="비밀번호 업데이트에 실패하였습니다.")
     
-    # 임시비밀번호 이메일 발송
-    try:
-        send_temp_pw_email(email=email, username=username, temp_password=temp_password)
-        logger.info(f"임시 비밀번호를 {email}로 성공적으로 전송했습니다.")
-    except Exception as e:
-        logger.error(f"이메일 전송 실패: {e}")
-        raise HTTPException(status_code=500, detail="이메일 전송에 실패하였습니다. 다시 시도해 주세요")
-    
     return {"succes": True, "message": "임시비밀번호가 이메일로 발송되었습니다."}
 
 # 비밀번호 변경
 @router.put("/change_pw")
-async def update_password(req: UserUpdate, db: Session = Depends(get_db)):
+async def update_password(req: UserUpdate, db: AsyncSession = Depends(get_async_db)):
     username = req.username
     current_password = req.current_password # 현재 비밀번호
     new_password = req.new_password # 새 비밀번호
@@ -175,15 +193,14 @@ async def update_password(req: UserUpdate, db: Session = Depends(get_db)):
 
     logger.info(f"비밀번호 변경 요청: 아이디 {username}")
 
-    user = db.query(User).filter(User.username == username).first()
+    user = (await db.execute(select(User).where(User.username == username))).scalars().first()
 
     if user is None:
         logger.warning(f"비밀번호 변경 실패: 사용자 ID {username}이 존재하지 않습니다.")
         raise HTTPException(status_code=404, detail="사용자가 존재하지 않습니다")
     
     # 현재 비밀번호 확인
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-    if not pwd_context.verify(current_password, user.hashed_password):
+    if not await password_hasher.verify(current_password, user.hashed_password):
         logger.warning(f"비밀번호 변경 실패: 현재 비밀번호가 일치하지 않습니다.")
         raise HTTPException(status_code=403, detail="현재 비밀버호가 일치하지 않습니다.")
     
@@ -202,22 +219,18 @@ async def update_password(req: UserUpdate, db: Session = Depends(get_db)):
         logger.warning("비밀번호 변경 실패: 비밀번호 규칙 위반")
         raise HTTPException(status_code=400, detail="비밀번호는 최소 10자 이상이며, 대문자, 소문자, 숫자 및 특수문자가 포함돼야 합니다.")
     
-    # 비밀번호 업데이트 처리
-    update_user_password(db, user, new_password) # 기존 함수 호출하여 비밀번호 업데이트
-
-    # 비밀번호 변경 안내 이메일 발송
-    try:
-        send_changed_pw_email(email=user.email, username=username)
-        logger.info(f"비밀번호 변경 안내 이메일을 {user.email}로 성공적으로 전송했습니다.")
-    except Exception as e:
-        logger.error(f"이메일 전송 실패: {e}")
-        raise HTTPException(status_code=500, detail="이메일 전송에 실패했습니다. 다시 시도해 주세요")
+    # 비밀번호 업데이트 처리 (변경 안내 이메일도 같은 트랜잭션으로 발송 대기열에 등록)
+    hashed_password = await password_hasher.hash(new_password)
+    await db.run_sync(send_changed_pw_email, user.email, username)
+    await db.run_sync(update_user_password, user, new_password, hashed_password) # 기존 함수 호출하여 비밀번호 업데이트
+    identity_cache.invalidate_user(user.id)
+    logger.info(f"비밀번호 변경 안내 이메일을 {user.email}로 발송 예약했습니다.")
     
     return {"success": True, "message": "비밀번호가 성공적으로 변경되었습니다."}
 
 # 회원 탈퇴
 @router.delete("/users/{id}")
-async def delete_user(request: Request, id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def delete_user(request: Request, id: int, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_async_db)):
     logger.info(f"회원 탈퇴 요청: {id}")
 
     user_id = request.session.get("id") # 사용자 ID
@@ -227,45 +240,62 @@ async def delete_user(request: Request, id: int, background_tasks: BackgroundTas
         raise HTTPException(status_code=401, detail="Not Authorized")
 
     # 사용자를 user_id로 조회
-    user_query = db.query(User)
+    user_query = select(User)
 
     if user_id is not None:
-        user_query = user_query.filter(User.id == user_id)
+        user_query = user_query.where(User.id == user_id)
 
-    user = user_query.first()
+    user = (await db.execute(user_query)).scalars().first()
 
     if user is None:
         logger.error(f"사용자 찾기 실패: ID {user_id}에 대한 사용자가 존재하지 않음")
         raise HTTPException(status_code=404, detail="User를 찾을 수 없습니다")
     
-    # 사용자가 작성한 모든 동화 삭제
-    stories = db.query(Story).filter(Story.user_id == user_id).all()
-    logger.info(f"{len(stories)}개의 동화를 삭제합니다.")
-    for story in stories:
-        db.delete(story)
-    
-    # 사용자가 작성한 모든 게시글 삭제
-    articles = db.query(Article).filter(Article.user_id == user_id).all()
-    logger.info(f"{len(articles)}개의 게시글을 삭제합니다.")
-    for article in articles:
-        db.delete(article)
-
-    # 사용자 정보 삭제
-    db.delete(user)
-
+    # 행을 하나씩 불러오지 않고 테이블별 DELETE 한 번으로 삭제 (PostgreSQL 은 외래키 CASCADE 로도 보장)
+    bulk = {"synchronize_session": False}
     try:
-        db.commit()
+        # 사용자가 작성한 모든 동화 삭제 (이미지 정리를 위해 경로만 돌려받음)
+        deleted_stories = (await db.execute(
+            delete(Story).where(Story.user_id == user_id).returning(Story.image, Story.bw_image, Story.content_hash),
+            execution_options=bulk,
+        )).all()
+        logger.info(f"{len(deleted_stories)}개의 동화를 삭제합니다.")
+        # 검색 인덱스 정리 (SQLite FTS5 는 외래키 CASCADE 가 없으므로 직접 삭제)
+        await db.run_sync(remove_user_stories, user_id)
+        # 다른 동화가 공유하지 않는 본문도 함께 삭제
+        await db.run_sync(delete_unreferenced_contents, [row.content_hash for row in deleted_stories])
+        # 이미지 참조 수도 같은 트랜잭션에서 감소 (커밋되지 않으면 참조 수도 그대로)
+        released = await db.run_sync(release_story_assets, [path for row in deleted_stories for path in (row.image, row.bw_image)])
+
+        # 사용자가 작성한 모든 게시글과 좋아요 삭제
+        user_articles = select(Article.id).where(Article.user_id == user_id).scalar_subquery()
+        await db.execute(
+            delete(Like).where(or_(Like.user_id == user_id, Like.article_id.in_(user_articles))),
+            execution_options=bulk,
+        )
+        deleted_articles = await db.execute(delete(Article).where(Article.user_id == user_id), execution_options=bulk)
+        logger.info(f"{deleted_articles.rowcount}개의 게시글을 삭제합니다.")
+
+        # 아이 정보, 통계, 사용자 정보 삭제
+        await db.execute(delete(Baby).where(Baby.user_id == user_id), execution_options=bulk)
+        await db.execute(delete(UserStats).where(UserStats.user_id == user_id), execution_options=bulk)
+        await db.execute(delete(User).where(User.id == user_id), execution_options=bulk)
+
+        # 탈퇴 안내 이메일 등록 (탈퇴와 함께 커밋)
+        await db.run_sync(send_bye_email, user.email)
+        await db.commit()
+        identity_cache.invalidate_user(user_id)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"회원 탈퇴 오류: {e}") # 탈퇴 에러 내용 출력
         raise HTTPException(status_code=500, detail="회원 탈퇴에 실패하였습니다. 다시 시도해 주세요")
+
+    # 참조가 없어진 파일 삭제는 응답 후 백그라운드에서 처리
+    background_tasks.add_task(purge_released_assets, released)
     
     # 세션 비우기
     request.session.clear()
 
-    # 탈퇴 안내 이메일 발송
-    background_tasks.add_task(send_bye_email, user.email)
-
     # 탈퇴 성공 응답 리턴
     logger.info(f"회원 탈퇴 완료: 사용자 ID {user_id}에게 탈퇴 안내 이메일 발송")
     return {"success": True, "message": "회원 탈퇴가 완료되었습니다."}
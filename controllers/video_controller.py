@@ -42,7 +42,7 @@ def search_videos(theme):
         f"?part=snippet&maxResults=5&type=video&q={query}&key={google_api_key}"
     )
 
-    response = requests.get(url)
+    response = requests.get(url, timeout=10)
 
     # 응답코드가 200이 아닐 때 (응답 실패)
     if response.status_code != 200:
@@ -0,0 +1,86 @@
+import os
+from functools import lru_cache
+from typing import Dict, Tuple
+from jinja2 import Environment, StrictUndefined, Template
+
+# 사용자 언어에 맞는 템플릿이 없을 때 사용할 언어
+CAMPAIGN_DEFAULT_LOCALE = os.getenv('CAMPAIGN_DEFAULT_LOCALE', 'ko')
+
+# 대량 안내 메일 템플릿: {이름: {언어: (제목, HTML 본문)}}
+# 본문은 캠페인 변수(params)로만 채우고 수신자별 내용은 넣지 않음 (언어별로 한 번만 렌더링)
+CAMPAIGN_TEMPLATES: Dict[str, Dict[str, Tuple[str, str]]] = {
+    "story_ready": {
+        "ko": (
+            "오늘 밤 읽어줄 동화가 준비되었어요 🌙",
+            """
+            <html>
+                <body>
+                    <p><strong>{{ title }}</strong> 동화가 준비되었어요.</p>
+                    {% if summary is defined and summary %}<p>{{ summary }}</p>{% endif %}
+                    <p>잠들기 전 아이와 함께 들어 보세요. 🧸</p>
+                    <p><a href="{{ link | default('http://localhost:8501') }}" target="_blank">✅ 동화 보러 가기</a></p>
+                </body>
+            </html>
+            """,
+        ),
+        "en": (
+            "Tonight's story is ready 🌙",
+            """
+            <html>
+                <body>
+                    <p><strong>{{ title }}</strong> is ready for tonight.</p>
+                    {% if summary is defined and summary %}<p>{{ summary }}</p>{% endif %}
+                    <p>Listen to it together before bedtime. 🧸</p>
+                    <p><a href="{{ link | default('http://localhost:8501') }}" target="_blank">✅ Read the story</a></p>
+                </body>
+            </html>
+            """,
+        ),
+    },
+    "new_themes": {
+        "ko": (
+            "새로운 동화 테마가 추가되었어요 ✨",
+            """
+            <html>
+                <body>
+                    <p><strong>동화 생성앱</strong>에 새로운 테마가 추가되었어요!</p>
+                    <ul>{% for theme in themes %}<li>{{ theme }}</li>{% endfor %}</ul>
+                    <p><a href="{{ link | default('http://localhost:8501') }}" target="_blank">✅ 동화 만들러 가기</a></p>
+                </body>
+            </html>
+            """,
+        ),
+        "en": (
+            "New story themes have arrived ✨",
+            """
+            <html>
+                <body>
+                    <p>We added new themes to <strong>Fairytale</strong>!</p>
+                    <ul>{% for theme in themes %}<li>{{ theme }}</li>{% endfor %}</ul>
+                    <p><a href="{{ link | default('http://localhost:8501') }}" target="_blank">✅ Create a story</a></p>
+                </body>
+            </html>
+            """,
+        ),
+    },
+}
+
+# 사용자 입력(params)이 HTML 에 그대로 들어가지 않도록 자동 이스케이프, 빠진 변수는 오류로 처리
+_environment = Environment(autoescape=True, undefined=StrictUndefined)
+
+
+@lru_cache(maxsize=None)
+def compile_template(name: str, locale: str) -> Tuple[Template, Template]:
+    """(제목, 본문) 템플릿을 한 번만 컴파일해 재사용"""
+    subject, body = CAMPAIGN_TEMPLATES[name][locale]
+    return _environment.from_string(subject), _environment.from_string(body)
+
+
+def resolve_locale(name: str, locale: str) -> str:
+    return locale if locale in CAMPAIGN_TEMPLATES[name] else CAMPAIGN_DEFAULT_LOCALE
+
+
+def render_campaign(name: str, locale: str, params: Dict) -> Tuple[str, str]:
+    """(제목, HTML 본문) 반환, 없는 템플릿/언어는 KeyError, 빠진 변수는 jinja2 UndefinedError"""
+    subject, body = compile_template(name, resolve_locale(name, locale))
+    return subject.render(**params).strip(), body.render(**params)
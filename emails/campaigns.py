@@ -0,0 +1,351 @@
+import os
+import time
+import random
+import smtplib
+import logging
+import threading
+from email.policy import compat32
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event, func, or_, update
+from sqlalchemy.orm import Session
+from models_dir.database import SessionLocal
+from models_dir.models import User, EmailCampaign, EmailCampaignFailure
+from emails.outbox import SMTPConnectionPool, EMAIL_SENDER, build_message, is_permanent_error
+from emails.campaign_templates import render_campaign, resolve_locale
+
+logger = logging.getLogger(__name__)
+
+# 대량 발송 설정
+CAMPAIGN_CONNECTIONS = int(os.getenv('CAMPAIGN_CONNECTIONS', '4'))  # 동시에 사용할 SMTP 연결 수 (일반 메일 풀과 별도)
+CAMPAIGN_RATE = float(os.getenv('CAMPAIGN_RATE', '100'))  # 초당 최대 발송 수 (0 이면 제한 없음, SMTP 제공자 한도에 맞춰 설정)
+CAMPAIGN_CHUNK_SIZE = int(os.getenv('CAMPAIGN_CHUNK_SIZE', '500'))  # 한 번에 읽어 발송하고 진행 위치를 저장할 사용자 수
+CAMPAIGN_POLL_INTERVAL = float(os.getenv('CAMPAIGN_POLL_INTERVAL', '10'))  # 새 캠페인 확인 주기(초), 등록 시에는 바로 깨움
+CAMPAIGN_MAX_OUTAGES = int(os.getenv('CAMPAIGN_MAX_OUTAGES', '5'))  # 한 묶음 전체가 연결 오류로 실패할 때 재시도 횟수 (초과 시 캠페인 실패)
+CAMPAIGN_OUTAGE_BACKOFF = float(os.getenv('CAMPAIGN_OUTAGE_BACKOFF', '30'))  # 연결 오류 시 첫 대기 시간(초)
+CAMPAIGN_STALE_AFTER = int(os.getenv('CAMPAIGN_STALE_AFTER', '300'))  # running 상태로 진행 갱신이 이 시간 이상 멈추면 다른 워커가 이어받음
+
+CAMPAIGN_FINISHED = ("done", "cancelled", "failed")
+
+# (사용자 ID, 이메일, 언어)
+Recipient = Tuple[int, str, str]
+
+
+# 발송 속도 제한 (여러 발송 스레드가 공유)
+class Throttle:
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# 언어별로 한 번만 렌더링/직렬화한 메일 (수신자마다 To 헤더만 앞에 붙여 발송)
+# smtplib 은 bytes 본문의 줄바꿈을 고치지 않으므로 직접 CRLF 로 직렬화 (bare LF 는 엄격한 서버가 거부)
+SMTP_POLICY = compat32.clone(linesep="\r\n")  # build_message 의 MIMEMultipart 와 같은 compat32 정책, 줄바꿈만 CRLF
+
+
+class RenderedCampaign:
+    def __init__(self, template: str, params: Dict, sender: str = EMAIL_SENDER):
+        self.template = template
+        self.params = params
+        self.sender = sender
+        self._messages: Dict[str, bytes] = {}
+
+    def message_for(self, locale: str) -> bytes:
+        locale = resolve_locale(self.template, locale)
+        if locale not in self._messages:
+            subject, html_body = render_campaign(self.template, locale, self.params)
+            message = build_message("", subject, html_body, sender=self.sender)
+            del message["To"]
+            self._messages[locale] = message.as_bytes(policy=SMTP_POLICY)
+        return self._messages[locale]
+
+    def data_for(self, recipient: str, locale: str) -> bytes:
+        if "\r" in recipient or "\n" in recipient:
+            raise ValueError(f"잘못된 수신자 주소입니다: {recipient!r}")
+        return SMTP_POLICY.fold_binary("To", recipient) + self.message_for(locale)
+
+
+# 캠페인 등록 (커밋은 호출자가 담당, 커밋되면 워커를 바로 깨움), 템플릿/변수는 여기서 한 번 렌더링해 잘못된 요청을 바로 거절
+def create_campaign(db: Session, template: str, params: Dict, created_by: Optional[int] = None) -> EmailCampaign:
+    render_campaign(template, "", params)
+    campaign = EmailCampaign(template=template, params=params, status="pending", total=0, sent=0, failed=0,
+                             cursor_user_id=0, created_by=created_by)
+    db.add(campaign)
+    event.listen(db, "after_commit", lambda session: campaign_worker.wake(), once=True)
+    return campaign
+
+
+def campaign_progress(campaign: EmailCampaign) -> Dict:
+    """진행률, 초당 발송 수, 예상 남은 시간"""
+    processed = campaign.sent + campaign.failed
+    progress = {"processed": processed, "percent": round(processed * 100 / campaign.total, 1) if campaign.total else 0.0,
+                "rate_per_second": None, "eta_seconds": None}
+    if campaign.started_at and processed:
+        elapsed = ((campaign.finished_at or datetime.now()) - campaign.started_at).total_seconds()
+        if elapsed > 0:
+            rate = processed / elapsed
+            progress["rate_per_second"] = round(rate, 1)
+            if campaign.status == "running":
+                progress["eta_seconds"] = int(max(campaign.total - processed, 0) / rate)
+    return progress
+
+
+# 캠페인 발송 워커
+class CampaignWorker:
+    """email_campaigns 를 하나씩 가져와 사용자 테이블을 id 순으로 나눠 읽고, 연결 풀과 속도 제한을 거쳐 발송
+
+    묶음마다 발송 수/실패 수/진행 위치를 저장하므로 재시작하면 마지막 저장 위치부터 이어서 발송한다.
+    """
+
+    def __init__(self, pool: Optional[SMTPConnectionPool] = None, rate: float = CAMPAIGN_RATE,
+                 chunk_size: int = CAMPAIGN_CHUNK_SIZE, poll_interval: float = CAMPAIGN_POLL_INTERVAL):
+        self.pool = pool or SMTPConnectionPool(size=CAMPAIGN_CONNECTIONS)
+        self.rate = rate
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.stats: Counter = Counter()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="campaign-worker", daemon=True)
+        self._thread.start()
+        logger.info(f"캠페인 발송 워커 시작: 연결 {self.pool.size}개, 초당 {self.rate or '무제한'}건")
+
+    def stop(self, timeout: float = 10):
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self.pool.close_all()
+        logger.info("캠페인 발송 워커 종료")
+
+    def wake(self):
+        self._wake_event.set()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                campaign_id = self._claim()
+                if campaign_id is not None:
+                    self.run_campaign(campaign_id)
+                    continue
+            except Exception as e:
+                logger.error(f"캠페인 처리 중 오류: {e}")
+            if self._wake_event.wait(self.poll_interval):
+                self._wake_event.clear()
+
+    def _claim(self) -> Optional[int]:
+        """대기 중이거나 진행이 멈춘 캠페인 하나를 running 으로 바꾸고 ID 반환"""
+        db: Session = SessionLocal()
+        try:
+            now = datetime.now()
+            stale_before = now - timedelta(seconds=CAMPAIGN_STALE_AFTER)
+            candidate = (
+                db.query(EmailCampaign.id, EmailCampaign.status, EmailCampaign.started_at)
+                .filter(or_(EmailCampaign.status == "pending",
+                            (EmailCampaign.status == "running") & (EmailCampaign.updated_at <= stale_before)))
+                .order_by(EmailCampaign.id)
+                .first()
+            )
+            if candidate is None:
+                return None
+            # 상태가 그대로인 경우에만 가져감 (다른 워커와 동시에 가져가지 않도록 조건부 UPDATE)
+            values = {"status": "running", "updated_at": now}
+            if candidate.started_at is None:
+                total = db.query(func.count(User.id)).scalar()
+                values.update(started_at=now, total=total)
+            query = update(EmailCampaign).where(EmailCampaign.id == candidate.id, EmailCampaign.status == candidate.status)
+            if candidate.status == "running":
+                query = query.where(EmailCampaign.updated_at <= stale_before)
+            claimed = db.execute(query.values(**values)).rowcount
+            db.commit()
+            return candidate.id if claimed else None
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def run_campaign(self, campaign_id: int):
+        db: Session = SessionLocal()
+        try:
+            campaign = db.get(EmailCampaign, campaign_id)
+            rendered = RenderedCampaign(campaign.template, campaign.params or {})
+            cursor = campaign.cursor_user_id
+        finally:
+            db.close()
+        logger.info(f"캠페인 {campaign_id} 발송 시작 (사용자 id > {cursor})")
+
+        outages = 0
+        with ThreadPoolExecutor(max_workers=self.pool.size, thread_name_prefix=f"campaign-{campaign_id}") as executor:
+            throttle = Throttle(self.rate)
+            while not self._stop_event.is_set():
+                recipients = self._load_chunk(cursor)
+                if not recipients:
+                    self._finish(campaign_id, "done")
+                    return
+                sent, failures = self._send_chunk(executor, throttle, rendered, recipients)
+                if not sent and failures and not any(is_permanent_error(error) for *_, error in failures):
+                    # 묶음 전체가 연결/인증 오류로 실패하면 SMTP 장애로 보고 진행 위치를 유지한 채 대기
+                    outages += 1
+                    error = failures[0][2]
+                    if outages > CAMPAIGN_MAX_OUTAGES:
+                        self._finish(campaign_id, "failed", error)
+                        return
+                    delay = CAMPAIGN_OUTAGE_BACKOFF * (2 ** (outages - 1)) * random.uniform(0.8, 1.2)
+                    logger.warning(f"캠페인 {campaign_id} SMTP 오류, {delay:.0f}초 후 재시도: {error}")
+                    if not self._touch(campaign_id, error) or self._stop_event.wait(delay):
+                        return
+                    continue
+                outages = 0
+                cursor = recipients[-1][0]
+                if not self._record_chunk(campaign_id, cursor, sent, failures):
+                    logger.info(f"캠페인 {campaign_id} 중단됨 (사용자 id {cursor} 까지 처리)")
+                    return
+        # 서버 종료 시 다음 시작 때 바로 이어서 발송하도록 대기 상태로 되돌림
+        self._release(campaign_id)
+
+    def _load_chunk(self, cursor: int) -> List[Recipient]:
+        db: Session = SessionLocal()
+        try:
+            return [
+                tuple(row) for row in
+                db.query(User.id, User.email, User.locale)
+                .filter(User.id > cursor)
+                .order_by(User.id)
+                .limit(self.chunk_size)
+                .all()
+            ]
+        finally:
+            db.close()
+
+    def _send_slice(self, throttle: Throttle, rendered: RenderedCampaign, recipients: List[Recipient]) -> Tuple[int, list]:
+        """연결 하나로 수신자 일부 발송, (성공 수, [(사용자 ID, 이메일, 오류)]) 반환"""
+        sent, failures = 0, []
+        remaining = list(recipients)
+        try:
+            with self.pool.connection() as conn:
+                while remaining:
+                    user_id, email, locale = remaining[0]
+                    throttle.wait()
+                    try:
+                        conn.send_raw(rendered.sender, email, rendered.data_for(email, locale))
+                        sent += 1
+                    except (smtplib.SMTPRecipientsRefused, ValueError) as e:
+                        failures.append((user_id, email, e))
+                    except smtplib.SMTPResponseException as e:
+                        if not is_permanent_error(e):
+                            raise
+                        failures.append((user_id, email, e))
+                    remaining.pop(0)
+        except Exception as e:
+            # 연결이 끊긴 뒤의 수신자는 같은 오류로 실패 처리
+            failures.extend((user_id, email, e) for user_id, email, _ in remaining)
+        return sent, failures
+
+    def _send_chunk(self, executor: ThreadPoolExecutor, throttle: Throttle, rendered: RenderedCampaign,
+                    recipients: List[Recipient]) -> Tuple[int, list]:
+        slices = [recipients[index::self.pool.size] for index in range(self.pool.size)]
+        results = list(executor.map(lambda part: self._send_slice(throttle, rendered, part), [part for part in slices if part]))
+        sent = sum(count for count, _ in results)
+        failures = [failure for _, part in results for failure in part]
+        # 일부만 연결 오류로 실패한 경우 새 연결로 한 번 더 시도
+        transient = [(user_id, email) for user_id, email, error in failures if not is_permanent_error(error)]
+        if sent and transient:
+            retry_ids = {user_id for user_id, _ in transient}
+            locales = {user_id: locale for user_id, _, locale in recipients}
+            retried, still_failed = self._send_slice(throttle, rendered, [(user_id, email, locales[user_id]) for user_id, email in transient])
+            sent += retried
+            failures = [failure for failure in failures if failure[0] not in retry_ids] + still_failed
+        return sent, failures
+
+    def _record_chunk(self, campaign_id: int, cursor: int, sent: int, failures: list) -> bool:
+        """묶음 결과와 진행 위치 저장 (발송 중 취소되어도 보낸 만큼은 기록), 계속 진행할 상태가 아니면 False"""
+        db: Session = SessionLocal()
+        try:
+            db.execute(
+                update(EmailCampaign)
+                .where(EmailCampaign.id == campaign_id)
+                .values(sent=EmailCampaign.sent + sent, failed=EmailCampaign.failed + len(failures),
+                        cursor_user_id=cursor, updated_at=datetime.now(),
+                        last_error=str(failures[-1][2])[:1000] if failures else EmailCampaign.last_error)
+            )
+            db.add_all([
+                EmailCampaignFailure(campaign_id=campaign_id, user_id=user_id, recipient=email, error=str(error)[:1000])
+                for user_id, email, error in failures
+            ])
+            status = db.query(EmailCampaign.status).filter(EmailCampaign.id == campaign_id).scalar()
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        self.count("sent", sent)
+        self.count("failed", len(failures))
+        return status == "running"
+
+    def _set_status(self, campaign_id: int, from_status: str, **values) -> bool:
+        db: Session = SessionLocal()
+        try:
+            updated = db.execute(
+                update(EmailCampaign)
+                .where(EmailCampaign.id == campaign_id, EmailCampaign.status == from_status)
+                .values(updated_at=datetime.now(), **values)
+            ).rowcount
+            db.commit()
+            return bool(updated)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _touch(self, campaign_id: int, error: Exception) -> bool:
+        """진행이 멈춘 것으로 보이지 않도록 갱신 시각만 저장 (취소되었으면 False)"""
+        return self._set_status(campaign_id, "running", last_error=str(error)[:1000])
+
+    def _release(self, campaign_id: int):
+        self._set_status(campaign_id, "running", status="pending")
+
+    def _finish(self, campaign_id: int, status: str, error: Optional[Exception] = None):
+        values = {"status": status, "finished_at": datetime.now()}
+        if error is not None:
+            values["last_error"] = str(error)[:1000]
+        self._set_status(campaign_id, "running", **values)
+        self.count(f"campaigns_{status}")
+        log = logger.error if status == "failed" else logger.info
+        log(f"캠페인 {campaign_id} 종료: {status}" + (f" ({error})" if error else ""))
+
+    def count(self, key: str, value: int = 1):
+        with self._lock:
+            self.stats[key] += value
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        return {"running": bool(self._thread and self._thread.is_alive()), "rate_limit": self.rate,
+                "messages": stats, "smtp_pool": self.pool.snapshot()}
+
+
+# 전역 캠페인 발송 워커
+campaign_worker = CampaignWorker()
@@ -1,32 +1,33 @@
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from dotenv import load_dotenv
-import os
+from html import escape
+from typing import Tuple
 from pydantic import BaseModel
 import logging
 
-load_dotenv()
-
 # 로거 설정
 logger = logging.getLogger(__name__)
 
+
+# 이메일 템플릿 기본 클래스 (SMTP 발송은 emails/outbox.py 의 발송 대기열이 담당)
+class EmailTemplate:
+    kind = "generic"  # 발송 대기열에 기록되는 메일 종류
+    subject = ""
+    sensitive = False  # 임시 비밀번호 등 비밀 정보 포함 여부 (True 면 대기열에 암호화해 저장)
+
+    def render(self, **kwargs) -> str:
+        raise NotImplementedError
+
+    def build(self, **kwargs) -> Tuple[str, str]:
+        """(제목, HTML 본문) 반환"""
+        return self.subject, self.render(**kwargs)
+
 # 회원 가입 환영 이메일
-class EmailServiceWelcome:
-    def send_email(
-            self,
-            receiver_email: str,
-    ):
-        sender_email = os.getenv('EMAIL_ADDRESS')
-        password = os.getenv('EMAIL_PASSWORD')
-
-        message = MIMEMultipart("alternative")
-        message["From"] = sender_email
-        message["To"] = receiver_email
-        message["Subject"] = "회원 가입을 환영합니다."
+class EmailServiceWelcome(EmailTemplate):
+    kind = "welcome"
+    subject = "회원 가입을 환영합니다."
 
+    def render(self) -> str:
         # HTML 본문 구성
-        html_body = f"""
+        return """
         <html>
             <body>
                 <p><strong>동화 생성앱</strong> 회원가입을 환영합니다!</p>
@@ -37,31 +38,14 @@ class EmailServiceWelcome:
         </html>
         """
 
-        message.attach(MIMEText(html_body, "html"))
-        try:
-            with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-                server.login(sender_email, password)
-                server.send_message(message)
-            logger.info(f"회원가입 이메일이 {receiver_email}로 성공적으로 전송되었습니다.")
-        except Exception as e:
-            logger.error(f"이메일 전송 실패: {e}")
-
 # 회원 탈퇴 이메일
-class EmailServiceBye:
-    def send_email(
-            self,
-            receiver_email: str,
-    ):
-        sender_email = os.getenv('EMAIL_ADDRESS')
-        password = os.getenv('EMAIL_PASSWORD')
-
-        message = MIMEMultipart("alternative")
-        message["From"] = sender_email
-        message["To"] = receiver_email
-        message["Subject"] = "탈퇴 완료 이메일."
+class EmailServiceBye(EmailTemplate):
+    kind = "bye"
+    subject = "탈퇴 완료 이메일."
 
+    def render(self) -> str:
         # HTML 본문 구성
-        html_body = f"""
+        return """
         <html>
             <body>
                 <p><strong>동화생성 앱</strong> 회원 탈퇴가 완료되었습니다.</p>
@@ -72,75 +56,37 @@ class EmailServiceBye:
         </html>
         """
 
-        message.attach(MIMEText(html_body, "html"))
-
-        try:
-            with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-                server.login(sender_email, password)
-                server.send_message(message)
-            logger.info(f"탈퇴 안내 이메일이 {receiver_email}로 성공적으로 전송되었습니다.")
-        except Exception as e:
-            logger.error(f"이메일 전송 실패: {e}")
-
 # 아이디 찾기 이메일
-class EmailServiceFindId:
-    def send_email(
-            self,
-            receiver_email: str,
-            username: str,
-    ):
-        sender_email = os.getenv('EMAIL_ADDRESS')
-        password = os.getenv('EMAIL_PASSWORD')
-
-        message = MIMEMultipart("alternative")
-        message["From"] = sender_email
-        message["To"] = receiver_email
-        message["Subject"] = "아이디 찾기 이메일."
+class EmailServiceFindId(EmailTemplate):
+    kind = "find_id"
+    subject = "아이디 찾기 이메일."
 
+    def render(self, username: str) -> str:
         # HTML 본문 구성
-        html_body = f"""
+        return f"""
         <html>
             <body>
-                <p>사용자님의 아이디는 <strong>{username}</strong> 입니다.</p>
+                <p>사용자님의 아이디는 <strong>{escape(username)}</strong> 입니다.</p>
                 <p><a href="http://localhost:8501/settings" target="_blank">✅ 로그인하러 가기</a></p>
             </body>
         </html>
         """
 
-        message.attach(MIMEText(html_body, "html"))
-
-        try:
-            with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-                server.login(sender_email, password)
-                server.send_message(message)
-            logger.info(f"아이디가 {receiver_email}로 성공적으로 전송되었습니다.")
-        except Exception as e:
-            logger.error(f"이메일 전송 실패: {e}")
-
 class EmailRequest(BaseModel):
     email: str
 
 # 임시 비밀번호 이메일
-class EmailServiceSendTempPW:
-    def send_email(
-            self,
-            receiver_email: str,
-            username: str,
-            temp_password: str,
-    ):
-        sender_email = os.getenv('EMAIL_ADDRESS')
-        password = os.getenv('EMAIL_PASSWORD')
-
-        message = MIMEMultipart("alternative")
-        message["From"] = sender_email
-        message["To"] = receiver_email
-        message["Subject"] = "임시 비밀번호 이메일"
-
-         # HTML 본문 구성
-        html_body = f"""
+class EmailServiceSendTempPW(EmailTemplate):
+    kind = "temp_password"
+    subject = "임시 비밀번호 이메일"
+    sensitive = True
+
+    def render(self, username: str, temp_password: str) -> str:
+        # HTML 본문 구성
+        return f"""
         <html>
             <body>
-                <p><strong>{username}</strong>님의 임시비밀번호는 {temp_password} 입니다.</p>
+                <p><strong>{escape(username)}</strong>님의 임시비밀번호는 {escape(temp_password)} 입니다.</p>
                 <p>해당 비밀번호는 임시 비밀번호이므로, 비밀번호를 변경하는 것을 권장 드립니다.</p>
                 <p>아래 링크를 통해 비밀번호를 변경해 주세요.</p>
                 <p><a href="http://localhost:8501/settings" target="_blank">➡️ 비밀번호 변경하러 가기</a></p>
@@ -148,53 +94,24 @@ class EmailServiceSendTempPW:
         </html>
         """
 
-        message.attach(MIMEText(html_body, "html"))
-
-        try:
-            with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-                server.login(sender_email, password)
-                server.send_message(message)
-            logger.info(f"임시 비밀번호가 {receiver_email}로 성공적으로 전송되었습니다.")
-        except Exception as e:
-            logger.error(f"이메일 전송 실패: {e}")
-        
 class UsernameEmailRequest(BaseModel):
     username: str
     email: str
 
 
 # 비밀번호 변경 이메일
-class EmailServiceSendNewPW:
-    def send_email(
-            self,
-            receiver_email: str,
-            username: str,
-    ):
-        sender_email = os.getenv('EMAIL_ADDRESS')
-        password = os.getenv('EMAIL_PASSWORD')
-
-        message = MIMEMultipart("alternative")
-        message["From"] = sender_email
-        message["To"] = receiver_email
-        message["Subject"] = "비밀번호 변경 안내 이메일"
+class EmailServiceSendNewPW(EmailTemplate):
+    kind = "password_changed"
+    subject = "비밀번호 변경 안내 이메일"
 
+    def render(self, username: str) -> str:
         # HTML 본문 구성
-        html_body = f"""
+        return f"""
         <html>
             <body>
-                <p><strong>{username}</strong> 사용자님의 비밀번호가 변경되었습니다.</p>
+                <p><strong>{escape(username)}</strong> 사용자님의 비밀번호가 변경되었습니다.</p>
                 <p>만약 본인이 변경한 것이 아니라면 아래 링크를 통해 비밀번호를 즉시 변경해 주세요.</p>
                 <p><a href="http://localhost:8501/settings" target="_blank">➡️ 비밀번호 변경하러 가기</a></p>
             </body>
         </html>
         """
-
-        message.attach(MIMEText(html_body, "html"))  # HTML 형식으로 첨부
-
-        try:
-            with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-                server.login(sender_email, password)
-                server.send_message(message)
-            print(f"이메일이 {receiver_email}로 성공적으로 전송되었습니다.")
-        except Exception as e:
-            print(f"이메일 전송 실패: {e}")
\ No newline at end of file
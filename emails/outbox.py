@@ -0,0 +1,400 @@
+import os
+import time
+import queue
+import random
+import smtplib
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from cryptography.fernet import Fernet, InvalidToken
+from sqlalchemy import event, or_
+from sqlalchemy.orm import Session
+from models_dir.database import SessionLocal
+from models_dir.models import EmailOutbox
+from emails.email_class import EmailTemplate
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# SMTP 설정 (로컬 테스트: python -m aiosmtpd -n -l localhost:1025 실행 후 SMTP_HOST=localhost SMTP_PORT=1025 SMTP_SECURITY=none)
+SMTP_HOST = os.getenv('SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT = int(os.getenv('SMTP_PORT', '465'))
+SMTP_SECURITY = os.getenv('SMTP_SECURITY', 'ssl')  # ssl / starttls / none
+SMTP_USERNAME = os.getenv('SMTP_USERNAME', os.getenv('EMAIL_ADDRESS'))  # 비어 있으면 로그인 생략
+SMTP_PASSWORD = os.getenv('SMTP_PASSWORD', os.getenv('EMAIL_PASSWORD'))
+SMTP_TIMEOUT = float(os.getenv('SMTP_TIMEOUT', '10'))  # 연결/응답 대기 시간(초)
+SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', '2'))  # 동시에 유지할 SMTP 연결 수
+SMTP_MAX_MESSAGES = int(os.getenv('SMTP_MAX_MESSAGES', '100'))  # 연결 하나로 보낼 최대 메일 수 (이후 재연결)
+SMTP_IDLE_TIMEOUT = float(os.getenv('SMTP_IDLE_TIMEOUT', '60'))  # 이 시간 이상 쉰 연결은 NOOP 으로 확인 후 사용
+EMAIL_SENDER = os.getenv('EMAIL_ADDRESS', SMTP_USERNAME or 'no-reply@localhost')
+
+# 발송 대기열 설정
+EMAIL_WORKER_ENABLED = os.getenv('EMAIL_WORKER_ENABLED', 'true').lower() == 'true'  # 별도 프로세스에서만 발송할 경우 false
+EMAIL_WORKERS = int(os.getenv('EMAIL_WORKERS', str(SMTP_POOL_SIZE)))  # 발송 스레드 수
+EMAIL_POLL_INTERVAL = float(os.getenv('EMAIL_POLL_INTERVAL', '5'))  # 대기열 확인 주기(초), 등록 시에는 바로 깨움
+EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', '20'))  # 한 번에 가져와 같은 연결로 보낼 메일 수
+EMAIL_MAX_ATTEMPTS = int(os.getenv('EMAIL_MAX_ATTEMPTS', '6'))  # 최대 재시도 횟수
+EMAIL_BACKOFF_BASE = float(os.getenv('EMAIL_BACKOFF_BASE', '10'))  # 첫 재시도 대기 시간(초)
+EMAIL_BACKOFF_MAX = float(os.getenv('EMAIL_BACKOFF_MAX', '1800'))  # 최대 재시도 대기 시간(초)
+EMAIL_STALE_AFTER = int(os.getenv('EMAIL_STALE_AFTER', '300'))  # sending 상태로 이 시간 이상 멈춘 메일은 다시 시도
+EMAIL_BODY_KEY = os.getenv('EMAIL_BODY_KEY')  # 비밀 정보가 담긴 본문 암호화 키 (Fernet.generate_key(), 같은 DB 를 쓰는 서버는 모두 같은 값, 필수)
+
+ENCRYPTED_PREFIX = "enc:v1:"  # 암호화된 본문 표시
+
+
+# 본문 암호화 (대기열은 모든 워커가 공유하므로 키도 모든 프로세스가 같아야 함, 프로세스별 임시 키는 쓰지 않음)
+class BodyCipher:
+    def __init__(self, key: Optional[str] = EMAIL_BODY_KEY):
+        self._fernet = Fernet(key) if key else None
+
+    def ensure_configured(self):
+        """키가 없으면 RuntimeError (앱 시작 시 호출해 비밀 메일을 등록하기 전에 실패)"""
+        if self._fernet is None:
+            raise RuntimeError(
+                "EMAIL_BODY_KEY 가 설정되지 않았습니다. 임시 비밀번호 메일을 암호화할 수 없습니다. "
+                "(Fernet.generate_key() 로 만든 값을 모든 서버에 같은 값으로 설정)"
+            )
+
+    def encrypt(self, body: str) -> str:
+        self.ensure_configured()
+        return ENCRYPTED_PREFIX + self._fernet.encrypt(body.encode("utf-8")).decode("ascii")
+
+    def decrypt(self, stored: Optional[str]) -> str:
+        """암호화하지 않은 본문은 그대로 반환, 키가 맞지 않으면 InvalidToken"""
+        if not stored or not stored.startswith(ENCRYPTED_PREFIX):
+            return stored or ""
+        self.ensure_configured()
+        return self._fernet.decrypt(stored[len(ENCRYPTED_PREFIX):].encode("ascii")).decode("utf-8")
+
+
+# 전역 본문 암호화 객체
+body_cipher = BodyCipher()
+
+
+def build_message(recipient: str, subject: str, html_body: str, sender: str = EMAIL_SENDER) -> MIMEMultipart:
+    message = MIMEMultipart("alternative")
+    message["From"] = sender
+    message["To"] = recipient
+    message["Subject"] = subject
+    message.attach(MIMEText(html_body, "html"))
+    return message
+
+
+def is_permanent_error(error: Exception) -> bool:
+    """받는 사람 거부나 5xx 응답, 잘못된 수신자 주소(ValueError), 복호화할 수 없는 본문은 재시도해도 같은 결과 (인증 실패는 설정 문제이므로 재시도)"""
+    if isinstance(error, (smtplib.SMTPRecipientsRefused, InvalidToken, ValueError)):
+        return True
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return False
+    return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+
+# 풀에서 빌려주는 SMTP 연결
+class PooledSMTPConnection:
+    def __init__(self, pool: "SMTPConnectionPool"):
+        self.pool = pool
+        self.smtp: Optional[smtplib.SMTP] = None
+        self.sent = 0
+        self.last_used = 0.0
+
+    def connect(self):
+        self.close()
+        self.smtp = self.pool.open()
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+    def close(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except Exception:
+                self.smtp.close()
+            self.smtp = None
+
+    def ensure_ready(self):
+        """끊겼거나, 오래 쉬었는데 응답이 없거나, 보낸 메일이 많은 연결은 새로 연결"""
+        if self.smtp is None or self.sent >= self.pool.max_messages:
+            self.connect()
+            return
+        if time.monotonic() - self.last_used > self.pool.idle_timeout:
+            try:
+                if self.smtp.noop()[0] == 250:
+                    return
+            except smtplib.SMTPException:
+                pass
+            self.connect()
+
+    def _deliver(self, send: Callable[[smtplib.SMTP], object]):
+        self.ensure_ready()
+        try:
+            send(self.smtp)
+        except smtplib.SMTPServerDisconnected:
+            # 서버가 유휴 연결을 끊은 경우 한 번만 다시 연결해 재전송
+            self.pool.count("reconnects")
+            self.connect()
+            send(self.smtp)
+        self.sent += 1
+        self.last_used = time.monotonic()
+
+    def send(self, message: MIMEMultipart):
+        self._deliver(lambda smtp: smtp.send_message(message))
+
+    def send_raw(self, sender: str, recipient: str, data: bytes):
+        """미리 직렬화한 메일 (대량 발송에서 같은 본문을 수신자마다 다시 만들지 않음)"""
+        self._deliver(lambda smtp: smtp.sendmail(sender, [recipient], data))
+
+
+# SMTP 연결 풀
+class SMTPConnectionPool:
+    """로그인된 SMTP 연결을 재사용해 메일마다 TLS 핸드셰이크/로그인을 반복하지 않도록 하는 풀"""
+
+    def __init__(self, size: int = SMTP_POOL_SIZE, host: str = SMTP_HOST, port: int = SMTP_PORT,
+                 security: str = SMTP_SECURITY, username: Optional[str] = SMTP_USERNAME, password: Optional[str] = SMTP_PASSWORD,
+                 timeout: float = SMTP_TIMEOUT, max_messages: int = SMTP_MAX_MESSAGES, idle_timeout: float = SMTP_IDLE_TIMEOUT):
+        self.size = max(1, size)
+        self.host, self.port, self.security = host, port, security
+        self.username, self.password = username, password
+        self.timeout = timeout
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._idle: "queue.LifoQueue[PooledSMTPConnection]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self.stats: Counter = Counter()
+
+    def count(self, key: str, value: int = 1):
+        with self._lock:
+            self.stats[key] += value
+
+    def open(self) -> smtplib.SMTP:
+        if self.security == "ssl":
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.security == "starttls":
+                smtp.starttls()
+        try:
+            if self.username and self.password:
+                smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        self.count("connects")
+        return smtp
+
+    @contextmanager
+    def connection(self):
+        """연결 하나를 빌려 사용 (풀 크기만큼만 동시에 사용 가능), 오류가 난 연결은 반납하지 않고 닫음"""
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+                self.count("reuses")
+            except queue.Empty:
+                conn = PooledSMTPConnection(self)
+            try:
+                yield conn
+            except Exception:
+                conn.close()
+                raise
+            self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": self.size, "idle": self._idle.qsize(), **self.stats}
+
+
+# 메일 등록 (커밋은 호출자가 담당, 커밋되면 워커를 바로 깨움)
+def enqueue_email(db: Session, recipient: str, template: EmailTemplate, **kwargs) -> EmailOutbox:
+    subject, html_body = template.build(**kwargs)
+    if template.sensitive:
+        html_body = body_cipher.encrypt(html_body)
+    # 가져갈 때 datetime.now() 와 비교하므로 DB 기본값(SQLite 는 UTC) 대신 같은 시계로 기록
+    email = EmailOutbox(kind=template.kind, recipient=recipient, subject=subject, body=html_body, status="pending",
+                        attempts=0, next_attempt_at=datetime.now())
+    db.add(email)
+    event.listen(db, "after_commit", lambda session: email_worker.wake(), once=True)
+    return email
+
+
+def _backoff_seconds(attempts: int) -> float:
+    """지수 백오프 + 지터"""
+    delay = min(EMAIL_BACKOFF_BASE * (2 ** (attempts - 1)), EMAIL_BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+# 이메일 발송 워커
+class EmailOutboxWorker:
+    """email_outbox 테이블에서 메일을 묶음으로 가져와 풀의 SMTP 연결로 발송하고 결과를 기록"""
+
+    def __init__(self, pool: Optional[SMTPConnectionPool] = None, workers: int = EMAIL_WORKERS,
+                 poll_interval: float = EMAIL_POLL_INTERVAL, batch_size: int = EMAIL_BATCH_SIZE):
+        self.pool = pool or SMTPConnectionPool()
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        # SQLite 는 SKIP LOCKED 가 없으므로 같은 프로세스의 스레드끼리 가져오기를 직렬화
+        self._claim_lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.stats: Counter = Counter()
+
+    def start(self):
+        if any(thread.is_alive() for thread in self._threads):
+            return
+        self._stop_event.clear()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"email-worker-{index}", daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"이메일 발송 워커 시작: {self.workers}개 ({self.pool.host}:{self.pool.port})")
+
+    def stop(self, timeout: float = 10):
+        self._stop_event.set()
+        self._wake_event.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self.pool.close_all()
+        logger.info("이메일 발송 워커 종료")
+
+    def wake(self):
+        """새 메일이 등록되면 주기를 기다리지 않고 바로 발송"""
+        self._wake_event.set()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                processed = self.process_batch()
+            except Exception as e:
+                logger.error(f"이메일 대기열 처리 중 오류: {e}")
+                processed = 0
+            # 처리할 메일이 남아 있으면 바로 다음 배치 진행
+            if processed < self.batch_size and self._wake_event.wait(self.poll_interval):
+                self._wake_event.clear()
+
+    def _claim(self) -> List[Tuple[int, str, str, str]]:
+        """발송할 메일을 sending 으로 바꾸고 (ID, 받는 사람, 제목, 본문) 목록 반환"""
+        with self._claim_lock:
+            db: Session = SessionLocal()
+            try:
+                now = datetime.now()
+                stale_before = now - timedelta(seconds=EMAIL_STALE_AFTER)
+                query = (
+                    db.query(EmailOutbox)
+                    .filter(
+                        or_(
+                            (EmailOutbox.status == "pending") & (EmailOutbox.next_attempt_at <= now),
+                            (EmailOutbox.status == "sending") & (EmailOutbox.updated_at <= stale_before),
+                        )
+                    )
+                    .order_by(EmailOutbox.id)
+                    .limit(self.batch_size)
+                )
+                # 여러 프로세스가 같은 메일을 가져가지 않도록 잠금 (PostgreSQL)
+                if db.bind.dialect.name == "postgresql":
+                    query = query.with_for_update(skip_locked=True)
+                emails = query.all()
+                for email in emails:
+                    email.status = "sending"
+                    email.updated_at = now
+                db.commit()
+                return [(email.id, email.recipient, email.subject, email.body) for email in emails]
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+    def process_batch(self) -> int:
+        """대기 중인 메일 한 묶음을 연결 하나로 발송, 처리한 메일 수 반환"""
+        emails = self._claim()
+        if not emails:
+            return 0
+        results: Dict[int, Optional[Exception]] = {}
+        try:
+            with self.pool.connection() as conn:
+                for email_id, recipient, subject, body in emails:
+                    try:
+                        conn.send(build_message(recipient, subject, body_cipher.decrypt(body)))
+                        results[email_id] = None
+                    except (smtplib.SMTPRecipientsRefused, InvalidToken, ValueError) as e:
+                        # 받는 사람만 거부되었거나 주소가 잘못되었거나 본문을 복호화할 수 없는 경우 연결은 계속 사용
+                        results[email_id] = e
+                    except smtplib.SMTPResponseException as e:
+                        results[email_id] = e
+                        if not is_permanent_error(e):
+                            raise
+        except Exception as e:
+            # 연결/로그인 실패 등은 아직 보내지 못한 메일 모두 재시도
+            logger.error(f"SMTP 연결 오류: {e}")
+            for email_id, *_ in emails:
+                results.setdefault(email_id, e)
+        self._record_results(results)
+        return len(emails)
+
+    def _record_results(self, results: Dict[int, Optional[Exception]]):
+        db: Session = SessionLocal()
+        try:
+            now = datetime.now()
+            for email in db.query(EmailOutbox).filter(EmailOutbox.id.in_(list(results))).all():
+                error = results[email.id]
+                email.attempts += 1
+                if error is None:
+                    email.status = "sent"
+                    email.sent_at = now
+                    email.last_error = None
+                    email.body = None
+                    self.count("sent")
+                elif email.attempts >= EMAIL_MAX_ATTEMPTS or is_permanent_error(error):
+                    email.status = "failed"
+                    email.last_error = str(error)[:1000]
+                    email.body = None
+                    self.count("failed")
+                    logger.error(f"이메일 발송 포기 ({email.kind} {email.recipient}, {email.attempts}회 실패): {error}")
+                else:
+                    delay = _backoff_seconds(email.attempts)
+                    email.status = "pending"
+                    email.last_error = str(error)[:1000]
+                    email.next_attempt_at = now + timedelta(seconds=delay)
+                    self.count("retried")
+                    logger.warning(f"이메일 발송 실패, {delay:.0f}초 후 재시도 ({email.kind} {email.recipient}): {error}")
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def count(self, key: str, value: int = 1):
+        with self._lock:
+            self.stats[key] += value
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        return {"workers": self.workers, "running": any(thread.is_alive() for thread in self._threads),
+                "messages": stats, "smtp_pool": self.pool.snapshot()}
+
+
+# 전역 이메일 발송 워커
+email_worker = EmailOutboxWorker()
@@ -21,7 +21,8 @@ fairytale_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.append(fairytale_path)
 
 from models_dir.models import User, Baby  # User, Baby 모델 추가 import
-from controllers.dependencies import get_db
+from models_dir.database import get_db  # with 블록을 벗어나면 세션 반환
+from controllers.identity_cache import get_baby_list  # 리런마다 DB 를 조회하지 않도록 TTL 캐시 사용
 
 
 # 로그 설정
@@ -75,10 +76,10 @@ def show_login_home():
 # 아이 출생일 가져오기
 def get_baby_birthdate(user_id):
     """사용자의 아이 출생일을 가져오는 함수"""
-    db = next(get_db())  # Streamlit 용
-    baby = db.query(Baby).filter(Baby.user_id == user_id).first()
-    if baby:
-        return baby.baby_bday, baby.baby_name
+    with get_db() as db:  # 조회 후 바로 세션 반환
+        babies = get_baby_list(db, user_id)
+    if babies:
+        return babies[0]["baby_bday"], babies[0]["baby_name"]
     else:
         logging.warning(f"사용자 {user_id}의 아이 정보가 없습니다.")
         st.error("아이 정보를 찾을 수 없습니다. 먼저 프로필에서 아이를 추가해주세요.")
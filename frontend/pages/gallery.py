@@ -5,9 +5,11 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".
 
 import streamlit as st
 from sqlalchemy.orm import Session
-from controllers.dependencies import get_db
+from models_dir.database import get_db  # with 블록을 벗어나면 세션 반환
 from models_dir.models import Story, User  # User 모델 추가 import
-from controllers.story_controller import get_user_images, display_gallery, display_story_list
+from controllers.story_controller import get_user_images, get_user_story_page, search_user_stories, display_gallery, display_story_list
+from controllers.user_stats import get_user_stats
+from controllers.identity_cache import get_user_profile
 from utils import initialize_session_state, check_login, ImageSharingUtils
 import logging
 
@@ -37,42 +39,33 @@ def main():
             st.session_state[key] = None
         st.rerun()
 
-    try:
-        db: Session = next(get_db())
-    except Exception as e:
-        st.error(f"DB 연결에 실패했습니다: {e}")
-        return
-    
     user_id = st.session_state.get("user_id")
     
     if not user_id:
         st.warning("로그인 후 이용 가능합니다.")
         st.stop()
     
-    # 사용자 정보 조회
+    # st.stop() 이나 오류로 중단돼도 세션이 반환되도록 with 블록 안에서만 사용
     try:
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            st.error("사용자 정보를 찾을 수 없습니다.")
-            st.stop()
+        with get_db() as db:
+            # 사용자 정보 조회 (TTL 캐시 우선)
+            user = get_user_profile(db, user_id)
+            if not user:
+                st.error("사용자 정보를 찾을 수 없습니다.")
+                st.stop()
+
+            # 개수/테마 통계는 user_stats 한 행에서 조회 (목록은 페이지 단위로 조회)
+            stats = get_user_stats(db, user_id)
+            total_count = stats["story_count"]
     except Exception as e:
-        st.error(f"사용자 정보를 조회하는 중 오류가 발생했습니다: {e}")
+        st.error(f"데이터를 불러오는 중 오류가 발생했습니다: {e}")
         return
     
     st.title("🎨 이미지 갤러리")
-    st.markdown(f"**{user.username}**님의 이미지 갤러리입니다.")
-    
-    # 사용자별 스토리 조회
-    try:
-        stories = get_user_images(db, user_id)
-    except Exception as e:
-        st.error(f"데이터를 불러오는 중 오류가 발생했습니다: {e}")
-        return
-    finally:
-        db.close()
+    st.markdown(f"**{user['username']}**님의 이미지 갤러리입니다.")
     
     # 스토리 데이터가 없는 경우
-    if not stories:
+    if not total_count:
         st.info("생성된 이미지가 없습니다.")
         st.info("👈 왼쪽 사이드바에서 동화 만들기를 선택해 주세요.")
         # col1, col2, col3 = st.columns([1, 1, 1])
@@ -84,7 +77,12 @@ def main():
         st.stop()
     
     # 스토리 개수 표시
-    st.info(f"총 {len(stories)}개의 이미지가 있습니다.")
+    st.info(f"총 {total_count}개의 이미지가 있습니다.")
+    if stats["theme_counts"]:
+        theme_summary = ", ".join(
+            f"{theme} {count}개" for theme, count in sorted(stats["theme_counts"].items(), key=lambda item: -item[1])
+        )
+        st.caption(f"테마별: {theme_summary}")
     
     # 일괄 다운로드 옵션
     with st.expander("📦 일괄 다운로드"):
@@ -94,45 +92,67 @@ def main():
         
         with col1:
             if st.button("🎨 모든 컬러 이미지 다운로드", use_container_width=True):
+                with get_db() as db:
+                    stories = get_user_images(db, user_id)
                 zip_data = sharing_utils.create_bulk_download(stories, "color")
                 if zip_data:
                     st.download_button(
                         label="📥 ZIP 파일 다운로드",
                         data=zip_data,
-                        file_name=f"{user.username}_컬러이미지모음.zip",
+                        file_name=f"{user['username']}_컬러이미지모음.zip",
                         mime="application/zip",
                         use_container_width=True
                     )
         
         with col2:
             if st.button("📦 모든 이미지 다운로드", use_container_width=True):
+                with get_db() as db:
+                    stories = get_user_images(db, user_id)
                 zip_data = sharing_utils.create_bulk_download(stories, "all")
                 if zip_data:
                     st.download_button(
                         label="📥 ZIP 파일 다운로드",
                         data=zip_data,
-                        file_name=f"{user.username}_전체이미지모음.zip",
+                        file_name=f"{user['username']}_전체이미지모음.zip",
                         mime="application/zip",
                         use_container_width=True
                     )
     
+    # 검색어 입력 (본문/테마 전문 검색)
+    search_query = st.text_input("🔍 동화 검색", placeholder="내용이나 테마로 검색 (예: 토끼, 바다)").strip()
+
     # 표시 모드 선택
     view_mode = st.radio("보기 모드:", ["그리드", "목록"], horizontal=True)
     
-    # 페이지네이션 설정
-    if "gallery_current_page" not in st.session_state:
-        st.session_state.gallery_current_page = 0
-    
+    # 페이지네이션 설정 (페이지별 시작 커서를 기억해 이전/다음 이동)
     per_page = 9 if view_mode == "그리드" else 5
+
+    if search_query:
+        show_search_results(user_id, search_query, view_mode, per_page)
+        return
+    if st.session_state.get("gallery_per_page") != per_page or "gallery_cursors" not in st.session_state:
+        st.session_state.gallery_per_page = per_page
+        st.session_state.gallery_cursors = [None]
+        st.session_state.gallery_current_page = 0
+
     current_page = st.session_state.gallery_current_page
-    total_pages = (len(stories) + per_page - 1) // per_page
+    total_pages = (total_count + per_page - 1) // per_page
     
-    # 현재 페이지 데이터
-    start_idx = current_page * per_page
-    end_idx = start_idx + per_page
-    current_stories = stories[start_idx:end_idx]
+    # 현재 페이지 데이터만 조회 (목록 모드에서만 본문 포함)
+    try:
+        with get_db() as db:
+            current_stories, next_cursor = get_user_story_page(
+                db,
+                user_id,
+                limit=per_page,
+                cursor=st.session_state.gallery_cursors[current_page],
+                include_content=(view_mode == "목록"),
+            )
+    except Exception as e:
+        st.error(f"데이터를 불러오는 중 오류가 발생했습니다: {e}")
+        return
     
-    st.markdown(f"**페이지: {current_page + 1} / {total_pages}** (총 {len(stories)}개)")
+    st.markdown(f"**페이지: {current_page + 1} / {total_pages}** (총 {total_count}개)")
     
     # 갤러리 표시
     if view_mode == "그리드":
@@ -141,7 +161,7 @@ def main():
         display_story_list(current_stories, current_page, per_page)
     
     # 페이지 전환 버튼
-    if total_pages > 1:
+    if current_page > 0 or next_cursor:
         st.markdown("---")
         col1, col2, col3 = st.columns([1, 2, 1])
         
@@ -157,11 +177,59 @@ def main():
                        unsafe_allow_html=True)
         
         with col3:
-            if current_page < total_pages - 1:
+            if next_cursor:
                 if st.button("다음 ➡️", use_container_width=True):
+                    cursors = st.session_state.gallery_cursors[:current_page + 1]
+                    st.session_state.gallery_cursors = cursors + [next_cursor]
                     st.session_state.gallery_current_page += 1
                     st.rerun()
 
 
+
+def show_search_results(user_id: int, search_query: str, view_mode: str, per_page: int):
+    """검색 결과 표시 (관련도 순, 검색어나 보기 모드가 바뀌면 첫 페이지부터)"""
+    search_key = (search_query, per_page)
+    if st.session_state.get("gallery_search_key") != search_key:
+        st.session_state.gallery_search_key = search_key
+        st.session_state.gallery_search_page = 0
+    current_page = st.session_state.gallery_search_page
+
+    try:
+        with get_db() as db:
+            stories, has_more = search_user_stories(
+                db,
+                user_id,
+                search_query,
+                limit=per_page,
+                offset=current_page * per_page,
+                include_content=(view_mode == "목록"),
+            )
+    except Exception as e:
+        st.error(f"검색 중 오류가 발생했습니다: {e}")
+        return
+
+    if not stories:
+        st.info(f"'{search_query}'에 해당하는 동화가 없습니다.")
+        return
+
+    st.markdown(f"**'{search_query}' 검색 결과** (페이지 {current_page + 1})")
+    if view_mode == "그리드":
+        display_gallery(stories, current_page, per_page)
+    else:
+        display_story_list(stories, current_page, per_page)
+
+    if current_page > 0 or has_more:
+        st.markdown("---")
+        col1, _, col3 = st.columns([1, 2, 1])
+        with col1:
+            if current_page > 0 and st.button("⬅️ 이전", key="search_prev", use_container_width=True):
+                st.session_state.gallery_search_page -= 1
+                st.rerun()
+        with col3:
+            if has_more and st.button("다음 ➡️", key="search_next", use_container_width=True):
+                st.session_state.gallery_search_page += 1
+                st.rerun()
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,7 +1,9 @@
 import streamlit as st
+import requests
 import sys
 import os
 import logging
+from dotenv import load_dotenv
 
 # 로그 설정
 logging.basicConfig(level=logging.INFO,
@@ -9,9 +11,13 @@ logging.basicConfig(level=logging.INFO,
 
 # 현재 파일의 상위 상위 폴더인 'fairytale'을 경로에 추가
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
-from controllers.music_controller import search_tracks_by_tag, THEME_KEYWORDS
+from controllers.music_controller import THEME_KEYWORDS
 from utils import initialize_session_state, check_login
 
+# .env 파일에서 환경변수 로드
+load_dotenv()
+API_URL = os.getenv('API_URL')
+
 # 초기화 함수 호출
 initialize_session_state()
 
@@ -54,9 +60,13 @@ def main():
     if st.button("🔍 자장가 불러오기"):
         st.info(f"'{theme}' 테마에 맞는 자장가를 불러오는 중입니다.")
 
-        # 선택된 테마에 해당하는 검색어로 검색
-        query = THEME_KEYWORDS[theme]
-        results = search_tracks_by_tag(query)
+        # API 서버가 미리 받아 둔 테마별 목록 조회 (Jamendo 를 직접 호출하지 않음)
+        try:
+            response = requests.post(f"{API_URL}/search/url", json={"theme": theme}, timeout=10)
+            results = response.json().get("music_results") if response.status_code == 200 else None
+        except requests.exceptions.RequestException as e:
+            logging.error(f"자장가 목록 요청 실패: {e}")
+            results = None
 
         if results:
             st.session_state.search_results = results
@@ -5,7 +5,8 @@ import sys
 import os
 # 현재 파일의 상위 상위 폴더인 'fairytale'을 경로에 추가
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
-from utils import initialize_session_state, check_login, navigate_to, generate_unique_key
+from utils import initialize_session_state, check_login, navigate_to, generate_unique_key, conditional_get
+from controllers.identity_cache import identity_cache  # 홈 화면의 아이 정보 캐시 무효화용
 import logging
 
 # 로그 설정
@@ -89,6 +90,7 @@ def add_baby():
                 # 응답 처리
                 if response.status_code == 200:
                     baby_info = response.json()
+                    identity_cache.invalidate_user(baby_data["user_id"])
                     logging.info(f"아기 정보 추가 성공: {baby_info}")
                     st.success(f'아기 정보가 성공적으로 추가되었습니다. (ID: {baby_info["baby"]["id"]})')
                 else:
@@ -111,7 +113,7 @@ def delete_baby():
         user_id = st.session_state.get("user_id")
         
         # 현재 사용자의 아이 목록 가져오기
-        response = requests.get(f"{API_URL}/babies/list/{user_id}")
+        response = conditional_get(f"{API_URL}/babies/list/{user_id}")  # 목록이 그대로면 304 로 캐시 사용
         
         if response.status_code == 200:
             babies = response.json()
@@ -144,6 +146,7 @@ def delete_baby():
                         )
                     
                     if response.status_code == 200:
+                        identity_cache.invalidate_user(user_id)
                         st.success(f"{baby_info['name']} 정보가 삭제되었습니다.")
                         st.rerun()  # 목록 새로고침
                     else:
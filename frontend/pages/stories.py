@@ -6,7 +6,7 @@ from dotenv import load_dotenv
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 from controllers.story_controller import generate_fairy_tale, generate_openai_voice, generate_image_from_fairy_tale, save_story_to_db, convert_bw_image, audio_to_base64
 import requests
-from utils import initialize_session_state, check_login
+from utils import initialize_session_state, check_login, conditional_get
 import logging
 
 # 초기화 함수 호출
@@ -59,7 +59,7 @@ def main():
         user_id = st.session_state.get("user_id")
         
         # 현재 사용자의 아이 목록 가져오기
-        response = requests.get(f"{API_URL}/babies/list/{user_id}")
+        response = conditional_get(f"{API_URL}/babies/list/{user_id}")  # 목록이 그대로면 304 로 캐시 사용
         
         if response.status_code == 200:
             babies = response.json()
@@ -11,6 +11,9 @@ import time
 import urllib.parse
 import base64
 import zipfile
+import json
+import requests
+from collections import OrderedDict
 from io import BytesIO
 
 # utils.py 상단에 추가
@@ -20,6 +23,7 @@ if BASE_DIR not in sys.path:
 
 # 그런 다음
 from models_dir.models import Story
+from controllers.blob_store import blob_store
 
 
 # 로그 설정
@@ -31,6 +35,48 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "pages")
 
 
 
+# 조건부 요청 캐시 설정
+CONDITIONAL_CACHE_SIZE = int(os.getenv("CONDITIONAL_CACHE_SIZE", "32"))  # 세션마다 기억할 최대 응답 수
+
+
+class CachedResponse:
+    """304 응답 시 캐시된 본문을 돌려주는 requests.Response 대용 (status_code / headers / json())"""
+
+    def __init__(self, content: bytes, headers: Dict[str, str]):
+        self.status_code = 200
+        self.content = content
+        self.headers = headers
+        self.from_cache = True
+
+    def json(self):
+        return json.loads(self.content)
+
+
+# ETag 조건부 GET
+def conditional_get(url: str, timeout: float = 10, **kwargs):
+    """같은 URL 을 다시 요청할 때 If-None-Match 를 보내고 304 면 세션에 저장한 응답 재사용"""
+    cache: OrderedDict = st.session_state.setdefault("conditional_cache", OrderedDict())
+    cached = cache.get(url)
+    headers = dict(kwargs.pop("headers", None) or {})
+    if cached:
+        headers["If-None-Match"] = cached["etag"]
+
+    response = requests.get(url, headers=headers, timeout=timeout, **kwargs)
+    if response.status_code == 304 and cached:
+        cache.move_to_end(url)
+        return CachedResponse(cached["content"], cached["headers"])
+
+    etag = response.headers.get("ETag")
+    if response.status_code == 200 and etag:
+        cache[url] = {"etag": etag, "content": response.content, "headers": dict(response.headers)}
+        cache.move_to_end(url)
+        while len(cache) > CONDITIONAL_CACHE_SIZE:
+            cache.popitem(last=False)
+    else:
+        cache.pop(url, None)
+    return response
+
+
 # 고유 키 생성
 def generate_unique_key(base_key=None):
     unique_string = f"{base_key or ''}{time.time()}"
@@ -155,7 +201,11 @@ class ImageSharingUtils:
     def get_image_download_link(image_path: str, filename: str) -> str:
         """이미지 다운로드 링크 생성"""
         try:
-            if image_path.startswith('http'):
+            asset_url = blob_store.url_for(image_path)
+            if asset_url and asset_url != image_path:
+                # 저장소 파일은 API 의 /assets 경로로 내려받음 (base64 인코딩 없이)
+                return f"{asset_url}?download={urllib.parse.quote(filename)}"
+            elif image_path.startswith('http'):
                 # URL인 경우 직접 반환
                 return image_path
             elif os.path.exists(image_path):
@@ -175,7 +225,15 @@ class ImageSharingUtils:
     def create_download_button(image_path: str, filename: str, button_text: str = "📥 다운로드"):
         """스트림릿 다운로드 버튼 생성"""
         try:
-            if image_path and os.path.exists(image_path):
+            asset_url = blob_store.url_for(image_path)
+            if asset_url and asset_url != image_path:
+                # 브라우저가 API 에서 직접 받도록 링크 버튼 사용 (파이썬 프로세스가 파일을 읽지 않음)
+                return st.link_button(
+                    button_text,
+                    f"{asset_url}?download={urllib.parse.quote(filename)}",
+                    use_container_width=True
+                )
+            elif image_path and os.path.exists(image_path):
                 with open(image_path, "rb") as file:
                     btn = st.download_button(
                         label=button_text,
@@ -0,0 +1,34 @@
+"""
+참조 없는 이미지/오디오 파일 정리 도구
+
+Story 가 참조하지 않는 파일을 로컬 저장소(static/blobs, static/images, cache)와 S3 에서 찾아 삭제한다.
+
+사용 예:
+    python gc_assets.py --dry-run          # 삭제 없이 회수 가능한 용량만 확인
+    python gc_assets.py --max-batches 10   # 최대 10 배치만 삭제
+"""
+import json
+import logging
+import argparse
+from controllers.asset_gc import AssetGarbageCollector, GC_BATCH_SIZE, GC_GRACE_SECONDS
+
+# 로그 설정
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="참조 없는 파일 정리 도구")
+    parser.add_argument("--dry-run", action="store_true", help="삭제 없이 회수 가능한 용량만 보고")
+    parser.add_argument("--batch-size", type=int, default=GC_BATCH_SIZE, help="한 배치에서 삭제할 파일 수")
+    parser.add_argument("--max-batches", type=int, default=None, help="이번 실행에서 처리할 최대 배치 수")
+    parser.add_argument("--grace", type=int, default=GC_GRACE_SECONDS, help="이 시간(초)보다 새 파일은 건너뜀")
+    args = parser.parse_args()
+
+    collector = AssetGarbageCollector(batch_size=args.batch_size, grace_seconds=args.grace)
+    report = collector.collect(dry_run=args.dry_run, max_batches=args.max_batches)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from models_dir.models import Base
@@ -8,7 +8,18 @@ from starlette.middleware.sessions import SessionMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 from controllers.users_controller import router as users_router
 from controllers.babies_controller import router as babies_router
+from controllers.assets_controller import router as assets_router
+from controllers.campaigns_controller import router as campaigns_router
 from ai_server import router as ai_router
+from controllers.cache import cache_stats, Config
+from models_dir.pool_monitor import pool_stats
+from models_dir.query_monitor import query_stats, UNMATCHED_ROUTE
+from controllers.upload_queue import upload_worker
+from controllers.password_hasher import password_hasher
+from controllers.rate_limit import rate_limiter
+from emails.outbox import email_worker, body_cipher, EMAIL_WORKER_ENABLED
+from emails.campaigns import campaign_worker
+from controllers.media_catalog import media_catalog
 import sys
 import os
 import logging
@@ -43,14 +54,39 @@ app.add_middleware(
 logging.basicConfig(level=logging.INFO)  # 로깅 레벨 설정 (DEBUG, INFO, WARNING, ERROR, CRITICAL)
 logger = logging.getLogger(__name__)
 
+DEBUG_MODE = os.getenv("DEBUG_MODE", "false").lower() == "true"  # 응답 헤더에 요청별 SQL 통계 포함
+
+# 요청별 SQL 쿼리 수/DB 시간 집계 (N+1 의심 쿼리는 /metrics/sql 에서 확인)
+@app.middleware("http")
+async def sql_instrumentation(request: Request, call_next):
+    token = query_stats.start_request(UNMATCHED_ROUTE)
+    try:
+        response = await call_next(request)
+    finally:
+        # 라우팅 후에는 경로 템플릿으로 집계 (/babies/delete/{baby_id} 등), 라우트가 없으면 unmatched 로 묶음
+        route = request.scope.get("route")
+        queries = query_stats.finish_request(token, getattr(route, "path", None))
+    if DEBUG_MODE:
+        response.headers["X-SQL-Query-Count"] = str(queries.count)
+        response.headers["X-SQL-Time-Ms"] = f"{queries.total_seconds * 1000:.1f}"
+        repeated = queries.repeated()
+        if repeated:
+            response.headers["X-SQL-N-Plus-One"] = str(max(item["count"] for item in repeated))
+    return response
+
 # 라우터 등록
 app.include_router(users_router, tags=["users"])
 app.include_router(ai_router, tags=["ai"])
 app.include_router(babies_router, tags=["babies"])
+app.include_router(assets_router, tags=["assets"])
+app.include_router(campaigns_router, tags=["campaigns"])
 
 # 시작 시 데이터베이스 초기화
 @app.on_event("startup")
 async def startup_event():
+    # 임시 비밀번호 메일은 암호화해 대기열에 넣으므로 공유 키가 없으면 시작하지 않음
+    body_cipher.ensure_configured()
+
     try:
         init_db()
         logger.info("✅ 데이터베이스 초기화 완료")
@@ -58,6 +94,27 @@ async def startup_event():
         logger.error(f"❌ 데이터베이스 초기화 실패: {e}")
         raise
 
+    # S3 업로드 대기열 워커 시작
+    if Config.USE_S3:
+        upload_worker.start()
+
+    # 자장가 음악/영상 목록 미리 받기 (백그라운드에서 주기적으로 갱신)
+    media_catalog.start()
+
+    # 이메일 발송 대기열/대량 안내 메일 워커 시작
+    if EMAIL_WORKER_ENABLED:
+        email_worker.start()
+        campaign_worker.start()
+
+# 종료 시 백그라운드 워커 정리
+@app.on_event("shutdown")
+async def shutdown_event():
+    upload_worker.stop()
+    email_worker.stop()
+    campaign_worker.stop()
+    media_catalog.stop()
+    password_hasher.shutdown()
+
 # 시스템 정보 로깅
 logger.debug(f"System encoding: {sys.getdefaultencoding()}")
 logger.debug(f"Current working directory: {os.getcwdb()}")
@@ -69,4 +126,41 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     return JSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail},
-    )
\ No newline at end of file
+        headers=getattr(exc, "headers", None),  # 429 의 Retry-After 등 유지
+    )
+
+# 캐시 통계 엔드포인트 (format=prometheus 지원)
+@app.get("/metrics/cache")
+async def cache_metrics(format: str = "json", top: int = 10):
+    if format == "prometheus":
+        return PlainTextResponse(cache_stats.to_prometheus(), media_type="text/plain; version=0.0.4")
+    return cache_stats.snapshot(top_n=top)
+
+# DB 커넥션 풀 통계 엔드포인트 (반환되지 않은 연결의 호출 위치 포함)
+@app.get("/metrics/db")
+async def db_metrics(format: str = "json"):
+    if format == "prometheus":
+        return PlainTextResponse(pool_stats.to_prometheus(), media_type="text/plain; version=0.0.4")
+    return pool_stats.snapshot()
+
+# 경로별 SQL 통계 엔드포인트 (N+1 의심 쿼리 포함)
+@app.get("/metrics/sql")
+async def sql_metrics(format: str = "json", top: int = 20):
+    if format == "prometheus":
+        return PlainTextResponse(query_stats.to_prometheus(), media_type="text/plain; version=0.0.4")
+    return query_stats.snapshot(top_n=top)
+
+# 요청 제한 통계 엔드포인트 (경로/기준별 거절 횟수)
+@app.get("/metrics/rate_limit")
+async def rate_limit_metrics():
+    return {"enabled": rate_limiter.enabled, "rejections": rate_limiter.snapshot()}
+
+# 이메일 발송 통계 엔드포인트 (발송/재시도/실패 수, SMTP 연결 재사용 현황, 캠페인 발송 현황)
+@app.get("/metrics/email")
+async def email_metrics():
+    return {**email_worker.snapshot(), "campaigns": campaign_worker.snapshot()}
+
+# 자장가 음악/영상 카탈로그 엔드포인트 (테마별 목록 나이, 외부 API 호출 수)
+@app.get("/metrics/media")
+async def media_metrics():
+    return media_catalog.snapshot()
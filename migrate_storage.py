@@ -0,0 +1,240 @@
+"""
+동화 이미지 저장소 이전 도구
+
+Story 행이 참조하는 이미지(image, bw_image)를 한 저장소에서 다른 저장소로 복사하고 DB 경로를 교체한다.
+- 동시 복사 수는 --workers 로 제한
+- Story.id 순서로 --batch-size 개씩 처리하고, 배치마다 체크포인트 파일에 진행 상황 기록 (중단 후 재실행하면 이어서 진행)
+- 실패한 파일은 체크포인트에 남겨 두고 다음 실행 때 먼저 다시 시도
+- 복사 후 대상 저장소의 SHA-256 을 확인한 뒤에만 경로 교체
+
+사용 예:
+    python migrate_storage.py --source local --target s3 --workers 8
+    python migrate_storage.py --source s3 --target local --dry-run
+"""
+import os
+import json
+import time
+import logging
+import argparse
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from models_dir.database import SessionLocal
+from models_dir.models import Story
+from controllers.storage import StorageBackend, get_storage
+from controllers.asset_naming import digest_bytes, sharded_relpath
+from controllers.blob_store import blob_store
+from controllers.user_stats import bump_version
+
+# 로그 설정
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+STORY_IMAGE_COLUMNS = ("image", "bw_image")
+
+# CLI 에서 고를 수 있는 저장소 (memory 는 프로세스가 끝나면 사라지므로 제외)
+CLI_BACKENDS = ("local", "s3")
+
+
+# 체크포인트 로드/저장
+def load_checkpoint(path: str) -> dict:
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"last_story_id": 0, "copied": 0, "skipped": 0, "failed": []}
+
+
+def save_checkpoint(path: str, state: dict):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+# 파일 하나 복사 + 체크섬 검증
+def copy_asset(source: StorageBackend, target: StorageBackend, location: str) -> Tuple[str, bool]:
+    """(대상 location, 실제로 복사했는지) 반환"""
+    data = source.read_location(location)
+    digest = digest_bytes(data)
+    ext = os.path.splitext(urlparse(location).path)[1] or ".png"
+    key = sharded_relpath(digest, ext)
+
+    # 같은 내용이 이미 있으면 복사 생략 (내용 주소 방식이라 중복 복사 없음)
+    if target.exists(key) and target.checksum(key) == digest:
+        return target.location(key), False
+
+    target.write_bytes(data, key)
+    if target.checksum(key) != digest:
+        raise ValueError(f"체크섬 불일치: {location}")
+    return target.location(key), True
+
+
+def _migrate_one(source: StorageBackend, target: StorageBackend, task: tuple) -> tuple:
+    story_id, column_name, location = task
+    try:
+        new_location, copied = copy_asset(source, target, location)
+        return story_id, column_name, location, new_location, copied, None
+    except Exception as e:
+        return story_id, column_name, location, None, False, str(e)
+
+
+# 배치 단위 DB 경로 교체
+def apply_updates(results: list) -> int:
+    db = SessionLocal()
+    released = []
+    updated_story_ids = set()
+    try:
+        for story_id, column_name, old_location, new_location, _, error in results:
+            if error or not new_location or new_location == old_location:
+                continue
+            column = getattr(Story, column_name)
+            # 이전 중에 경로가 바뀐 행은 건드리지 않음
+            updated = (
+                db.query(Story)
+                .filter(Story.id == story_id, column == old_location)
+                .update({column: new_location}, synchronize_session=False)
+            )
+            if updated:
+                updated_story_ids.add(story_id)
+                blob_store.incref(new_location, db)
+                released.append(blob_store.decref(old_location, db))
+        # 이미지 URL 이 바뀐 사용자의 갤러리 ETag 갱신 (경로 교체와 같은 트랜잭션, 잠금 순서를 맞추려고 정렬)
+        if updated_story_ids:
+            user_ids = db.query(Story.user_id).filter(Story.id.in_(updated_story_ids)).distinct()
+            for user_id in sorted(row.user_id for row in user_ids if row.user_id is not None):
+                bump_version(db, user_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    # 로컬 저장소에서 빠져나간 파일 정리
+    for digest in set(released):
+        blob_store.purge_if_unreferenced(digest)
+    return len(released)
+
+
+def _record_results(state: dict, results: list):
+    """배치 결과를 체크포인트 상태에 반영 (실패 항목은 다음 실행에서 다시 시도)"""
+    for story_id, column_name, location, _, copied, error in results:
+        if error:
+            logging.error(f"이전 실패 story {story_id} {column_name}: {error}")
+            state["failed"].append({"story_id": story_id, "column": column_name,
+                                    "location": location, "error": error})
+        elif copied:
+            state["copied"] += 1
+        else:
+            state["skipped"] += 1
+
+
+def retry_failed(source: StorageBackend, target: StorageBackend, executor: ThreadPoolExecutor,
+                 state: dict, checkpoint_path: str) -> int:
+    """이전 실행에서 실패한 파일을 다시 복사, 경로를 교체한 수 반환"""
+    failed, state["failed"] = state["failed"], []
+    if not failed:
+        return 0
+    db = SessionLocal()
+    try:
+        rows = {
+            row.id: row
+            for row in db.query(Story.id, Story.image, Story.bw_image)
+            .filter(Story.id.in_({item["story_id"] for item in failed}))
+        }
+    finally:
+        db.close()
+
+    # 그 사이 삭제되었거나 경로가 바뀐 동화는 다시 시도하지 않음
+    tasks = [
+        (item["story_id"], item["column"], item["location"])
+        for item in failed
+        if item["story_id"] in rows
+        and getattr(rows[item["story_id"]], item["column"]) == item["location"]
+        and source.owns(item["location"])
+    ]
+    results = list(executor.map(lambda task: _migrate_one(source, target, task), tasks))
+    updated = apply_updates(results)
+    _record_results(state, results)
+    save_checkpoint(checkpoint_path, state)
+    logging.info(f"실패 항목 재시도: {len(tasks)}개 파일, {updated}개 경로 교체, 남은 실패 {len(state['failed'])}개")
+    return updated
+
+
+def migrate(source_name: str, target_name: str, workers: int, batch_size: int,
+            checkpoint_path: str, dry_run: bool = False, limit: Optional[int] = None):
+    source = get_storage(source_name)
+    target = get_storage(target_name)
+    state = load_checkpoint(checkpoint_path)
+    logging.info(f"저장소 이전 시작: {source_name} -> {target_name} (story id > {state['last_story_id']})")
+
+    started = time.time()
+    processed_stories = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        if not dry_run:
+            retry_failed(source, target, executor, state, checkpoint_path)
+        while limit is None or processed_stories < limit:
+            db = SessionLocal()
+            try:
+                rows = (
+                    db.query(Story.id, Story.image, Story.bw_image)
+                    .filter(Story.id > state["last_story_id"])
+                    .order_by(Story.id)
+                    .limit(batch_size)
+                    .all()
+                )
+            finally:
+                db.close()
+            if not rows:
+                break
+
+            tasks = [
+                (row.id, column_name, getattr(row, column_name))
+                for row in rows
+                for column_name in STORY_IMAGE_COLUMNS
+                if source.owns(getattr(row, column_name))
+            ]
+
+            if dry_run:
+                state["copied"] += len(tasks)
+            else:
+                # executor.map 은 workers 개까지만 동시에 실행
+                results = list(executor.map(lambda task: _migrate_one(source, target, task), tasks))
+                updated = apply_updates(results)
+                _record_results(state, results)
+                logging.info(f"배치 완료: {len(tasks)}개 파일, {updated}개 경로 교체")
+
+            state["last_story_id"] = rows[-1].id
+            processed_stories += len(rows)
+            if not dry_run:
+                save_checkpoint(checkpoint_path, state)
+
+    elapsed = time.time() - started
+    label = "이전 대상" if dry_run else "복사"
+    logging.info(
+        f"저장소 이전 종료: {processed_stories}개 동화, {label} {state['copied']}개, "
+        f"중복 생략 {state['skipped']}개, 실패 {len(state['failed'])}개 ({elapsed:.1f}초)"
+    )
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="동화 이미지 저장소 이전 도구")
+    parser.add_argument("--source", required=True, choices=CLI_BACKENDS, help="원본 저장소")
+    parser.add_argument("--target", required=True, choices=CLI_BACKENDS, help="대상 저장소")
+    parser.add_argument("--workers", type=int, default=8, help="동시 복사 수")
+    parser.add_argument("--batch-size", type=int, default=100, help="한 번에 처리할 동화 수")
+    parser.add_argument("--checkpoint", default="migrate_storage_checkpoint.json", help="체크포인트 파일 경로")
+    parser.add_argument("--limit", type=int, default=None, help="이번 실행에서 처리할 최대 동화 수")
+    parser.add_argument("--dry-run", action="store_true", help="복사/DB 수정 없이 대상 개수만 확인")
+    args = parser.parse_args()
+
+    if args.source == args.target:
+        parser.error("원본과 대상 저장소가 같습니다.")
+
+    migrate(args.source, args.target, args.workers, args.batch_size,
+            args.checkpoint, dry_run=args.dry_run, limit=args.limit)
+
+
+if __name__ == "__main__":
+    main()
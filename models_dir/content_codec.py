@@ -0,0 +1,37 @@
+import gzip
+import hashlib
+from typing import Tuple
+
+# zstandard 가 없으면 gzip 으로 저장 (읽을 때는 codec 컬럼으로 구분)
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard 미설치 환경
+    zstandard = None
+
+ZSTD_LEVEL = 9
+GZIP_LEVEL = 9
+
+
+def content_hash(text: str) -> str:
+    """본문 SHA-256 (중복 제거 키)"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def compress_text(text: str) -> Tuple[str, bytes]:
+    """(codec, 압축 데이터) 반환"""
+    raw = text.encode("utf-8")
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return "gzip", gzip.compress(raw, compresslevel=GZIP_LEVEL)
+
+
+def decompress_text(codec: str, data: bytes) -> str:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard 패키지가 설치되어 있지 않습니다. (pip install zstandard)")
+        return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+    if codec == "gzip":
+        return gzip.decompress(data).decode("utf-8")
+    if codec == "none":
+        return data.decode("utf-8")
+    raise ValueError(f"알 수 없는 압축 방식입니다: {codec}")
@@ -0,0 +1,133 @@
+"""
+버전 기반 스키마 마이그레이션
+
+models_dir/migrations/mNNNN_*.py 파일을 번호 순서대로 한 번씩 적용하고 schema_migrations 테이블에 기록한다.
+각 마이그레이션 모듈은 VERSION, DESCRIPTION, upgrade(conn) 을 정의한다.
+PostgreSQL 에서는 CREATE INDEX CONCURRENTLY 를 쓸 수 있도록 autocommit 연결로 실행하므로,
+마이그레이션은 여러 번 실행해도 안전하게(IF NOT EXISTS 등) 작성한다.
+
+사용 예:
+    python -m models_dir.migrate           # 남은 마이그레이션 적용
+    python -m models_dir.migrate --list    # 적용 상태 확인
+"""
+import pkgutil
+import logging
+import argparse
+import importlib
+from types import ModuleType
+from typing import List, Optional, Set
+from sqlalchemy import text
+from sqlalchemy.engine import Engine, Connection
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_PACKAGE = "models_dir.migrations"
+MIGRATION_LOCK_ID = 731_205  # 여러 프로세스가 동시에 마이그레이션하지 않도록 쓰는 advisory lock 번호
+
+
+def load_migrations() -> List[ModuleType]:
+    """마이그레이션 모듈을 VERSION 순서로 반환"""
+    package = importlib.import_module(MIGRATIONS_PACKAGE)
+    modules = [
+        importlib.import_module(f"{MIGRATIONS_PACKAGE}.{info.name}")
+        for info in pkgutil.iter_modules(package.__path__)
+        if info.name.startswith("m")
+    ]
+    modules.sort(key=lambda module: module.VERSION)
+    versions = [module.VERSION for module in modules]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"마이그레이션 버전이 중복되었습니다: {versions}")
+    return modules
+
+
+def _ensure_version_table(conn: Connection):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, "
+        "description VARCHAR(255) NOT NULL, "
+        "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    ))
+
+
+def applied_versions(conn: Connection) -> Set[int]:
+    _ensure_version_table(conn)
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+# 마이그레이션에서 쓰는 도우미
+def create_index(conn: Connection, name: str, table: str, columns: str, unique: bool = False, using: Optional[str] = None):
+    """서비스 중에도 테이블을 잠그지 않고 인덱스 생성 (PostgreSQL: CONCURRENTLY, using 으로 GIN 등 지정)"""
+    unique_sql = "UNIQUE " if unique else ""
+    using_sql = f"USING {using} " if using else ""
+    if conn.dialect.name == "postgresql":
+        # CONCURRENTLY 생성이 중간에 실패하면 INVALID 인덱스가 남으므로 먼저 정리
+        invalid = conn.execute(text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ), {"name": name}).first()
+        if invalid:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        conn.execute(text(f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {using_sql}({columns})"))
+    else:
+        conn.execute(text(f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+def drop_index(conn: Connection, name: str):
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    else:
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def run_migrations(engine: Engine, target: Optional[int] = None) -> List[int]:
+    """적용되지 않은 마이그레이션을 순서대로 실행하고 적용한 버전 목록 반환"""
+    applied_now = []
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        is_postgres = conn.dialect.name == "postgresql"
+        if is_postgres:
+            conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            done = applied_versions(conn)
+            for module in load_migrations():
+                if module.VERSION in done or (target is not None and module.VERSION > target):
+                    continue
+                logger.info(f"마이그레이션 적용: {module.VERSION} {module.DESCRIPTION}")
+                module.upgrade(conn)
+                conn.execute(
+                    text("INSERT INTO schema_migrations (version, description) VALUES (:version, :description)"),
+                    {"version": module.VERSION, "description": module.DESCRIPTION},
+                )
+                applied_now.append(module.VERSION)
+        finally:
+            if is_postgres:
+                conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+    return applied_now
+
+
+def main():
+    parser = argparse.ArgumentParser(description="스키마 마이그레이션 도구")
+    parser.add_argument("--list", action="store_true", help="마이그레이션 적용 상태 출력")
+    parser.add_argument("--target", type=int, default=None, help="이 버전까지만 적용")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    from models_dir.database import engine
+
+    if args.list:
+        with engine.connect() as conn:
+            done = applied_versions(conn)
+            conn.commit()
+        for module in load_migrations():
+            status = "적용됨" if module.VERSION in done else "대기"
+            print(f"{module.VERSION:04d} [{status}] {module.DESCRIPTION}")
+        return
+
+    # 새 DB 면 현재 모델 기준으로 테이블부터 생성 (이미 있는 테이블은 그대로 둠)
+    from models_dir.models import Base
+    Base.metadata.create_all(bind=engine)
+    applied = run_migrations(engine, target=args.target)
+    print(f"적용한 마이그레이션: {applied or '없음'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# 버전 기반 스키마 마이그레이션 모음 (mNNNN_설명.py, models_dir/migrate.py 참고)
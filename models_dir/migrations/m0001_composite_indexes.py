@@ -0,0 +1,20 @@
+# 자주 쓰는 조회용 복합 인덱스 추가
+from models_dir.migrate import create_index
+
+VERSION = 1
+DESCRIPTION = "story/babies/users 복합 인덱스 추가"
+
+# (인덱스 이름, 테이블, 컬럼)
+INDEXES = [
+    # 갤러리: 사용자별 동화를 최신순 키셋 페이지네이션으로 조회
+    ("ix_story_user_created_id", "story", "user_id, created_at DESC, id DESC"),
+    # 아이 추가 시 같은 이름 확인, 사용자별 아이 목록
+    ("ix_babies_user_name", "babies", "user_id, baby_name"),
+    # 비밀번호 재설정: 아이디 + 이메일 조회
+    ("ix_users_username_email", "users", "username, email"),
+]
+
+
+def upgrade(conn):
+    for name, table, columns in INDEXES:
+        create_index(conn, name, table, columns)
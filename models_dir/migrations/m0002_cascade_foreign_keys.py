@@ -0,0 +1,56 @@
+# 사용자 삭제 시 하위 행을 DB 가 한 번에 지우도록 외래키를 ON DELETE CASCADE 로 변경
+from sqlalchemy import text
+from models_dir.migrate import create_index
+
+VERSION = 2
+DESCRIPTION = "외래키 ON DELETE CASCADE 및 외래키 인덱스 추가"
+
+# CASCADE 삭제 시 하위 테이블을 전체 스캔하지 않도록 외래키 컬럼 인덱스 추가
+# (story.user_id, babies.user_id 는 0001 의 복합 인덱스가 사용됨)
+INDEXES = [
+    ("ix_articles_user_id", "articles", "user_id"),
+    ("ix_likes_user_id", "likes", "user_id"),
+    ("ix_likes_article_id", "likes", "article_id"),
+]
+
+# (테이블, 컬럼, 참조 테이블, 참조 컬럼)
+FOREIGN_KEYS = [
+    ("story", "user_id", "users", "id"),
+    ("babies", "user_id", "users", "id"),
+    ("articles", "user_id", "users", "id"),
+    ("likes", "user_id", "users", "id"),
+    ("likes", "article_id", "articles", "id"),
+]
+
+
+def _current_foreign_key(conn, table: str, column: str):
+    """(제약조건 이름, 삭제 동작) 반환, 없으면 None"""
+    return conn.execute(text(
+        "SELECT con.conname, con.confdeltype FROM pg_constraint con "
+        "JOIN pg_class rel ON rel.oid = con.conrelid "
+        "JOIN pg_attribute att ON att.attrelid = con.conrelid AND att.attnum = ANY(con.conkey) "
+        "WHERE con.contype = 'f' AND rel.relname = :table AND att.attname = :column"
+    ), {"table": table, "column": column}).first()
+
+
+def upgrade(conn):
+    for name, table, columns in INDEXES:
+        create_index(conn, name, table, columns)
+
+    # SQLite 는 외래키를 바꾸려면 테이블을 다시 만들어야 하므로 새 DB 의 create_all 정의만 사용
+    if conn.dialect.name != "postgresql":
+        return
+
+    for table, column, ref_table, ref_column in FOREIGN_KEYS:
+        current = _current_foreign_key(conn, table, column)
+        if current and current.confdeltype == "c":
+            continue
+        constraint = f"{table}_{column}_fkey"
+        drop_sql = f"DROP CONSTRAINT IF EXISTS {current.conname}, " if current else ""
+        # NOT VALID 로 먼저 바꾸고 VALIDATE 는 쓰기를 막지 않는 잠금으로 따로 실행
+        conn.execute(text(
+            f"ALTER TABLE {table} {drop_sql}"
+            f"ADD CONSTRAINT {constraint} FOREIGN KEY ({column}) "
+            f"REFERENCES {ref_table} ({ref_column}) ON DELETE CASCADE NOT VALID"
+        ))
+        conn.execute(text(f"ALTER TABLE {table} VALIDATE CONSTRAINT {constraint}"))
@@ -0,0 +1,113 @@
+# 동화 본문을 story_contents 테이블로 분리 (SHA-256 중복 제거, 압축 저장)
+import re
+import logging
+import sqlalchemy as sa
+from sqlalchemy import text, inspect
+from models_dir.content_codec import content_hash, compress_text
+from models_dir.migrate import create_index
+
+VERSION = 3
+DESCRIPTION = "동화 본문을 story_contents 로 분리"
+
+BACKFILL_BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+# 이 버전 시점의 테이블 정의 (ORM 모델은 이후 바뀔 수 있고, 마이그레이션은 models.py 초기화 전에도 불러오므로 직접 정의)
+metadata = sa.MetaData()
+story_contents = sa.Table(
+    "story_contents", metadata,
+    sa.Column("hash", sa.String(64), primary_key=True),
+    sa.Column("codec", sa.String(10), nullable=False),
+    sa.Column("data", sa.LargeBinary, nullable=False),
+    sa.Column("size", sa.Integer, nullable=False),
+    sa.Column("created_at", sa.TIMESTAMP, server_default=sa.func.now()),
+)
+
+# CREATE TABLE 문에서 content 컬럼 정의의 NOT NULL (voice_content 등 다른 컬럼은 제외)
+_CONTENT_NOT_NULL = re.compile(r'(^|[\s,(])("?content"?\s+TEXT)\s+NOT\s+NULL', re.IGNORECASE | re.MULTILINE)
+
+
+def _content_is_nullable(conn) -> bool:
+    for column in inspect(conn).get_columns("story"):
+        if column["name"] == "content":
+            return column["nullable"]
+    return True
+
+
+def _rebuild_story_without_not_null(conn):
+    """SQLite 는 컬럼 제약을 바꿀 수 없으므로 story 테이블을 다시 만들어 content NOT NULL 해제"""
+    table_sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'story'")).scalar()
+    new_sql, replaced = _CONTENT_NOT_NULL.subn(r"\1\2", table_sql, count=1)
+    if not replaced:
+        raise RuntimeError(f"story.content 컬럼 정의를 찾지 못했습니다: {table_sql}")
+    new_sql = re.sub(r'^\s*CREATE\s+TABLE\s+"?story"?', "CREATE TABLE story_rebuild", new_sql, count=1, flags=re.IGNORECASE)
+    # 테이블을 지우면 인덱스/트리거도 지워지므로 정의를 저장해 두었다가 다시 생성
+    extra_sql = [row[0] for row in conn.execute(text(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = 'story' AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+    ))]
+    columns = ", ".join(f'"{column["name"]}"' for column in inspect(conn).get_columns("story"))
+
+    # SQLite 권장 절차: 외래키 검사를 끄고 한 트랜잭션에서 새 테이블로 복사 → 교체
+    foreign_keys = conn.execute(text("PRAGMA foreign_keys")).scalar()
+    conn.execute(text("PRAGMA foreign_keys = OFF"))
+    try:
+        conn.execute(text("BEGIN"))
+        try:
+            conn.execute(text("DROP TABLE IF EXISTS story_rebuild"))
+            conn.execute(text(new_sql))
+            conn.execute(text(f"INSERT INTO story_rebuild ({columns}) SELECT {columns} FROM story"))
+            conn.execute(text("DROP TABLE story"))
+            conn.execute(text("ALTER TABLE story_rebuild RENAME TO story"))
+            for sql in extra_sql:
+                conn.execute(text(sql))
+            conn.execute(text("COMMIT"))
+        except Exception:
+            conn.execute(text("ROLLBACK"))
+            raise
+    finally:
+        conn.execute(text(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'}"))
+    logger.info("story 테이블 재생성 완료 (content NOT NULL 해제)")
+
+
+def upgrade(conn):
+    story_contents.create(conn, checkfirst=True)
+
+    story_columns = {column["name"] for column in inspect(conn).get_columns("story")}
+    if "content_hash" not in story_columns:
+        conn.execute(text(
+            "ALTER TABLE story ADD COLUMN content_hash VARCHAR(64) REFERENCES story_contents (hash)"
+        ))
+    create_index(conn, "ix_story_content_hash", "story", "content_hash")
+
+    # 옮긴 뒤 원래 컬럼을 비울 수 있도록 NOT NULL 해제
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("ALTER TABLE story ALTER COLUMN content DROP NOT NULL"))
+    elif conn.dialect.name == "sqlite" and not _content_is_nullable(conn):
+        _rebuild_story_without_not_null(conn)
+
+    # 배치 단위로 본문 이전 (본문 저장 → 동화 행 교체 순서라 중간에 멈춰도 다시 실행 가능)
+    moved = 0
+    while True:
+        rows = conn.execute(text(
+            "SELECT id, content FROM story "
+            "WHERE content_hash IS NULL AND content IS NOT NULL AND content <> '' "
+            "ORDER BY id LIMIT :limit"
+        ), {"limit": BACKFILL_BATCH_SIZE}).all()
+        if not rows:
+            break
+        for story_id, body in rows:
+            digest = content_hash(body)
+            exists = conn.execute(text("SELECT 1 FROM story_contents WHERE hash = :hash"), {"hash": digest}).first()
+            if not exists:
+                codec, data = compress_text(body)
+                conn.execute(
+                    story_contents.insert(),
+                    {"hash": digest, "codec": codec, "data": data, "size": len(body.encode("utf-8"))},
+                )
+            conn.execute(
+                text("UPDATE story SET content_hash = :hash, content = NULL WHERE id = :id"),
+                {"hash": digest, "id": story_id},
+            )
+        moved += len(rows)
+        logger.info(f"동화 본문 이전 중: {moved}개")
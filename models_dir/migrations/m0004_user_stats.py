@@ -0,0 +1,84 @@
+# 사용자별 동화 통계 테이블 추가 (갤러리 상단 개수/테마별 개수를 Story 전체 조회 없이 표시)
+import logging
+from collections import defaultdict
+import sqlalchemy as sa
+from sqlalchemy import text, select, func
+
+VERSION = 4
+DESCRIPTION = "user_stats 테이블 추가 및 기존 동화로 채우기"
+
+logger = logging.getLogger(__name__)
+
+# 이 버전 시점의 테이블 정의 (models.py 를 불러오지 않도록 직접 정의, 조회에 쓰는 컬럼만 포함)
+metadata = sa.MetaData()
+sa.Table("users", metadata, sa.Column("id", sa.Integer, primary_key=True))
+story = sa.Table(
+    "story", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("user_id", sa.Integer),
+    sa.Column("theme", sa.String(100)),
+    sa.Column("voice", sa.String(100)),
+    sa.Column("content_hash", sa.String(64)),
+    sa.Column("created_at", sa.TIMESTAMP),
+)
+contents = sa.Table(
+    "story_contents", metadata,
+    sa.Column("hash", sa.String(64), primary_key=True),
+    sa.Column("size", sa.Integer),
+)
+user_stats = sa.Table(
+    "user_stats", metadata,
+    sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    sa.Column("story_count", sa.Integer, nullable=False, default=0),
+    sa.Column("theme_counts", sa.JSON, nullable=False, default=dict),
+    sa.Column("voice_counts", sa.JSON, nullable=False, default=dict),
+    sa.Column("content_bytes", sa.BigInteger, nullable=False, default=0),
+    sa.Column("last_created_at", sa.TIMESTAMP, nullable=True),
+    sa.Column("updated_at", sa.TIMESTAMP, server_default=sa.func.now()),
+)
+
+
+def upgrade(conn):
+    user_stats.create(conn, checkfirst=True)
+
+    # 사용자/테마/목소리별로 묶어 한 번에 집계 (본문 크기는 story_contents 에서 조회)
+    rows = conn.execute(
+        select(
+            story.c.user_id, story.c.theme, story.c.voice,
+            func.count(), func.coalesce(func.sum(contents.c.size), 0), func.max(story.c.created_at),
+        )
+        .select_from(story.outerjoin(contents, contents.c.hash == story.c.content_hash))
+        .where(story.c.user_id.isnot(None))
+        .group_by(story.c.user_id, story.c.theme, story.c.voice)
+    ).all()
+
+    stats = defaultdict(lambda: {
+        "story_count": 0, "theme_counts": defaultdict(int), "voice_counts": defaultdict(int),
+        "content_bytes": 0, "last_created_at": None,
+    })
+    for user_id, theme, voice, count, content_bytes, last_created_at in rows:
+        item = stats[user_id]
+        item["story_count"] += count
+        item["theme_counts"][theme] += count
+        item["voice_counts"][voice] += count
+        item["content_bytes"] += int(content_bytes)
+        if last_created_at is not None and (item["last_created_at"] is None or last_created_at > item["last_created_at"]):
+            item["last_created_at"] = last_created_at
+
+    # 이미 통계 행이 있는 사용자(재실행 등)는 건너뜀
+    existing = {row[0] for row in conn.execute(text("SELECT user_id FROM user_stats"))}
+    values = [
+        {
+            "user_id": user_id,
+            "story_count": item["story_count"],
+            "theme_counts": dict(item["theme_counts"]),
+            "voice_counts": dict(item["voice_counts"]),
+            "content_bytes": item["content_bytes"],
+            "last_created_at": item["last_created_at"],
+        }
+        for user_id, item in stats.items()
+        if user_id not in existing
+    ]
+    if values:
+        conn.execute(user_stats.insert(), values)
+    logger.info(f"사용자 통계 생성: {len(values)}명")
@@ -0,0 +1,58 @@
+# 동화 전문 검색 인덱스 추가 (PostgreSQL: tsvector + GIN, SQLite: FTS5)
+import logging
+import sqlalchemy as sa
+from sqlalchemy import select
+from models_dir.migrate import create_index
+from models_dir.content_codec import decompress_text
+from models_dir.search_index import create_search_index, index_stories
+
+VERSION = 5
+DESCRIPTION = "동화 전문 검색 인덱스 추가"
+
+BACKFILL_BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+# 이 버전 시점의 테이블 정의 (models.py 를 불러오지 않도록 직접 정의, 조회에 쓰는 컬럼만 포함)
+metadata = sa.MetaData()
+story = sa.Table(
+    "story", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("user_id", sa.Integer),
+    sa.Column("theme", sa.String(100)),
+    sa.Column("content", sa.Text),
+    sa.Column("content_hash", sa.String(64)),
+)
+contents = sa.Table(
+    "story_contents", metadata,
+    sa.Column("hash", sa.String(64), primary_key=True),
+    sa.Column("codec", sa.String(10)),
+    sa.Column("data", sa.LargeBinary),
+)
+
+
+def upgrade(conn):
+    create_search_index(conn)
+    if conn.dialect.name == "postgresql":
+        create_index(conn, "ix_story_search_document", "story_search", "document", using="GIN")
+        create_index(conn, "ix_story_search_user_id", "story_search", "user_id")
+
+    # 기존 동화 색인 (id 순서로 배치 처리)
+    last_id, indexed = 0, 0
+    while True:
+        rows = conn.execute(
+            select(story.c.id, story.c.user_id, story.c.theme, story.c.content, contents.c.codec, contents.c.data)
+            .select_from(story.outerjoin(contents, contents.c.hash == story.c.content_hash))
+            .where(story.c.id > last_id, story.c.user_id.isnot(None))
+            .order_by(story.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        index_stories(conn, [
+            (story_id, user_id, theme, decompress_text(codec, data) if data is not None else legacy_content or "")
+            for story_id, user_id, theme, legacy_content, codec, data in rows
+        ])
+        last_id = rows[-1][0]
+        indexed += len(rows)
+    logger.info(f"검색 인덱스 생성: 동화 {indexed}개")
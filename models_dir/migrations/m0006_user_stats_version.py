@@ -0,0 +1,11 @@
+# 사용자별 데이터 버전 컬럼 추가 (조회 API 의 ETag 계산용)
+from sqlalchemy import text, inspect
+
+VERSION = 6
+DESCRIPTION = "user_stats.version 컬럼 추가"
+
+
+def upgrade(conn):
+    columns = {column["name"] for column in inspect(conn).get_columns("user_stats")}
+    if "version" not in columns:
+        conn.execute(text("ALTER TABLE user_stats ADD COLUMN version INTEGER NOT NULL DEFAULT 0"))
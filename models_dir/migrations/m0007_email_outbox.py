@@ -0,0 +1,29 @@
+# 이메일 발송 대기열 테이블 추가 (API 는 등록만 하고 워커가 SMTP 연결을 재사용해 발송)
+import sqlalchemy as sa
+
+VERSION = 7
+DESCRIPTION = "email_outbox 테이블 추가"
+
+# 이 버전 시점의 테이블 정의 (models.py 를 불러오지 않도록 직접 정의)
+metadata = sa.MetaData()
+email_outbox = sa.Table(
+    "email_outbox", metadata,
+    sa.Column("id", sa.Integer, primary_key=True, index=True),
+    sa.Column("kind", sa.String(50), nullable=False),
+    sa.Column("recipient", sa.String(200), nullable=False),
+    sa.Column("subject", sa.String(255), nullable=False),
+    sa.Column("body", sa.Text, nullable=True),
+    sa.Column("status", sa.String(20), nullable=False, default="pending"),
+    sa.Column("attempts", sa.Integer, nullable=False, default=0),
+    sa.Column("next_attempt_at", sa.TIMESTAMP, server_default=sa.func.now()),
+    sa.Column("last_error", sa.Text, nullable=True),
+    sa.Column("sent_at", sa.TIMESTAMP, nullable=True),
+    sa.Column("created_at", sa.TIMESTAMP, server_default=sa.func.now()),
+    sa.Column("updated_at", sa.TIMESTAMP, server_default=sa.func.now()),
+    sa.Index("ix_email_outbox_status_next", "status", "next_attempt_at"),
+)
+
+
+def upgrade(conn):
+    # 인덱스(status, next_attempt_at)도 테이블과 함께 생성
+    email_outbox.create(conn, checkfirst=True)
@@ -0,0 +1,44 @@
+# 대량 안내 메일 캠페인 테이블과 사용자 언어 컬럼 추가
+import sqlalchemy as sa
+from sqlalchemy import text, inspect
+
+VERSION = 8
+DESCRIPTION = "email_campaigns, email_campaign_failures 테이블 및 users.locale 컬럼 추가"
+
+# 이 버전 시점의 테이블 정의 (models.py 를 불러오지 않도록 직접 정의, users 는 외래키 참조용)
+metadata = sa.MetaData()
+sa.Table("users", metadata, sa.Column("id", sa.Integer, primary_key=True))
+email_campaigns = sa.Table(
+    "email_campaigns", metadata,
+    sa.Column("id", sa.Integer, primary_key=True, index=True),
+    sa.Column("template", sa.String(50), nullable=False),
+    sa.Column("params", sa.JSON, nullable=False, default=dict),
+    sa.Column("status", sa.String(20), nullable=False, default="pending", index=True),
+    sa.Column("total", sa.Integer, nullable=False, default=0),
+    sa.Column("sent", sa.Integer, nullable=False, default=0),
+    sa.Column("failed", sa.Integer, nullable=False, default=0),
+    sa.Column("cursor_user_id", sa.Integer, nullable=False, default=0),
+    sa.Column("last_error", sa.Text, nullable=True),
+    sa.Column("created_by", sa.Integer, sa.ForeignKey("users.id", ondelete="SET NULL"), nullable=True),
+    sa.Column("created_at", sa.TIMESTAMP, server_default=sa.func.now()),
+    sa.Column("started_at", sa.TIMESTAMP, nullable=True),
+    sa.Column("finished_at", sa.TIMESTAMP, nullable=True),
+    sa.Column("updated_at", sa.TIMESTAMP, server_default=sa.func.now()),
+)
+email_campaign_failures = sa.Table(
+    "email_campaign_failures", metadata,
+    sa.Column("id", sa.Integer, primary_key=True, index=True),
+    sa.Column("campaign_id", sa.Integer, sa.ForeignKey("email_campaigns.id", ondelete="CASCADE"), nullable=False, index=True),
+    sa.Column("user_id", sa.Integer, nullable=False),
+    sa.Column("recipient", sa.String(200), nullable=False),
+    sa.Column("error", sa.Text, nullable=True),
+    sa.Column("created_at", sa.TIMESTAMP, server_default=sa.func.now()),
+)
+
+
+def upgrade(conn):
+    columns = {column["name"] for column in inspect(conn).get_columns("users")}
+    if "locale" not in columns:
+        conn.execute(text("ALTER TABLE users ADD COLUMN locale VARCHAR(10) NOT NULL DEFAULT 'ko'"))
+    email_campaigns.create(conn, checkfirst=True)
+    email_campaign_failures.create(conn, checkfirst=True)
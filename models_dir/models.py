@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, TIMESTAMP, func, DATE, Text
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, ForeignKey, TIMESTAMP, func, DATE, Text, BigInteger, Index, LargeBinary, JSON
 from sqlalchemy.orm import declarative_base, relationship
 from models_dir.database import Base
+from models_dir.content_codec import decompress_text
 
 # index: 열에 대한 검색 기능
 # primary_key: PK(주요 키)
@@ -19,33 +21,39 @@ class User(Base):
     email = Column(String(200), unique=True, index=True, nullable=False) # 이메일 주소
     hashed_password = Column(String(512), nullable=False)  # 비밀번호
     role_id = Column(Integer, ForeignKey('role.id'), nullable=False, default=1) # 사용자 역할 (역할 테이블 참조)
+    locale = Column(String(10), nullable=False, default="ko", server_default="ko") # 안내 메일 언어
     created_at = Column(TIMESTAMP, server_default=func.now())
 
     # 관계 설정
-    stories = relationship("Story", back_populates="user") # 사용자와 동화 간 관계 (일대다) : 하나의 사용자 여러 개 동화
-    articles = relationship("Article", back_populates="user") # 사용자와 게시물 간의 관계 (일대다): 하나의 사용자 여러 개 게시글
-    babies = relationship("Baby", back_populates="user") # 사용자와 아기 간의 관계 (일대다): 하나의 사용자 여러 명 아기
-    likes = relationship("Like", back_populates="user") # 사용자와 좋아요 간의 관계 (일대다): 하나의 사용자 여러 개의 좋아요
+    stories = relationship("Story", back_populates="user", passive_deletes=True) # 사용자와 동화 간 관계 (일대다) : 하나의 사용자 여러 개 동화
+    articles = relationship("Article", back_populates="user", passive_deletes=True) # 사용자와 게시물 간의 관계 (일대다): 하나의 사용자 여러 개 게시글
+    babies = relationship("Baby", back_populates="user", passive_deletes=True) # 사용자와 아기 간의 관계 (일대다): 하나의 사용자 여러 명 아기
+    likes = relationship("Like", back_populates="user", passive_deletes=True) # 사용자와 좋아요 간의 관계 (일대다): 하나의 사용자 여러 개의 좋아요
     role = relationship("Role", back_populates="users") # 사용자와 역할 간의 관계 (다대일): 여러 사용자, 각 사용자당 하나의 역할
+
+    # 복합 인덱스 (기존 DB 에는 models_dir/migrations 로 추가)
+    __table_args__ = (
+        Index("ix_users_username_email", "username", "email"),
+    )
     
 # 게시판 모델 정의
 class Article(Base):
     __tablename__ = "articles"
     id = Column(Integer, primary_key=True, index=True) # 정수형 PK
-    user_id = Column(Integer, ForeignKey('users.id')) # 사용자 참조 추가
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), index=True) # 사용자 참조 추가
     image = Column(String(255), nullable=False) # 업로드한 이미지 파일 경로
     created_at = Column(TIMESTAMP, server_default=func.now())
 
     # 관계 설정
     user = relationship("User", back_populates="articles") # 게시물과 사용자간 관계 (다대일): 하나의 사용자 여러 개 게시글
-    likes = relationship("Like", back_populates="article") # 게시물과 사용자간 관계 (일대다): 하나의 게시글 여러 개 좋아요
+    likes = relationship("Like", back_populates="article", passive_deletes=True) # 게시물과 사용자간 관계 (일대다): 하나의 게시글 여러 개 좋아요
 
 # 좋아요 기록용 모델 정의
 class Like(Base):
     __tablename__ = "likes"
     id = Column(Integer, primary_key=True, index=True) # 정수형 PK
-    user_id = Column(Integer, ForeignKey('users.id')) # 사용자 ID
-    article_id = Column(Integer, ForeignKey('articles.id')) # 게시글 ID
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), index=True) # 사용자 ID
+    article_id = Column(Integer, ForeignKey('articles.id', ondelete='CASCADE'), index=True) # 게시글 ID
     created_at = Column(TIMESTAMP, server_default=func.now())
 
     # 관계 설정
@@ -65,7 +73,7 @@ class Role(Base):
 class Baby(Base):
     __tablename__ = "babies"
     id = Column(Integer, primary_key=True, index=True) # 정수형 PK
-    user_id = Column(Integer, ForeignKey('users.id')) # 사용자 ID
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE')) # 사용자 ID
     baby_name = Column(String(100), nullable=False, index=True) # null 값 불가
     baby_gender = Column(String(20), nullable=False) # 성별 null 값 불가
     baby_bday = Column(DATE, nullable=False, index=True) # 출생(예정)일, Null 값 불가
@@ -74,6 +82,10 @@ class Baby(Base):
     # 관계 설정
     user = relationship("User", back_populates="babies") # 아기와 사용자 간 관계(다대일): 한 명의 사용자, 여러 명의 아기
 
+    __table_args__ = (
+        Index("ix_babies_user_name", "user_id", "baby_name"),
+    )
+
     def as_dict(self):
         return {
             "id": self.id,
@@ -87,14 +99,124 @@ class Baby(Base):
 class Story(Base):
     __tablename__ = "story"
     id = Column(Integer, primary_key=True, index=True) # 정수형 PK
-    user_id = Column(Integer, ForeignKey('users.id')) # 사용자 ID
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE')) # 사용자 ID
     theme = Column(String(100), nullable=False, index=True) # 동화 테마
     voice = Column(String(100), nullable=False, index=True) # 동화 목소리
-    content = Column(Text, nullable=False) # 내용
+    content_hash = Column(String(64), ForeignKey('story_contents.hash'), nullable=True, index=True) # 본문 SHA-256 (story_contents 참조)
+    legacy_content = Column("content", Text, nullable=True) # 본문 (story_contents 로 옮기기 전 데이터, 이전 후에는 비어 있음)
     voice_content=Column(Text, nullable=False) # 생성된 음성 파일 경로
     image = Column(Text, nullable=False) # 생성된 이미지 파일 경로
     bw_image = Column(String, nullable=False) # 흑백 이미지 파일 경로
     created_at = Column(TIMESTAMP, server_default=func.now()) # 생성일
 
     # 관계 설정
-    user = relationship("User", back_populates="stories") # 사용자와 동화 간 관계(다대일): 한 명의 사용자, 여러 개의 동화
\ No newline at end of file
+    user = relationship("User", back_populates="stories") # 사용자와 동화 간 관계(다대일): 한 명의 사용자, 여러 개의 동화
+    body = relationship("StoryContent") # 본문 (다대일): 같은 내용의 동화는 본문 하나를 공유
+
+    __table_args__ = (
+        Index("ix_story_user_created_id", "user_id", created_at.desc(), id.desc()),
+    )
+
+    @property
+    def content(self) -> str:
+        """동화 본문 (압축 해제)"""
+        if self.body is not None:
+            return self.body.text
+        return self.legacy_content or ""
+
+# 동화 본문 모델 정의 (내용 해시 기준 중복 제거, 압축 저장)
+class StoryContent(Base):
+    __tablename__ = "story_contents"
+    hash = Column(String(64), primary_key=True) # 본문 SHA-256
+    codec = Column(String(10), nullable=False) # 압축 방식 (zstd / gzip)
+    data = Column(LargeBinary, nullable=False) # 압축된 본문
+    size = Column(Integer, nullable=False) # 원본 크기 (바이트)
+    created_at = Column(TIMESTAMP, server_default=func.now()) # 생성일
+
+    @property
+    def text(self) -> str:
+        return decompress_text(self.codec, self.data)
+
+# 사용자별 동화 통계 모델 정의 (동화 저장/삭제와 같은 트랜잭션에서 갱신)
+class UserStats(Base):
+    __tablename__ = "user_stats"
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True) # 사용자 ID
+    story_count = Column(Integer, nullable=False, default=0) # 동화 수
+    theme_counts = Column(JSON, nullable=False, default=dict) # 테마별 동화 수 {"테마": 개수}
+    voice_counts = Column(JSON, nullable=False, default=dict) # 목소리별 동화 수 {"목소리": 개수}
+    content_bytes = Column(BigInteger, nullable=False, default=0) # 저장한 본문 크기 합계 (압축 전, 바이트)
+    last_created_at = Column(TIMESTAMP, nullable=True) # 마지막 동화 생성일
+    version = Column(Integer, nullable=False, default=0, server_default="0") # 동화/아이 정보가 바뀔 때마다 증가 (ETag 용)
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now()) # 수정일
+
+# 내용 주소(SHA-256) 기반 파일 저장소 모델 정의
+class Blob(Base):
+    __tablename__ = "blobs"
+    digest = Column(String(64), primary_key=True) # 파일 내용의 SHA-256 해시
+    ext = Column(String(10), nullable=False) # 확장자 (.png, .mp3 등)
+    size = Column(BigInteger, nullable=False) # 파일 크기 (바이트)
+    refcount = Column(Integer, nullable=False, default=0) # 이 파일을 참조하는 동화/캐시 엔트리 수
+    created_at = Column(TIMESTAMP, server_default=func.now()) # 생성일
+
+# 객체 저장소(S3) 업로드 대기열 모델 정의
+class UploadJob(Base):
+    __tablename__ = "upload_jobs"
+    id = Column(Integer, primary_key=True, index=True) # 정수형 PK
+    story_id = Column(Integer, ForeignKey('story.id', ondelete='CASCADE'), nullable=False, index=True) # 업로드 후 경로를 바꿀 동화 ID
+    column_name = Column(String(20), nullable=False) # 바꿀 컬럼 (image / bw_image)
+    local_path = Column(Text, nullable=False) # 업로드할 로컬 파일 경로
+    object_name = Column(String(255), nullable=False) # S3 객체 이름
+    status = Column(String(20), nullable=False, default="pending", index=True) # pending / running / done / failed
+    attempts = Column(Integer, nullable=False, default=0) # 시도 횟수
+    next_attempt_at = Column(TIMESTAMP, default=datetime.now, server_default=func.now(), index=True) # 다음 시도 가능 시각 (워커가 datetime.now() 와 비교)
+    last_error = Column(Text, nullable=True) # 마지막 오류 메시지
+    created_at = Column(TIMESTAMP, server_default=func.now()) # 생성일
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now()) # 수정일
+
+# 이메일 발송 대기열 모델 정의 (API 는 행만 추가하고 발송은 워커가 담당)
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    id = Column(Integer, primary_key=True, index=True) # 정수형 PK
+    kind = Column(String(50), nullable=False) # 메일 종류 (welcome / find_id / temp_password 등)
+    recipient = Column(String(200), nullable=False) # 받는 사람 이메일
+    subject = Column(String(255), nullable=False) # 제목
+    body = Column(Text, nullable=True) # HTML 본문 (임시 비밀번호 등은 암호화해 저장, 발송/포기 후 비움)
+    status = Column(String(20), nullable=False, default="pending") # pending / sending / sent / failed
+    attempts = Column(Integer, nullable=False, default=0) # 시도 횟수
+    next_attempt_at = Column(TIMESTAMP, default=datetime.now, server_default=func.now()) # 다음 시도 가능 시각 (워커가 datetime.now() 와 비교)
+    last_error = Column(Text, nullable=True) # 마지막 오류 메시지
+    sent_at = Column(TIMESTAMP, nullable=True) # 발송 완료 시각
+    created_at = Column(TIMESTAMP, server_default=func.now()) # 생성일
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now()) # 수정일
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next", "status", "next_attempt_at"),
+    )
+
+# 대량 안내 메일 캠페인 모델 정의 (사용자 테이블을 id 순으로 나눠 읽으며 발송, 진행 위치를 저장해 재시작 시 이어서 발송)
+class EmailCampaign(Base):
+    __tablename__ = "email_campaigns"
+    id = Column(Integer, primary_key=True, index=True) # 정수형 PK
+    template = Column(String(50), nullable=False) # 템플릿 이름 (emails/campaign_templates.py)
+    params = Column(JSON, nullable=False, default=dict) # 템플릿 변수
+    status = Column(String(20), nullable=False, default="pending", index=True) # pending / running / done / cancelled / failed
+    total = Column(Integer, nullable=False, default=0) # 시작 시점의 대상 사용자 수
+    sent = Column(Integer, nullable=False, default=0) # 발송 성공 수
+    failed = Column(Integer, nullable=False, default=0) # 발송 실패 수
+    cursor_user_id = Column(Integer, nullable=False, default=0) # 여기까지의 사용자(id)는 처리 완료
+    last_error = Column(Text, nullable=True) # 마지막 오류 메시지
+    created_by = Column(Integer, ForeignKey('users.id', ondelete='SET NULL'), nullable=True) # 등록한 관리자
+    created_at = Column(TIMESTAMP, server_default=func.now()) # 생성일
+    started_at = Column(TIMESTAMP, nullable=True) # 발송 시작 시각
+    finished_at = Column(TIMESTAMP, nullable=True) # 발송 종료 시각
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now()) # 수정일 (진행 중 갱신이 멈추면 다른 워커가 이어받음)
+
+# 캠페인 발송 실패 기록 모델 정의
+class EmailCampaignFailure(Base):
+    __tablename__ = "email_campaign_failures"
+    id = Column(Integer, primary_key=True, index=True) # 정수형 PK
+    campaign_id = Column(Integer, ForeignKey('email_campaigns.id', ondelete='CASCADE'), nullable=False, index=True) # 캠페인 ID
+    user_id = Column(Integer, nullable=False) # 받는 사용자 ID (탈퇴해도 기록 유지)
+    recipient = Column(String(200), nullable=False) # 받는 사람 이메일
+    error = Column(Text, nullable=True) # 오류 메시지
+    created_at = Column(TIMESTAMP, server_default=func.now()) # 생성일
@@ -0,0 +1,156 @@
+import os
+import time
+import logging
+import threading
+import traceback
+from contextvars import ContextVar
+from typing import Dict, Any, List
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+logger = logging.getLogger(__name__)
+
+# 누수 감지 설정
+DB_LEAK_DETECTION = os.getenv('DB_LEAK_DETECTION', 'true').lower() == 'true'  # 체크아웃 위치 기록 여부
+DB_LEAK_THRESHOLD = float(os.getenv('DB_LEAK_THRESHOLD', '30'))  # 이 시간(초) 이상 반환되지 않은 연결은 누수로 간주
+
+_IGNORED_PATHS = (os.sep + "sqlalchemy" + os.sep, os.path.abspath(__file__))
+
+
+def _call_site(limit: int = 3) -> List[str]:
+    """SQLAlchemy 내부를 제외한 호출 위치 (가장 가까운 프레임부터)"""
+    frames = [
+        frame for frame in traceback.extract_stack()[:-1]
+        if not any(ignored in frame.filename for ignored in _IGNORED_PATHS)
+    ]
+    return [f"{frame.filename}:{frame.lineno} in {frame.name}" for frame in reversed(frames[-limit:])]
+
+
+# 커넥션 풀 통계 클래스
+class PoolStats:
+    """엔진별 커넥션 풀 대기 시간과 체크아웃 상태를 수집"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools: Dict[str, Any] = {}
+        self._waits: Dict[str, Dict[str, float]] = {}
+        self._checkouts: Dict[int, Dict[str, Any]] = {}
+        self._reported_leaks = set()
+
+    def _wait_stats(self, name: str) -> Dict[str, float]:
+        return self._waits.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0, "timeouts": 0})
+
+    def record_wait(self, name: str, elapsed_seconds: float, timed_out: bool = False):
+        with self._lock:
+            stats = self._wait_stats(name)
+            stats["count"] += 1
+            stats["total"] += elapsed_seconds
+            stats["max"] = max(stats["max"], elapsed_seconds)
+            if timed_out:
+                stats["timeouts"] += 1
+
+    def attach(self, engine, name: str):
+        """엔진의 풀에 체크아웃/체크인 이벤트 연결"""
+        sync_engine = getattr(engine, "sync_engine", engine)
+        self._pools[name] = sync_engine
+
+        @event.listens_for(sync_engine, "checkout")
+        def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+            info = {"pool": name, "checked_out_at": time.time()}
+            if DB_LEAK_DETECTION:
+                info["call_site"] = _call_site()
+            with self._lock:
+                self._checkouts[id(connection_record)] = info
+            self.find_leaks()
+
+        @event.listens_for(sync_engine, "checkin")
+        def _on_checkin(dbapi_connection, connection_record):
+            with self._lock:
+                self._checkouts.pop(id(connection_record), None)
+                self._reported_leaks.discard(id(connection_record))
+
+    def find_leaks(self, threshold: float = DB_LEAK_THRESHOLD) -> List[Dict[str, Any]]:
+        """threshold 이상 반환되지 않은 연결 목록 (처음 발견될 때 한 번만 로그)"""
+        now = time.time()
+        leaks = []
+        with self._lock:
+            for record_id, info in self._checkouts.items():
+                held = now - info["checked_out_at"]
+                if held < threshold:
+                    continue
+                leak = {"pool": info["pool"], "held_seconds": round(held, 1), "call_site": info.get("call_site", [])}
+                leaks.append(leak)
+                if record_id not in self._reported_leaks:
+                    self._reported_leaks.add(record_id)
+                    logger.warning(f"반환되지 않은 DB 연결 ({leak['held_seconds']}초): {' <- '.join(leak['call_site'])}")
+        return leaks
+
+    def snapshot(self) -> Dict[str, Any]:
+        pools = {}
+        for name, engine in self._pools.items():
+            pool = engine.pool
+            with self._lock:
+                waits = dict(self._wait_stats(name))
+            pools[name] = {
+                "class": type(pool).__name__,
+                "size": pool.size() if hasattr(pool, "size") else None,
+                "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+                "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+                "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+                "wait": {
+                    "count": waits["count"],
+                    "timeouts": waits["timeouts"],
+                    "avg_ms": round(waits["total"] / waits["count"] * 1000, 3) if waits["count"] else 0.0,
+                    "max_ms": round(waits["max"] * 1000, 3),
+                },
+            }
+        return {"pools": pools, "leaks": self.find_leaks()}
+
+    def to_prometheus(self) -> str:
+        """Prometheus 텍스트 포맷으로 출력"""
+        snapshot = self.snapshot()
+        lines = []
+        for name, pool in snapshot["pools"].items():
+            for metric in ("size", "checked_in", "checked_out", "overflow"):
+                if pool[metric] is not None:
+                    lines.append(f'db_pool_{metric}{{pool="{name}"}} {pool[metric]}')
+            lines.append(f'db_pool_wait_total{{pool="{name}"}} {pool["wait"]["count"]}')
+            lines.append(f'db_pool_wait_timeouts_total{{pool="{name}"}} {pool["wait"]["timeouts"]}')
+            lines.append(f'db_pool_wait_max_ms{{pool="{name}"}} {pool["wait"]["max_ms"]}')
+        lines.append(f"db_pool_leaked_connections {len(snapshot['leaks'])}")
+        return "\n".join(lines) + "\n"
+
+
+# 전역 풀 통계
+pool_stats = PoolStats()
+
+
+# QueuePool._do_get 은 자기 자신을 재귀 호출하므로 가장 바깥 호출에서만 기록
+_in_timed_get: ContextVar[bool] = ContextVar("_in_timed_get", default=False)
+
+
+# 대기 시간을 기록하는 커넥션 풀
+class TimedQueuePool(QueuePool):
+    """연결을 얻기까지 기다린 시간을 pool_stats 에 기록하는 QueuePool
+
+    풀 이름은 recreate() 후에도 유지되는 logging_name 을 사용한다.
+    """
+
+    def _do_get(self):
+        if _in_timed_get.get():
+            return super()._do_get()
+        token = _in_timed_get.set(True)
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            _in_timed_get.reset(token)
+            pool_stats.record_wait(self._orig_logging_name or "default", time.perf_counter() - started, timed_out)
+
+
+class TimedAsyncAdaptedQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    """비동기 엔진용 TimedQueuePool"""
@@ -0,0 +1,183 @@
+import os
+import re
+import time
+import logging
+import threading
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# SQL 계측 설정
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', '5'))  # 한 요청에서 같은 형태의 쿼리가 이 횟수를 넘으면 N+1 의심
+SQL_SLOW_REQUEST_MS = float(os.getenv('SQL_SLOW_REQUEST_MS', '500'))  # 요청당 DB 시간이 이 값(ms)을 넘으면 경고
+SQL_MAX_ROUTES = int(os.getenv('SQL_MAX_ROUTES', '200'))  # 집계할 최대 경로 수 (경로 템플릿 기준)
+UNMATCHED_ROUTE = "unmatched"  # 라우트가 없는 요청(404, 스캐너 등)을 모아 집계하는 이름
+
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)\s*,)+\s*(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)\s*\)")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def statement_shape(statement: str) -> str:
+    """파라미터 값/IN 목록 길이와 무관한 쿼리 형태 (N+1 판별용)"""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _IN_LIST.sub("(?)", shape)
+    return _LITERALS.sub("?", shape)
+
+
+# 요청 단위 쿼리 기록
+class RequestQueries:
+    """한 요청 동안 실행된 쿼리 수, DB 시간, 쿼리 형태별 횟수"""
+
+    def __init__(self, route: str):
+        self.route = route
+        self.count = 0
+        self.total_seconds = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, elapsed_seconds: float):
+        self.count += 1
+        self.total_seconds += elapsed_seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int = SQL_N_PLUS_ONE_THRESHOLD) -> List[Dict[str, Any]]:
+        """threshold 번을 넘게 반복된 쿼리 형태"""
+        return [
+            {"statement": shape, "count": count}
+            for shape, count in self.shapes.most_common()
+            if count > threshold
+        ]
+
+
+# 현재 요청의 기록 (요청 밖에서 실행된 쿼리는 집계하지 않음)
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("_current_request_queries", default=None)
+
+
+# SQL 통계 클래스
+class QueryStats:
+    """경로별 쿼리 수/DB 시간과 N+1 의심 사례를 수집"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Dict[str, Any]] = {}
+        self._suspects: Dict[tuple, Dict[str, Any]] = {}
+
+    def attach(self, engine):
+        """엔진에 쿼리 실행 이벤트 연결 (비동기 엔진은 내부 sync_engine 에 연결)"""
+        sync_engine = getattr(engine, "sync_engine", engine)
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def _before_execute(conn, cursor, statement, parameters, context, executemany):
+            if _current.get() is not None:
+                conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def _after_execute(conn, cursor, statement, parameters, context, executemany):
+            queries = _current.get()
+            started = conn.info.get("query_started")
+            if queries is None or not started:
+                return
+            queries.record(statement, time.perf_counter() - started.pop())
+
+        @event.listens_for(sync_engine, "handle_error")
+        def _on_error(exception_context):
+            # 실패한 쿼리의 시작 시간이 남아 다음 쿼리 시간에 섞이지 않도록 정리
+            conn = exception_context.connection
+            if conn is not None and conn.info.get("query_started"):
+                conn.info["query_started"].pop()
+
+    def start_request(self, route: str):
+        """요청 시작 시 호출, finish_request 에 넘길 토큰 반환"""
+        return _current.set(RequestQueries(route))
+
+    def current(self) -> Optional[RequestQueries]:
+        return _current.get()
+
+    def finish_request(self, token, route: Optional[str] = None) -> RequestQueries:
+        """요청 종료 시 호출: 경로별 통계에 합치고 N+1 의심 쿼리 기록
+
+        route 는 라우팅이 끝난 뒤 알 수 있는 경로 템플릿 (/babies/delete/{baby_id} 등)
+        일치하는 라우트가 없으면 원본 URL 대신 UNMATCHED_ROUTE 로 묶어 경로 수 제한을 채우지 않도록 함
+        """
+        queries = _current.get()
+        _current.reset(token)
+        queries.route = route or UNMATCHED_ROUTE
+        repeated = queries.repeated()
+
+        with self._lock:
+            stats = self._routes.get(queries.route)
+            if stats is None:
+                if len(self._routes) >= SQL_MAX_ROUTES:
+                    return queries
+                stats = self._routes[queries.route] = {
+                    "requests": 0, "queries": 0, "max_queries": 0, "total": 0.0, "max": 0.0, "n_plus_one": 0,
+                }
+            stats["requests"] += 1
+            stats["queries"] += queries.count
+            stats["max_queries"] = max(stats["max_queries"], queries.count)
+            stats["total"] += queries.total_seconds
+            stats["max"] = max(stats["max"], queries.total_seconds)
+            if repeated:
+                stats["n_plus_one"] += 1
+            new_suspects = []
+            for item in repeated:
+                key = (queries.route, item["statement"])
+                suspect = self._suspects.get(key)
+                if suspect is None:
+                    suspect = self._suspects[key] = {
+                        "route": queries.route, "statement": item["statement"], "requests": 0, "max_repeats": 0,
+                    }
+                    new_suspects.append(item)
+                suspect["requests"] += 1
+                suspect["max_repeats"] = max(suspect["max_repeats"], item["count"])
+
+        # 같은 경로/쿼리는 처음 발견될 때만 로그
+        for item in new_suspects:
+            logger.warning(f"N+1 의심 ({queries.route}): 같은 쿼리 {item['count']}회 실행 - {item['statement'][:200]}")
+        if queries.total_seconds * 1000 > SQL_SLOW_REQUEST_MS:
+            logger.warning(
+                f"DB 시간이 긴 요청 ({queries.route}): 쿼리 {queries.count}개, {queries.total_seconds * 1000:.1f}ms"
+            )
+        return queries
+
+    def snapshot(self, top_n: int = 20) -> Dict[str, Any]:
+        with self._lock:
+            routes = {
+                route: {
+                    "requests": stats["requests"],
+                    "queries": stats["queries"],
+                    "avg_queries": round(stats["queries"] / stats["requests"], 2),
+                    "max_queries": stats["max_queries"],
+                    "avg_db_ms": round(stats["total"] / stats["requests"] * 1000, 3),
+                    "max_db_ms": round(stats["max"] * 1000, 3),
+                    "n_plus_one_requests": stats["n_plus_one"],
+                }
+                for route, stats in self._routes.items()
+            }
+            suspects = sorted(self._suspects.values(), key=lambda item: item["max_repeats"], reverse=True)
+        busiest = sorted(routes.items(), key=lambda item: item[1]["avg_queries"], reverse=True)[:top_n]
+        return {
+            "n_plus_one_threshold": SQL_N_PLUS_ONE_THRESHOLD,
+            "routes": dict(busiest),
+            "n_plus_one_suspects": [dict(item) for item in suspects[:top_n]],
+        }
+
+    def to_prometheus(self) -> str:
+        """Prometheus 텍스트 포맷으로 출력"""
+        with self._lock:
+            routes = {route: dict(stats) for route, stats in self._routes.items()}
+        lines = []
+        for route, stats in routes.items():
+            label = route.replace('"', '\\"')
+            lines.append(f'sql_requests_total{{route="{label}"}} {stats["requests"]}')
+            lines.append(f'sql_queries_total{{route="{label}"}} {stats["queries"]}')
+            lines.append(f'sql_db_seconds_total{{route="{label}"}} {round(stats["total"], 6)}')
+            lines.append(f'sql_n_plus_one_requests_total{{route="{label}"}} {stats["n_plus_one"]}')
+        return "\n".join(lines) + "\n"
+
+
+# 전역 SQL 통계
+query_stats = QueryStats()
@@ -0,0 +1,121 @@
+"""
+동화 전문 검색 인덱스
+
+본문은 story_contents 에 압축되어 있으므로 검색용 토큰을 따로 story_search 에 저장한다.
+- PostgreSQL: tsvector 컬럼 + GIN 인덱스 (테마 가중치 A, 본문 가중치 B)
+- SQLite: FTS5 가상 테이블 (rowid = story.id)
+
+한국어는 형태소 분석기 없이 2-gram 으로 나눠 색인하므로 조사가 붙은 단어도 검색된다.
+(예: "토끼가" → "토끼", "끼가" / 검색어 "토끼" → "토끼")
+"""
+import re
+from typing import Iterable, List, Tuple, Union
+from sqlalchemy import text, bindparam
+from sqlalchemy.orm import Session
+from sqlalchemy.engine import Connection
+
+SEARCH_TABLE = "story_search"
+THEME_WEIGHT = 5.0  # SQLite bm25 에서 테마 일치에 주는 가중치 (본문은 1.0)
+
+_TOKEN_PATTERN = re.compile(r"[가-힣]+|[a-z0-9]+")
+
+Executor = Union[Session, Connection]
+
+
+def _is_postgres(db: Executor) -> bool:
+    return db.get_bind().dialect.name == "postgresql" if isinstance(db, Session) else db.dialect.name == "postgresql"
+
+
+def tokenize(value: str) -> List[str]:
+    """검색 토큰 목록 (한글은 2-gram, 한 글자 단어는 그대로, 영문/숫자는 단어 단위)"""
+    tokens = []
+    for word in _TOKEN_PATTERN.findall((value or "").lower()):
+        if "가" <= word[0] <= "힣" and len(word) > 1:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def build_query(db: Executor, query: str) -> str:
+    """검색어를 dialect 별 검색식으로 변환 (모든 토큰을 AND, 한 글자 한글은 앞부분 일치)"""
+    terms = []
+    for token in dict.fromkeys(tokenize(query)):
+        prefix = len(token) == 1 and "가" <= token <= "힣"
+        if _is_postgres(db):
+            terms.append(f"{token}:*" if prefix else token)
+        else:
+            terms.append(f'"{token}"*' if prefix else f'"{token}"')
+    return (" & " if _is_postgres(db) else " AND ").join(terms)
+
+
+# 인덱스 생성 (마이그레이션에서 호출)
+def create_search_index(conn: Connection):
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+            "story_id INTEGER PRIMARY KEY REFERENCES story (id) ON DELETE CASCADE, "
+            "user_id INTEGER NOT NULL, "
+            "document TSVECTOR NOT NULL)"
+        ))
+    else:
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+            "USING fts5(theme, body, user_id UNINDEXED, tokenize='unicode61')"
+        ))
+
+
+# 색인 추가/삭제 (커밋은 호출자가 담당)
+def index_stories(db: Executor, stories: Iterable[Tuple[int, int, str, str]]):
+    """(story_id, user_id, theme, content) 목록을 색인 (이미 있으면 교체)"""
+    rows = [
+        {"story_id": story_id, "user_id": user_id, "theme": " ".join(tokenize(theme)), "body": " ".join(tokenize(content))}
+        for story_id, user_id, theme, content in stories
+    ]
+    if not rows:
+        return
+    remove_stories(db, [row["story_id"] for row in rows])
+    if _is_postgres(db):
+        db.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (story_id, user_id, document) VALUES (:story_id, :user_id, "
+            "setweight(to_tsvector('simple', :theme), 'A') || setweight(to_tsvector('simple', :body), 'B'))"
+        ), rows)
+    else:
+        db.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, theme, body, user_id) VALUES (:story_id, :theme, :body, :user_id)"
+        ), rows)
+
+
+def remove_stories(db: Executor, story_ids: List[int]):
+    if not story_ids:
+        return
+    key = "story_id" if _is_postgres(db) else "rowid"
+    statement = text(f"DELETE FROM {SEARCH_TABLE} WHERE {key} IN :story_ids").bindparams(
+        bindparam("story_ids", expanding=True)
+    )
+    db.execute(statement, {"story_ids": list(story_ids)})
+
+
+def remove_user_stories(db: Executor, user_id: int):
+    db.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE user_id = :user_id"), {"user_id": user_id})
+
+
+# 검색
+def search_story_ids(db: Executor, user_id: int, query: str, limit: int, offset: int = 0) -> List[int]:
+    """관련도 순 동화 ID 목록 (검색어에 토큰이 없으면 빈 목록)"""
+    expression = build_query(db, query)
+    if not expression:
+        return []
+    params = {"query": expression, "user_id": user_id, "limit": limit, "offset": offset}
+    if _is_postgres(db):
+        rows = db.execute(text(
+            f"SELECT story_id FROM {SEARCH_TABLE}, to_tsquery('simple', :query) AS q "
+            "WHERE user_id = :user_id AND document @@ q "
+            "ORDER BY ts_rank(document, q) DESC, story_id DESC LIMIT :limit OFFSET :offset"
+        ), params)
+    else:
+        rows = db.execute(text(
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :query AND user_id = :user_id "
+            f"ORDER BY bm25({SEARCH_TABLE}, {THEME_WEIGHT}, 1.0), rowid DESC LIMIT :limit OFFSET :offset"
+        ), params)
+    return [row[0] for row in rows]
@@ -0,0 +1,45 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+
+# 캠페인 등록 시 데이터 검증
+class CampaignCreate(BaseModel):
+    template: str # 템플릿 이름 (story_ready / new_themes)
+    params: Dict[str, Any] = {} # 템플릿 변수 (예: {"title": "별빛 여행"})
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "template": "new_themes",
+                "params": {"themes": ["우주 탐험", "바닷속 친구들"]}
+            }
+        }
+
+# 캠페인 진행 상황 응답
+class CampaignResponse(BaseModel):
+    id: int
+    template: str
+    status: str # pending / running / done / cancelled / failed
+    total: int
+    sent: int
+    failed: int
+    processed: int
+    percent: float
+    rate_per_second: Optional[float] = None
+    eta_seconds: Optional[int] = None
+    last_error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+# 캠페인 발송 실패 항목
+class CampaignFailureItem(BaseModel):
+    id: int
+    user_id: int
+    recipient: str
+    error: Optional[str] = None
+
+# 캠페인 발송 실패 목록 (next_after_id 로 다음 페이지 조회)
+class CampaignFailuresResponse(BaseModel):
+    items: List[CampaignFailureItem]
+    next_after_id: Optional[int] = None
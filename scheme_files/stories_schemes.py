@@ -1,5 +1,6 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import Optional, List, Dict
+from datetime import datetime
 
 # Story 응답용
 class StoryResponse(BaseModel):
@@ -15,6 +16,36 @@ class StoryResponse(BaseModel):
     class Config:
         from_attributes: True # SQLAlchemy 모델을 자동으로 JSON 변환할 수 있게 함
 
+# Story 목록 항목 (본문/음성 컬럼 제외)
+class StorySummary(BaseModel):
+    id: int
+    theme: str
+    voice: Optional[str] = None
+    image: Optional[str] = None
+    bw_image: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+# Story 목록 페이지 응답 (next_cursor 가 없으면 마지막 페이지)
+class StoryPageResponse(BaseModel):
+    stories: List[StorySummary]
+    next_cursor: Optional[str] = None
+
+# 동화 검색 응답 (관련도 순, next_offset 이 없으면 마지막 페이지)
+class StorySearchResponse(BaseModel):
+    stories: List[StorySummary]
+    next_offset: Optional[int] = None
+
+# 사용자별 동화 통계 응답
+class UserStatsResponse(BaseModel):
+    story_count: int
+    theme_counts: Dict[str, int]
+    voice_counts: Dict[str, int]
+    content_bytes: int
+    last_created_at: Optional[datetime] = None
+
 # 동화 생성 클래스
 class StoryRequest(BaseModel):
     name: str
@@ -0,0 +1,115 @@
+# 저장소 루트에서 controllers, models_dir 등을 import 할 수 있도록 경로 추가
+import os
+import sys
+import socket
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 테스트는 PostgreSQL 대신 임시 SQLite DB 사용 (models_dir.database import 전에 설정)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='fairytale_test_')}/test.db")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    """테이블 생성과 마이그레이션(검색 인덱스 등 create_all 로 만들 수 없는 객체 포함)을 한 번 실행"""
+    from models_dir.database import init_db
+    init_db()
+
+
+@pytest.fixture
+def make_client():
+    """주어진 라우터와 세션 미들웨어만 올린 테스트 앱 (GET /test/login/{user_id} 로 세션 로그인)"""
+    from fastapi import FastAPI, Request
+    from fastapi.testclient import TestClient
+    from starlette.middleware.sessions import SessionMiddleware
+    clients = []
+
+    def factory(*routers):
+        app = FastAPI()
+        app.add_middleware(SessionMiddleware, secret_key="test-secret")
+        for router in routers:
+            app.include_router(router)
+
+        @app.get("/test/login/{user_id}")
+        def login(user_id: int, request: Request):
+            request.session["id"] = user_id
+            return {"id": user_id}
+
+        client = TestClient(app)
+        clients.append(client)
+        return client
+
+    yield factory
+    for client in clients:
+        client.close()
+
+
+@pytest.fixture
+def add_user():
+    """db 세션에 사용자 행 추가 (역할 행이 없으면 함께 추가, 커밋은 테스트가 담당)"""
+    from models_dir.models import Role, User
+
+    def factory(db, user_id: int, **fields):
+        if db.get(Role, 1) is None:
+            db.add(Role(id=1, role_name="user"))
+            db.flush()
+        values = {"username": f"user{user_id}", "nickname": f"user{user_id}",
+                  "email": f"user{user_id}@example.com", "hashed_password": "x", **fields}
+        return db.merge(User(id=user_id, **values))
+
+    return factory
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def unused_port():
+    """아무도 듣지 않는 포트 (SMTP 연결 실패 재현용)"""
+    return _free_port()
+
+
+# 받은 메일을 기록하고 reject@ 로 시작하는 주소는 거부하는 SMTP 서버
+class RecordingHandler:
+    def __init__(self):
+        self.messages = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("reject@"):
+            return "550 5.1.1 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.rcpt_tos, envelope.original_content))
+        return "250 Message accepted"
+
+
+@pytest.fixture
+def smtp_server():
+    """aiosmtpd 로컬 SMTP 서버, (controller, handler) 반환"""
+    controller_module = pytest.importorskip("aiosmtpd.controller")
+    handler = RecordingHandler()
+    controller = controller_module.Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    yield controller, handler
+    controller.stop()
+
+
+@pytest.fixture
+def fast_hasher(monkeypatch):
+    """사용자 라우트용 비밀번호 해시 서비스 (별도 프로세스 대신 스레드에서 최소 비용 bcrypt 로 계산)"""
+    from controllers import password_hasher, users_controller
+    monkeypatch.setattr(password_hasher, "PASSWORD_SCHEME", "bcrypt")
+    monkeypatch.setattr(password_hasher, "PASSWORD_BCRYPT_ROUNDS", 4)
+    monkeypatch.setattr(password_hasher, "_worker_context", None)
+    hasher = password_hasher.PasswordHasher(workers=1, executor_type="thread")
+    monkeypatch.setattr(users_controller, "password_hasher", hasher)
+    yield hasher
+    hasher.shutdown()
@@ -0,0 +1,50 @@
+# 참조 없는 파일 수집기 테스트
+import threading
+import time
+
+from controllers.asset_gc import AssetGarbageCollector
+
+
+def _wait_idle(collector, timeout=5):
+    deadline = time.time() + timeout
+    while collector._thread is not None and time.time() < deadline:
+        time.sleep(0.01)
+    assert collector._thread is None
+
+
+def test_requests_during_a_run_trigger_one_more_run():
+    collector = AssetGarbageCollector(targets=[], batch_pause=0, min_interval=0.2)
+    started = []
+    release = threading.Event()
+
+    def collect():
+        started.append(time.time())
+        release.wait(5)
+
+    collector.collect = collect
+    collector.request_collection()
+    while not started:
+        time.sleep(0.01)
+    # 실행 중 들어온 요청은 버리지 않고 한 번으로 합쳐서 다시 실행
+    for _ in range(3):
+        collector.request_collection()
+    release.set()
+    _wait_idle(collector)
+
+    assert len(started) == 2
+    assert started[1] - started[0] >= 0.2
+
+
+def test_request_within_min_interval_runs_after_the_window():
+    collector = AssetGarbageCollector(targets=[], batch_pause=0, min_interval=0.2)
+    started = []
+    collector.collect = lambda: started.append(time.time())
+
+    collector.request_collection()
+    _wait_idle(collector)
+    # 최근 수집 직후의 요청도 최소 간격이 지난 뒤 실행
+    collector.request_collection()
+    _wait_idle(collector)
+
+    assert len(started) == 2
+    assert started[1] - started[0] >= 0.2
@@ -0,0 +1,40 @@
+# 내용 주소 파일 이름/샤딩 경로 테스트
+import hashlib
+import os
+
+from controllers import asset_naming
+from controllers.asset_naming import digest_file, object_key, parse_digest, sharded_path, sharded_relpath
+from controllers.blob_store import BlobStore
+
+
+def test_sharded_layout_from_digest():
+    digest = hashlib.sha256(b"cover").hexdigest()
+    assert sharded_relpath(digest, ".png") == f"{digest[:2]}/{digest[2:4]}/{digest}.png"
+    assert sharded_path("/data/blobs", digest, ".png") == os.path.join("/data/blobs", digest[:2], digest[2:4], f"{digest}.png")
+    assert object_key(digest, ".png") == f"images/{digest[:2]}/{digest[2:4]}/{digest}.png"
+    # 경로, URL, 객체 키 어디서든 digest 를 바로 얻고, 형식이 아니면 None
+    assert parse_digest(f"https://bucket.s3.amazonaws.com/{object_key(digest, '.png')}") == digest
+    assert parse_digest("static/images/story_1.png") is None
+    assert parse_digest(digest.upper() + ".png") is None
+
+
+def test_large_file_digest_is_read_in_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(asset_naming, "HASH_CHUNK_SIZE", 7)
+    data = os.urandom(100)
+    path = tmp_path / "voice.mp3"
+    path.write_bytes(data)
+    assert digest_file(str(path)) == hashlib.sha256(data).hexdigest()
+
+
+def test_same_content_converges_on_one_file(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs"))
+    first = store.put_bytes(b"same image", ".png")
+    second = store.put_bytes(b"same image", ".png")
+    other = store.put_bytes(b"other image", ".png")
+
+    assert first == second != other
+    digest = hashlib.sha256(b"same image").hexdigest()
+    assert first == sharded_path(str(tmp_path / "blobs"), digest, ".png")
+    assert store.digest_from_path(first) == digest
+    # 한 디렉토리에 몰리지 않고 두 단계 하위 디렉토리에 저장
+    assert os.listdir(tmp_path / "blobs") and all(len(name) == 2 for name in os.listdir(tmp_path / "blobs"))
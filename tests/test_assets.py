@@ -0,0 +1,28 @@
+# /assets 파일 제공 테스트
+import os
+
+from controllers import assets_controller
+from controllers.blob_store import BlobStore
+
+
+def test_asset_revalidation_answers_304(make_client, tmp_path, monkeypatch):
+    store = BlobStore(str(tmp_path / "blobs"))
+    monkeypatch.setattr(assets_controller, "blob_store", store)
+    path = store.put_bytes(b"image-bytes", ".png")
+    filename = os.path.basename(path)
+    digest = os.path.splitext(filename)[0]
+
+    client = make_client(assets_controller.router)
+    response = client.get(f"/assets/{filename}")
+    assert response.status_code == 200
+    assert response.content == b"image-bytes"
+    assert response.headers["etag"] == f'"{digest}"'
+    assert "immutable" in response.headers["cache-control"]
+
+    # 여러 태그나 weak 태그로 보내도 같은 파일이면 본문 없이 304
+    for header in (f'"{digest}"', f'"other", W/"{digest}"', "*"):
+        response = client.get(f"/assets/{filename}", headers={"If-None-Match": header})
+        assert response.status_code == 304
+        assert response.content == b""
+    assert client.get(f"/assets/{filename}", headers={"If-None-Match": '"other"'}).status_code == 200
+    assert client.get("/assets/not-a-digest.png").status_code == 404
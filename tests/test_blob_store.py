@@ -0,0 +1,56 @@
+# 내용 주소 파일 저장소 참조 수 테스트
+import os
+import time
+
+from models_dir.database import Base, engine, SessionLocal
+from models_dir.models import Blob
+from controllers.blob_store import BlobStore
+
+
+def _refcount(digest):
+    db = SessionLocal()
+    try:
+        blob = db.get(Blob, digest)
+        return None if blob is None else blob.refcount
+    finally:
+        db.close()
+
+
+def test_referenced_put_creates_row_with_reference(tmp_path):
+    Base.metadata.create_all(bind=engine)
+    store = BlobStore(str(tmp_path / "blobs"))
+    source = tmp_path / "cover.png"
+    source.write_bytes(b"referenced cover")
+
+    path = store.put_file(str(source), referenced=True)
+    digest = store.digest_from_path(path)
+    # 행이 참조 수 1로 만들어지므로 그 사이 purge 되지 않음
+    assert _refcount(digest) == 1
+    assert not store.purge_if_unreferenced(digest)
+
+    # 이미 저장소에 있는 경로도 참조 수만 증가
+    assert store.put_file(path, referenced=True) == path
+    assert _refcount(digest) == 2
+
+
+def test_purge_skips_recently_stored_blob(tmp_path):
+    Base.metadata.create_all(bind=engine)
+    store = BlobStore(str(tmp_path / "blobs"), grace_seconds=60)
+    path = store.put_bytes(b"not yet attached to a story", ".png")
+    digest = store.digest_from_path(path)
+    assert _refcount(digest) == 0
+
+    # 저장 직후(동화 저장 전)에는 참조 수가 0이어도 지우지 않음
+    assert not store.purge_if_unreferenced(digest)
+    assert os.path.exists(path)
+
+    old = time.time() - 120
+    os.utime(path, (old, old))
+    assert store.purge_if_unreferenced(digest)
+    assert not os.path.exists(path)
+    assert _refcount(digest) is None
+
+    # 지워진 뒤 같은 내용을 다시 저장하면 파일과 행이 함께 복구됨
+    assert store.put_bytes(b"not yet attached to a story", ".png", referenced=True) == path
+    assert os.path.exists(path)
+    assert _refcount(digest) == 1
@@ -0,0 +1,96 @@
+# Redis 캐시 백엔드 테스트 (fakeredis 로 두 노드가 같은 Redis 를 공유하는 상황 재현)
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from controllers.cache import CacheManager, CacheStats
+from controllers.cache_backends import RedisCacheBackend
+from controllers.storage import MemoryStorage
+
+INLINE_LIMIT = 1024
+
+
+@pytest.fixture
+def cluster(tmp_path):
+    """같은 Redis/객체 저장소를 쓰고 로컬 디렉토리만 다른 두 노드"""
+    server = fakeredis.FakeServer()
+    storage = MemoryStorage()
+
+    def node(name):
+        cache_dir = tmp_path / name
+        backend = RedisCacheBackend(
+            client=fakeredis.FakeRedis(server=server),
+            inline_limit=INLINE_LIMIT,
+            blob_storage=storage,
+            materialize_dir=str(cache_dir),
+        )
+        return CacheManager(cache_dir=str(cache_dir), stats=CacheStats(), backend=backend)
+
+    return node("a"), node("b"), storage
+
+
+def write(path, data: bytes) -> str:
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_small_and_large_blobs_are_shared(cluster, tmp_path):
+    node_a, node_b, storage = cluster
+    small = write(tmp_path / "small.mp3", b"s" * 100)
+    large = write(tmp_path / "large.png", b"L" * (INLINE_LIMIT * 4))
+
+    node_a.cache_file("작은 파일", "audio", small)
+    node_a.cache_file("큰 파일", "image", large)
+
+    small_entry = node_b.backend.get_entry(node_b._generate_cache_key("작은 파일", "audio"))
+    large_entry = node_b.backend.get_entry(node_b._generate_cache_key("큰 파일", "image"))
+    assert small_entry["storage"] == "inline"
+    assert large_entry["storage"] == "ref" and storage.exists(large_entry["ref"])
+
+    small_path, _ = node_b.lookup("작은 파일", "audio")
+    large_path, _ = node_b.lookup("큰 파일", "image")
+    assert open(small_path, "rb").read() == b"s" * 100
+    assert open(large_path, "rb").read() == b"L" * (INLINE_LIMIT * 4)
+    assert str(tmp_path / "b") in small_path and str(tmp_path / "b") in large_path
+    assert node_b.stats.snapshot()["cache_types"]["image"]["hits"] == 1
+
+
+def test_unreadable_blob_is_a_local_miss(cluster, tmp_path):
+    node_a, node_b, storage = cluster
+    node_a.cache_file("큰 파일", "image", write(tmp_path / "large.png", b"L" * (INLINE_LIMIT * 4)))
+    cache_key = node_a._generate_cache_key("큰 파일", "image")
+    ref = node_a.backend.get_entry(cache_key)["ref"]
+
+    # 객체 저장소에서 일시적으로 못 읽어도 공유 엔트리는 지우지 않음
+    data = storage.read(ref)
+    storage.delete(ref)
+    assert node_b.lookup("큰 파일", "image") == (None, False)
+    assert node_a.backend.get_entry(cache_key) is not None
+
+    storage.write_bytes(data, ref)
+    path, _ = node_b.lookup("큰 파일", "image")
+    assert path is not None
+
+
+def test_overwrite_is_not_served_from_stale_local_copy(cluster, tmp_path):
+    node_a, node_b, _ = cluster
+    node_a.cache_file("동화", "audio", write(tmp_path / "v1.mp3", b"version-1"))
+    first, _ = node_b.lookup("동화", "audio")
+    assert open(first, "rb").read() == b"version-1"
+
+    node_a.cache_file("동화", "audio", write(tmp_path / "v2.mp3", b"version-2"))
+    second, _ = node_b.lookup("동화", "audio")
+    assert open(second, "rb").read() == b"version-2"
+    assert second != first
+    assert not (tmp_path / "b" / first.rsplit("/", 1)[-1]).exists()
+
+
+def test_switching_to_inline_removes_previous_ref(cluster, tmp_path):
+    node_a, _, storage = cluster
+    node_a.cache_file("동화", "image", write(tmp_path / "big.png", b"L" * (INLINE_LIMIT * 4)))
+    ref = node_a.backend.get_entry(node_a._generate_cache_key("동화", "image"))["ref"]
+
+    node_a.cache_file("동화", "image", write(tmp_path / "small.png", b"s"))
+    assert not storage.exists(ref)
+    path, _ = node_a.lookup("동화", "image")
+    assert open(path, "rb").read() == b"s"
@@ -0,0 +1,58 @@
+# 캐시 통계 테스트 (히트/미스/실패 캐시/제거 횟수와 Prometheus 출력)
+from controllers.cache import CacheManager, CacheStats, Config
+from controllers.cache_backends import LocalDiskCacheBackend
+
+
+def make_cache(tmp_path):
+    cache_dir = tmp_path / "cache"
+    return CacheManager(cache_dir=str(cache_dir), stats=CacheStats(), backend=LocalDiskCacheBackend(str(cache_dir)))
+
+
+def test_lookups_are_counted_per_cache_type(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "MAX_CACHE_SIZE", 2)
+    cache = make_cache(tmp_path)
+    source = tmp_path / "voice.mp3"
+    source.write_bytes(b"a" * 10)
+
+    assert cache.lookup("첫 문장", "audio") == (None, False)
+    cache.cache_file("첫 문장", "audio", str(source))
+    path, _ = cache.lookup("첫 문장", "audio")
+    assert open(path, "rb").read() == b"a" * 10
+    cache.cache_negative("실패한 문장", "audio")
+    assert cache.lookup("실패한 문장", "audio") == (None, True)
+    # 최대 개수를 넘으면 가장 오래 쓰지 않은 항목부터 제거
+    cache.cache_file("둘째 문장", "audio", str(source))
+
+    stats = cache.stats.snapshot()["cache_types"]["audio"]
+    assert (stats["hits"], stats["misses"], stats["negative_hits"]) == (1, 1, 1)
+    assert (stats["inserts"], stats["evictions"]) == (2, 1)
+    assert stats["hit_ratio"] == round(2 / 3, 4)
+    assert stats["bytes_stored"] == 10
+    assert stats["lookup_latency_ms"]["count"] == 3
+    assert cache.stats.snapshot()["top_keys"][0]["hits"] == 1
+
+
+def test_prometheus_output_and_reset():
+    stats = CacheStats()
+    stats.record("image", "hits", "key")
+    stats.record("image", "misses")
+    stats.add_bytes("image", 2048)
+    stats.record_latency("image", 0.002)
+
+    text = stats.to_prometheus()
+    assert 'fairytale_cache_hits_total{cache_type="image"} 1' in text
+    assert 'fairytale_cache_misses_total{cache_type="image"} 1' in text
+    assert 'fairytale_cache_bytes_stored{cache_type="image"} 2048' in text
+    assert 'fairytale_cache_lookup_latency_ms_count{cache_type="image"} 1' in text
+
+    stats.reset()
+    assert stats.snapshot() == {"cache_types": {}, "top_keys": []}
+
+
+def test_tracked_keys_are_bounded():
+    stats = CacheStats(max_tracked_keys=4)
+    for index in range(10):
+        stats.record("image", "hits", f"key{index}")
+    stats.record("image", "hits", "key9")
+    assert len(stats._key_hits) <= 4
+    assert stats.snapshot(top_n=1)["top_keys"] == [{"cache_type": "image", "key": "key9", "hits": 2}]
@@ -0,0 +1,182 @@
+# 대량 안내 메일 직렬화 테스트
+import re
+import pytest
+
+pytest.importorskip("jinja2")
+
+from emails.campaigns import RenderedCampaign
+
+
+def test_serialized_campaign_uses_crlf_only():
+    rendered = RenderedCampaign("story_ready", {"title": "토끼\n이야기", "summary": "첫 줄\n둘째 줄"})
+    data = rendered.data_for("reader@example.com", "ko")
+    assert data.startswith(b"To: reader@example.com\r\n")
+    assert re.search(rb"(?<!\r)\n", data) is None
+
+
+def test_recipient_with_line_break_is_rejected():
+    rendered = RenderedCampaign("story_ready", {"title": "토끼"})
+    with pytest.raises(ValueError):
+        rendered.data_for("reader@example.com\r\nBcc: other@example.com", "ko")
+
+
+# 캠페인 발송 워커 테스트 (conftest 의 로컬 SMTP 서버로 실제 발송)
+from sqlalchemy import update
+
+from models_dir.database import SessionLocal
+from models_dir.models import EmailCampaign, EmailCampaignFailure
+from emails import campaigns
+from emails.campaigns import CampaignWorker, create_campaign
+from emails.outbox import SMTPConnectionPool
+
+# 다른 테스트의 사용자와 섞이지 않도록 이 번호 이후의 사용자만 발송 대상으로 삼음
+BASE_USER_ID = 20000
+
+
+@pytest.fixture
+def campaign(add_user):
+    """BASE_USER_ID 이후 사용자 5명(그중 둘은 잘못된 주소)과 대기 중인 캠페인"""
+    db = SessionLocal()
+    try:
+        db.query(EmailCampaign).delete()
+        emails = ["a@example.com", "b@example.com", "bad\n@example.com", "bad\r@example.com", "e@example.com"]
+        for offset, email in enumerate(emails, start=1):
+            add_user(db, BASE_USER_ID + offset, email=email)
+        created = create_campaign(db, "story_ready", {"title": "토끼"})
+        created.cursor_user_id = BASE_USER_ID
+        db.commit()
+        yield created.id
+    finally:
+        db.close()
+
+
+def make_worker(port: int, chunk_size: int = 2) -> CampaignWorker:
+    pool = SMTPConnectionPool(size=2, host="127.0.0.1", port=port, security="none", username=None, password=None, timeout=5)
+    return CampaignWorker(pool=pool, rate=0, chunk_size=chunk_size)
+
+
+def load(campaign_id: int) -> EmailCampaign:
+    db = SessionLocal()
+    try:
+        return db.get(EmailCampaign, campaign_id)
+    finally:
+        db.close()
+
+
+def received(handler):
+    return sorted(address for recipients, _ in handler.messages for address in recipients)
+
+
+def record_chunks(worker, after=None):
+    """묶음마다 저장한 진행 위치 기록 (after 는 첫 묶음 저장 직전에 한 번 실행)"""
+    cursors = []
+    original = worker._record_chunk
+
+    def wrapper(campaign_id, cursor, sent, failures):
+        if not cursors and after:
+            after(campaign_id)
+        cursors.append(cursor)
+        return original(campaign_id, cursor, sent, failures)
+
+    worker._record_chunk = wrapper
+    return cursors
+
+
+def test_campaign_is_sent_in_chunks(campaign, smtp_server):
+    controller, handler = smtp_server
+    worker = make_worker(controller.port)
+    cursors = record_chunks(worker)
+    assert worker._claim() == campaign
+    worker.run_campaign(campaign)
+
+    assert cursors == [BASE_USER_ID + 2, BASE_USER_ID + 4, BASE_USER_ID + 5]
+    assert received(handler) == ["a@example.com", "b@example.com", "e@example.com"]
+    # 잘못된 주소만 있는 묶음도 SMTP 장애가 아니라 실패로 기록하고 다음 묶음으로 진행
+    result = load(campaign)
+    assert (result.status, result.sent, result.failed) == ("done", 3, 2)
+    assert result.cursor_user_id == BASE_USER_ID + 5
+    db = SessionLocal()
+    try:
+        failed_ids = {row.user_id for row in db.query(EmailCampaignFailure).filter_by(campaign_id=campaign)}
+    finally:
+        db.close()
+    assert failed_ids == {BASE_USER_ID + 3, BASE_USER_ID + 4}
+
+
+def test_stopped_campaign_resumes_from_cursor(campaign, smtp_server):
+    controller, handler = smtp_server
+    first = make_worker(controller.port)
+    # 첫 묶음 저장 직후 서버 종료
+    record_chunks(first, after=lambda campaign_id: first._stop_event.set())
+    first._claim()
+    first.run_campaign(campaign)
+    result = load(campaign)
+    assert (result.status, result.cursor_user_id) == ("pending", BASE_USER_ID + 2)
+    assert received(handler) == ["a@example.com", "b@example.com"]
+
+    second = make_worker(controller.port)
+    assert second._claim() == campaign
+    second.run_campaign(campaign)
+    # 이미 보낸 사용자에게 다시 보내지 않음
+    assert received(handler) == ["a@example.com", "b@example.com", "e@example.com"]
+    result = load(campaign)
+    assert (result.status, result.sent, result.failed) == ("done", 3, 2)
+
+
+def test_cancel_stops_after_current_chunk(campaign, smtp_server):
+    controller, handler = smtp_server
+    worker = make_worker(controller.port)
+
+    def cancel(campaign_id):
+        db = SessionLocal()
+        try:
+            db.execute(update(EmailCampaign).where(EmailCampaign.id == campaign_id).values(status="cancelled"))
+            db.commit()
+        finally:
+            db.close()
+
+    cursors = record_chunks(worker, after=cancel)
+    worker._claim()
+    worker.run_campaign(campaign)
+
+    assert cursors == [BASE_USER_ID + 2]
+    assert received(handler) == ["a@example.com", "b@example.com"]
+    # 취소되기 전에 보낸 만큼은 기록
+    result = load(campaign)
+    assert (result.status, result.sent, result.cursor_user_id) == ("cancelled", 2, BASE_USER_ID + 2)
+
+
+def test_smtp_outage_backs_off_then_resumes(campaign, smtp_server, unused_port, monkeypatch):
+    controller, handler = smtp_server
+    monkeypatch.setattr(campaigns.random, "uniform", lambda low, high: 1.0)
+    worker = make_worker(unused_port)
+    delays = []
+
+    def wait(delay):
+        delays.append(delay)
+        # 두 번째 대기 후 SMTP 서버 복구
+        if len(delays) == 2:
+            worker.pool.port = controller.port
+        return False
+
+    monkeypatch.setattr(worker._stop_event, "wait", wait)
+    worker._claim()
+    worker.run_campaign(campaign)
+
+    # 연결 오류 동안 진행 위치를 유지한 채 지수적으로 대기
+    assert delays == [campaigns.CAMPAIGN_OUTAGE_BACKOFF, campaigns.CAMPAIGN_OUTAGE_BACKOFF * 2]
+    assert received(handler) == ["a@example.com", "b@example.com", "e@example.com"]
+    result = load(campaign)
+    assert (result.status, result.sent, result.failed) == ("done", 3, 2)
+
+
+def test_campaign_fails_after_max_outages(campaign, unused_port, monkeypatch):
+    monkeypatch.setattr(campaigns, "CAMPAIGN_MAX_OUTAGES", 2)
+    worker = make_worker(unused_port)
+    monkeypatch.setattr(worker._stop_event, "wait", lambda delay: False)
+    worker._claim()
+    worker.run_campaign(campaign)
+
+    result = load(campaign)
+    assert (result.status, result.sent, result.cursor_user_id) == ("failed", 0, BASE_USER_ID)
+    assert result.last_error
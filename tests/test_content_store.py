@@ -0,0 +1,87 @@
+# 동화 본문 저장소 테스트 (중복 제거, 참조 없는 본문 삭제)
+from models_dir.database import Base, engine, SessionLocal
+from models_dir.models import Story, StoryContent
+from controllers.content_store import get_or_create_content, delete_unreferenced_contents
+
+
+
+def _add_story(db, user_id, text):
+    body = get_or_create_content(db, text)
+    story = Story(user_id=user_id, theme="숲", voice="alloy", voice_content="v.mp3", image="", bw_image="", content_hash=body.hash)
+    db.add(story)
+    db.flush()
+    return story
+
+
+def test_shared_body_is_kept_until_last_story_is_gone(add_user):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        add_user(db, 700)
+        first = _add_story(db, 700, "함께 쓰는 본문")
+        second = _add_story(db, 700, "함께 쓰는 본문")
+        assert first.content_hash == second.content_hash
+        db.commit()
+
+        db.delete(first)
+        db.flush()
+        assert delete_unreferenced_contents(db, [first.content_hash]) == 0
+        db.delete(second)
+        db.flush()
+        assert delete_unreferenced_contents(db, [second.content_hash]) == 1
+        db.commit()
+        assert db.get(StoryContent, first.content_hash) is None
+    finally:
+        db.close()
+
+
+def test_withdrawn_user_story_bodies_are_deleted(make_client, add_user, monkeypatch):
+    from controllers import users_controller
+
+    # 응답 후 전역 파일 수집기가 돌지 않도록 (다른 테스트의 정리 대상까지 먼저 지울 수 있음)
+    monkeypatch.setattr(users_controller, "purge_released_assets", lambda digests: None)
+
+    db = SessionLocal()
+    try:
+        add_user(db, 701)
+        add_user(db, 702)
+        private = _add_story(db, 701, "탈퇴한 사용자만 쓴 본문").content_hash
+        shared = _add_story(db, 701, "두 사용자가 같이 쓴 본문").content_hash
+        _add_story(db, 702, "두 사용자가 같이 쓴 본문")
+        db.commit()
+    finally:
+        db.close()
+
+    client = make_client(users_controller.router)
+    client.get("/test/login/701")
+    assert client.delete("/users/701", params={"id": 701}).status_code == 200
+
+    db = SessionLocal()
+    try:
+        # 탈퇴와 같은 트랜잭션에서 본문도 지워지고, 다른 사용자가 쓰는 본문은 남음
+        assert db.get(StoryContent, private) is None
+        assert db.get(StoryContent, shared) is not None
+    finally:
+        db.close()
+
+
+def test_asset_gc_sweeps_leftover_bodies():
+    from controllers.asset_gc import AssetGarbageCollector
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        leftover = get_or_create_content(db, "예전 버전에서 남은 본문").hash
+        db.commit()
+    finally:
+        db.close()
+
+    collector = AssetGarbageCollector(targets=[], batch_pause=0)
+    assert collector.collect(dry_run=True)["orphan_contents"] >= 1
+    assert collector.collect()["orphan_contents"] >= 1
+
+    db = SessionLocal()
+    try:
+        assert db.get(StoryContent, leftover) is None
+    finally:
+        db.close()
@@ -0,0 +1,59 @@
+# 회원 탈퇴 테스트 (테이블별 일괄 삭제, 이미지 참조 해제)
+from datetime import date
+
+from models_dir.database import SessionLocal
+from models_dir.models import User, Story, Article, Like, Baby, Blob
+from controllers import asset_gc
+from controllers.blob_store import BlobStore
+
+
+def test_delete_user_removes_rows_and_releases_images_in_one_transaction(make_client, add_user, tmp_path, monkeypatch):
+    from controllers import users_controller
+
+    store = BlobStore(str(tmp_path / "blobs"))
+    monkeypatch.setattr(asset_gc, "blob_store", store)
+    # 응답 후 파일 정리가 실행되지 않아도(프로세스 종료 등) 참조 수는 이미 줄어 있어야 함
+    monkeypatch.setattr(users_controller, "purge_released_assets", lambda digests: None)
+
+    db = SessionLocal()
+    try:
+        add_user(db, 801)
+        add_user(db, 802)
+        image = store.put_bytes(b"colour 801", ".png", db)
+        bw_image = store.put_bytes(b"black and white 801", ".png", db)
+        for path in (image, bw_image):
+            store.incref(path, db)
+        db.add_all([
+            Story(user_id=801, theme="숲", voice="alloy", voice_content="v.mp3", image=image, bw_image=bw_image),
+            Story(user_id=801, theme="바다", voice="alloy", voice_content="v.mp3", image="", bw_image=""),
+            Baby(user_id=801, baby_name="별", baby_gender="여", baby_bday=date(2024, 1, 1)),
+        ])
+        own_article = Article(user_id=801, image="a.png")
+        other_article = Article(user_id=802, image="b.png")
+        db.add_all([own_article, other_article])
+        db.flush()
+        # 탈퇴 사용자의 좋아요, 탈퇴 사용자 글에 달린 다른 사용자의 좋아요
+        db.add_all([Like(user_id=801, article_id=other_article.id), Like(user_id=802, article_id=own_article.id)])
+        db.commit()
+        image_digest, bw_digest = store.digest_from_path(image), store.digest_from_path(bw_image)
+        other_article_id = other_article.id
+    finally:
+        db.close()
+
+    client = make_client(users_controller.router)
+    client.get("/test/login/801")
+    assert client.delete("/users/801", params={"id": 801}).status_code == 200
+
+    db = SessionLocal()
+    try:
+        assert db.get(User, 801) is None
+        assert db.query(Story).filter(Story.user_id == 801).count() == 0
+        assert db.query(Baby).filter(Baby.user_id == 801).count() == 0
+        assert db.query(Article).filter(Article.user_id == 801).count() == 0
+        assert db.query(Like).filter(Like.user_id == 801).count() == 0
+        assert db.query(Like).filter(Like.user_id == 802).count() == 0
+        assert db.get(Article, other_article_id) is not None
+        assert db.get(Blob, image_digest).refcount == 0
+        assert db.get(Blob, bw_digest).refcount == 0
+    finally:
+        db.close()
@@ -0,0 +1,154 @@
+# 이메일 발송 대기열 테스트 (conftest 의 aiosmtpd 로컬 SMTP 서버로 실제 발송)
+from datetime import datetime, timedelta
+import pytest
+from cryptography.fernet import Fernet
+
+from models_dir.database import Base, engine, SessionLocal
+from models_dir.models import EmailOutbox
+from emails import outbox
+from emails.email_class import EmailServiceFindId, EmailServiceSendTempPW
+from emails.outbox import BodyCipher, EmailOutboxWorker, SMTPConnectionPool, enqueue_email
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    session.query(EmailOutbox).delete()
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def body_key(monkeypatch):
+    """모든 프로세스가 공유하는 EMAIL_BODY_KEY 설정"""
+    key = Fernet.generate_key()
+    monkeypatch.setattr(outbox, "body_cipher", BodyCipher(key))
+    return key
+
+
+def make_worker(port: int) -> EmailOutboxWorker:
+    pool = SMTPConnectionPool(size=1, host="127.0.0.1", port=port, security="none", username=None, password=None, timeout=5)
+    return EmailOutboxWorker(pool=pool, workers=1, batch_size=10)
+
+
+def enqueue(db, recipient: str, template=None, **kwargs) -> int:
+    email = enqueue_email(db, recipient, template or EmailServiceFindId(), **kwargs or {"username": "토끼"})
+    db.commit()
+    return email.id
+
+
+def reload(db, email_id: int) -> EmailOutbox:
+    db.expire_all()
+    return db.get(EmailOutbox, email_id)
+
+
+def test_batch_is_sent_over_one_connection(db, smtp_server):
+    controller, handler = smtp_server
+    worker = make_worker(controller.port)
+    ids = [enqueue(db, f"reader{index}@example.com") for index in range(3)]
+
+    assert worker.process_batch() == 3
+    assert len(handler.messages) == 3
+    assert worker.pool.stats["connects"] == 1
+    for email_id in ids:
+        email = reload(db, email_id)
+        assert email.status == "sent" and email.attempts == 1
+        assert email.sent_at is not None and email.body is None
+
+
+def test_new_mail_is_claimable_right_away(db, smtp_server):
+    controller, _ = smtp_server
+    email_id = enqueue(db, "reader@example.com")
+    # DB 기본값(UTC)이 아니라 워커와 같은 시계로 기록
+    assert abs((reload(db, email_id).next_attempt_at - datetime.now()).total_seconds()) < 5
+    assert make_worker(controller.port).process_batch() == 1
+
+
+def test_refused_recipient_fails_without_retry(db, smtp_server):
+    controller, handler = smtp_server
+    worker = make_worker(controller.port)
+    refused = enqueue(db, "reject@example.com")
+    accepted = enqueue(db, "reader@example.com")
+
+    worker.process_batch()
+    assert reload(db, refused).status == "failed"
+    assert "550" in reload(db, refused).last_error
+    assert reload(db, accepted).status == "sent"
+    assert len(handler.messages) == 1
+
+
+def test_connection_failure_backs_off_then_sends(db, smtp_server, unused_port, monkeypatch):
+    controller, handler = smtp_server
+    monkeypatch.setattr(outbox, "EMAIL_BACKOFF_BASE", 60)
+    email_id = enqueue(db, "reader@example.com")
+
+    make_worker(unused_port).process_batch()  # 아무도 듣지 않는 포트
+    email = reload(db, email_id)
+    assert email.status == "pending" and email.attempts == 1 and email.last_error
+    delay = (email.next_attempt_at - datetime.now()).total_seconds()
+    assert 60 * 0.8 - 5 <= delay <= 60 * 1.2
+    # 대기 시간 전에는 다시 가져가지 않음
+    worker = make_worker(controller.port)
+    assert worker.process_batch() == 0
+
+    email.next_attempt_at = datetime.now() - timedelta(seconds=1)
+    db.commit()
+    assert worker.process_batch() == 1
+    email = reload(db, email_id)
+    assert email.status == "sent" and email.attempts == 2
+    assert len(handler.messages) == 1
+
+
+def test_gives_up_after_max_attempts(db, unused_port, monkeypatch):
+    monkeypatch.setattr(outbox, "EMAIL_MAX_ATTEMPTS", 2)
+    email_id = enqueue(db, "reader@example.com")
+    worker = make_worker(unused_port)
+    for _ in range(2):
+        email = reload(db, email_id)
+        email.next_attempt_at = datetime.now() - timedelta(seconds=1)
+        db.commit()
+        worker.process_batch()
+    email = reload(db, email_id)
+    assert email.status == "failed" and email.attempts == 2 and email.body is None
+
+
+def test_temp_password_is_encrypted_at_rest(db, smtp_server, body_key, monkeypatch):
+    controller, handler = smtp_server
+    email_id = enqueue(db, "reader@example.com", EmailServiceSendTempPW(), username="토끼", temp_password="Secret-42!")
+    assert "Secret-42!" not in reload(db, email_id).body
+
+    # 다른 프로세스의 워커가 가져가도 같은 키로 복호화
+    monkeypatch.setattr(outbox, "body_cipher", BodyCipher(body_key))
+
+    make_worker(controller.port).process_batch()
+    assert reload(db, email_id).status == "sent"
+    _, content = handler.messages[0]
+    import email as email_lib
+    message = email_lib.message_from_bytes(content)
+    html = message.get_payload()[0].get_payload(decode=True).decode("utf-8")
+    assert "Secret-42!" in html
+
+
+def test_undecryptable_body_fails_permanently(db, smtp_server, body_key):
+    controller, _ = smtp_server
+    email_id = enqueue(db, "reader@example.com", EmailServiceSendTempPW(), username="토끼", temp_password="Secret-42!")
+    email = reload(db, email_id)
+    email.body = outbox.ENCRYPTED_PREFIX + "not-a-valid-token"
+    db.commit()
+
+    make_worker(controller.port).process_batch()
+    email = reload(db, email_id)
+    assert email.status == "failed" and email.attempts == 1 and email.body is None
+
+
+def test_temp_password_needs_shared_key(db, monkeypatch):
+    monkeypatch.setattr(outbox, "body_cipher", BodyCipher(None))
+    # 시작 시 확인에서 실패하고, 등록도 거부되어 호출한 트랜잭션(비밀번호 변경)이 롤백됨
+    with pytest.raises(RuntimeError):
+        outbox.body_cipher.ensure_configured()
+    with pytest.raises(RuntimeError):
+        enqueue(db, "reader@example.com", EmailServiceSendTempPW(), username="토끼", temp_password="Secret-42!")
+    db.rollback()
+    assert db.query(EmailOutbox).count() == 0
@@ -0,0 +1,91 @@
+# 목록 응답 ETag / 304 테스트
+import pytest
+from fastapi import APIRouter, Request, Response
+
+from models_dir.database import SessionLocal
+from controllers.etag import make_etag, etag_matches, not_modified, set_etag
+from controllers.user_stats import bump_version, get_user_version
+
+
+def test_etag_changes_with_version_and_parameters():
+    etag = make_etag(810, 1, "stories", 9, None)
+    assert etag.startswith('W/"u810-v1-') and etag == make_etag(810, 1, "stories", 9, None)
+    assert etag != make_etag(810, 2, "stories", 9, None)
+    assert etag != make_etag(810, 1, "stories", 9, "cursor")
+    assert etag != make_etag(811, 1, "stories", 9, None)
+
+
+def _versioned_router():
+    """ai_server 목록 라우트와 같은 방식으로 ETag 를 붙이는 라우트"""
+    router = APIRouter()
+
+    @router.get("/versioned/{user_id}")
+    def versioned(user_id: int, request: Request, response: Response):
+        db = SessionLocal()
+        try:
+            etag = make_etag(user_id, get_user_version(db, user_id), "versioned")
+        finally:
+            db.close()
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+        return {"user_id": user_id}
+
+    return router
+
+
+def test_version_bump_turns_304_back_into_200(make_client, add_user):
+    db = SessionLocal()
+    try:
+        add_user(db, 810)
+        db.commit()
+    finally:
+        db.close()
+
+    client = make_client(_versioned_router())
+    response = client.get("/versioned/810")
+    assert response.status_code == 200 and response.json() == {"user_id": 810}
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "private, no-cache"
+
+    # 같은 버전이면 본문 없이 304, weak/strong 표기나 여러 태그도 허용
+    for header in (etag, etag.removeprefix("W/"), f'"other", {etag}'):
+        response = client.get("/versioned/810", headers={"If-None-Match": header})
+        assert response.status_code == 304 and response.content == b""
+        assert response.headers["etag"] == etag
+
+    # 데이터가 바뀌어 버전이 오르면 예전 ETag 로는 새 본문을 받음
+    db = SessionLocal()
+    try:
+        bump_version(db, 810)
+        db.commit()
+    finally:
+        db.close()
+    response = client.get("/versioned/810", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["etag"] != etag
+
+
+def test_baby_list_answers_304_until_babies_change(make_client, add_user):
+    pytest.importorskip("streamlit")
+    from controllers import babies_controller
+
+    db = SessionLocal()
+    try:
+        add_user(db, 811)
+        db.commit()
+    finally:
+        db.close()
+
+    client = make_client(babies_controller.router)
+    response = client.get("/babies/list/811")
+    assert response.status_code == 200 and response.json() == []
+    etag = response.headers["etag"]
+    assert client.get("/babies/list/811", headers={"If-None-Match": etag}).status_code == 304
+
+    # 아이를 추가하면 라우트가 버전을 올려 예전 ETag 가 무효가 됨
+    created = client.post("/babies/create_baby", json={"user_id": 811, "baby_name": "첫째", "baby_gender": "여",
+                                                       "baby_bday": "2024-01-01"})
+    assert created.status_code == 200
+    response = client.get("/babies/list/811", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert [baby["baby_name"] for baby in response.json()] == ["첫째"]
@@ -0,0 +1,120 @@
+# 사용자/아이 정보 읽기 캐시 테스트
+import asyncio
+import time
+from datetime import date
+
+import pytest
+
+from models_dir.database import SessionLocal, AsyncSessionLocal
+from models_dir.models import User, Baby
+from controllers import identity_cache as identity_cache_module, users_controller
+from controllers.cache import Config
+from controllers.identity_cache import IdentityCache, USER_PROFILE, BABY_LIST, get_user_profile, get_baby_list, get_baby_list_async
+from controllers.rate_limit import RateLimiter, MemoryRateLimitBackend
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = IdentityCache()
+    monkeypatch.setattr(identity_cache_module, "identity_cache", cache)
+    monkeypatch.setattr(users_controller, "identity_cache", cache)
+    return cache
+
+
+def _rename(user_id, nickname):
+    db = SessionLocal()
+    try:
+        db.get(User, user_id).nickname = nickname
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_profile_is_read_through_until_invalidated(cache, add_user):
+    db = SessionLocal()
+    try:
+        assert get_user_profile(db, 800) is None
+        add_user(db, 800, nickname="토끼800")
+        db.commit()
+        # 없는 사용자는 캐시하지 않으므로 가입 직후에도 조회됨
+        profile = get_user_profile(db, 800)
+        assert profile["nickname"] == "토끼800" and "hashed_password" not in profile
+
+        _rename(800, "거북이800")
+        assert get_user_profile(db, 800)["nickname"] == "토끼800"
+        cache.invalidate_user(800)
+        assert get_user_profile(db, 800)["nickname"] == "거북이800"
+    finally:
+        db.close()
+
+
+def test_entries_expire_after_ttl(monkeypatch, add_user):
+    monkeypatch.setattr(Config, "USER_CACHE_TTL", 0.05)
+    cache = IdentityCache()
+    monkeypatch.setattr(identity_cache_module, "identity_cache", cache)
+    db = SessionLocal()
+    try:
+        add_user(db, 801, nickname="토끼801")
+        db.commit()
+        assert get_user_profile(db, 801)["nickname"] == "토끼801"
+        _rename(801, "거북이801")
+        time.sleep(0.1)
+        # 다른 프로세스의 변경도 TTL 이 지나면 반영
+        assert get_user_profile(db, 801)["nickname"] == "거북이801"
+    finally:
+        db.close()
+
+
+def test_baby_list_is_keyed_by_version(cache, add_user):
+    db = SessionLocal()
+    try:
+        add_user(db, 802)
+        db.add(Baby(user_id=802, baby_name="첫째", baby_gender="여", baby_bday=date(2024, 1, 1)))
+        db.commit()
+        assert [baby["baby_name"] for baby in get_baby_list(db, 802)] == ["첫째"]
+        db.add(Baby(user_id=802, baby_name="둘째", baby_gender="남", baby_bday=date(2024, 1, 1)))
+        db.commit()
+    finally:
+        db.close()
+
+    async def load(version):
+        async with AsyncSessionLocal() as session:
+            return [baby["baby_name"] for baby in await get_baby_list_async(session, 802, version)]
+
+    async def scenario():
+        try:
+            # 버전이 다르면 캐시된 목록을 쓰지 않고 다시 조회한 뒤 그 버전으로 저장
+            assert await load(1) == ["첫째", "둘째"]
+            assert cache.get(BABY_LIST, 802)[0] == 1
+            db = SessionLocal()
+            try:
+                db.query(Baby).filter_by(user_id=802, baby_name="둘째").delete()
+                db.commit()
+            finally:
+                db.close()
+            assert await load(1) == ["첫째", "둘째"]
+            assert await load(2) == ["첫째"]
+        finally:
+            # 풀의 aiosqlite 연결은 이 이벤트 루프에 묶여 있으므로 정리
+            await AsyncSessionLocal.kw["bind"].dispose()
+
+    asyncio.run(scenario())
+
+
+def test_password_change_invalidates_profile(cache, make_client, add_user, fast_hasher, monkeypatch):
+    monkeypatch.setattr(users_controller, "rate_limiter", RateLimiter(backend=MemoryRateLimitBackend()))
+    password, new_password = "Rabbit-Moon-42", "Turtle-Star-43"
+    db = SessionLocal()
+    try:
+        add_user(db, 803, username="cachedrabbit", hashed_password=asyncio.run(fast_hasher.hash(password)))
+        db.commit()
+        get_user_profile(db, 803)
+    finally:
+        db.close()
+    assert cache.get(USER_PROFILE, 803) is not None
+
+    client = make_client(users_controller.router)
+    response = client.put("/change_pw", json={"username": "cachedrabbit", "current_password": password,
+                                              "new_password": new_password, "new_password_confirm": new_password})
+    assert response.status_code == 200
+    assert cache.get(USER_PROFILE, 803) is None
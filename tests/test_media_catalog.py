@@ -0,0 +1,52 @@
+# 자장가 목록 카탈로그 테스트
+import os
+import pytest
+
+# 음악/영상 검색 모듈이 streamlit, openai, langchain 을 함께 import 함
+pytest.importorskip("streamlit")
+pytest.importorskip("openai")
+pytest.importorskip("langchain_community")
+os.environ.setdefault("JAMENDO_API_KEY", "test")
+
+from controllers.cache import Config
+from controllers.media_catalog import MediaCatalog, MUSIC
+
+
+def make_catalog(calls, results=None, extra_rate="2/3600"):
+    def fetch(keyword):
+        calls.append(keyword)
+        return results if results is not None else [{"name": keyword}]
+    return MediaCatalog(fetchers={MUSIC: fetch}, snapshot_path=None, extra_rate=extra_rate)
+
+
+def test_theme_served_from_memory():
+    calls = []
+    catalog = make_catalog(calls)
+    assert catalog.get(MUSIC, "달빛") == [{"name": "moon"}]
+    assert catalog.get(MUSIC, "moon") == [{"name": "moon"}]
+    assert calls == ["moon"]
+
+
+def test_extra_keywords_are_rate_limited():
+    calls = []
+    catalog = make_catalog(calls)
+    assert catalog.get(MUSIC, "rain") == [{"name": "rain"}]
+    assert catalog.get(MUSIC, "ocean") == [{"name": "ocean"}]
+    # 한도를 넘은 검색어는 외부 API 를 호출하지 않고 빈 목록 반환
+    assert catalog.get(MUSIC, "forest") == []
+    assert calls == ["rain", "ocean"]
+    assert catalog.stats["extra_rate_limited"] == 1
+    # 이미 받아 둔 검색어는 한도와 무관하게 제공, 테마는 계속 외부 호출 가능
+    assert catalog.get(MUSIC, "rain") == [{"name": "rain"}]
+    assert catalog.get(MUSIC, "piano") == [{"name": "piano"}]
+
+
+def test_evicted_extra_keywords_forget_failures(monkeypatch):
+    monkeypatch.setattr(Config, "MEDIA_CATALOG_EXTRA_SIZE", 2)
+    calls = []
+    catalog = make_catalog(calls, results=[], extra_rate="100/60")
+    for keyword in ("a", "b", "c", "d"):
+        assert catalog.get(MUSIC, keyword) == []
+    # 실패 기록도 최근 검색어 수만큼만 유지
+    assert set(catalog._failed_at) == {(MUSIC, "c"), (MUSIC, "d")}
+    assert set(catalog._entries) <= {(MUSIC, "c"), (MUSIC, "d")}
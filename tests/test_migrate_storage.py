@@ -0,0 +1,35 @@
+# 저장소 이전 도구 테스트
+from models_dir.database import SessionLocal
+from models_dir.models import Story
+from controllers.user_stats import get_user_version
+from migrate_storage import apply_updates
+
+
+def test_apply_updates_bumps_owner_version(add_user):
+    db = SessionLocal()
+    try:
+        add_user(db, 750)
+        story = Story(user_id=750, theme="숲", voice="alloy", voice_content="v.mp3",
+                      image="https://old.example.com/a.png", bw_image="")
+        db.add(story)
+        db.commit()
+        story_id = story.id
+        version = get_user_version(db, 750)
+    finally:
+        db.close()
+
+    results = [
+        (story_id, "image", "https://old.example.com/a.png", "https://new.example.com/a.png", True, None),
+        # 실패한 항목과 경로가 이미 바뀐 항목은 교체하지 않음
+        (story_id, "bw_image", "https://old.example.com/b.png", None, False, "timeout"),
+        (story_id, "bw_image", "https://old.example.com/c.png", "https://new.example.com/c.png", True, None),
+    ]
+    assert apply_updates(results) == 1
+
+    db = SessionLocal()
+    try:
+        assert db.get(Story, story_id).image == "https://new.example.com/a.png"
+        # 갤러리 응답의 이미지 URL 이 바뀌었으므로 ETag 도 바뀌어야 함
+        assert get_user_version(db, 750) == version + 1
+    finally:
+        db.close()
@@ -0,0 +1,66 @@
+# 비밀번호 해시 서비스 테스트 (설정이 바뀐 해시는 로그인 시 다시 저장)
+import asyncio
+
+import pytest
+
+from models_dir.database import SessionLocal
+from models_dir.models import User
+from controllers import password_hasher, users_controller
+from controllers.password_hasher import PasswordHasher
+from controllers.rate_limit import RateLimiter, MemoryRateLimitBackend
+
+PASSWORD = "Rabbit-Moon-42"
+
+
+def _stored_hash(user_id):
+    db = SessionLocal()
+    try:
+        return db.get(User, user_id).hashed_password
+    finally:
+        db.close()
+
+
+def test_hash_and_verify_in_worker_process():
+    hasher = PasswordHasher(workers=1, executor_type="process")
+    try:
+        hashed = asyncio.run(hasher.hash(PASSWORD))
+        assert hashed != PASSWORD
+        assert asyncio.run(hasher.verify(PASSWORD, hashed))
+        assert not asyncio.run(hasher.verify("wrong", hashed))
+        # 알 수 없는 형식은 예외 대신 인증 실패
+        assert asyncio.run(hasher.verify_and_update(PASSWORD, "not-a-hash")) == (False, None)
+    finally:
+        hasher.shutdown()
+
+
+def test_login_rehashes_outdated_hash(make_client, add_user, fast_hasher, monkeypatch):
+    monkeypatch.setattr(users_controller, "rate_limiter", RateLimiter(backend=MemoryRateLimitBackend()))
+    old_hash = asyncio.run(fast_hasher.hash(PASSWORD))
+    assert old_hash.startswith("$2b$04$")
+    db = SessionLocal()
+    try:
+        add_user(db, 790, username="rehash", hashed_password=old_hash)
+        db.commit()
+    finally:
+        db.close()
+
+    # work factor 를 올리면 다음 로그인 때 새 설정으로 다시 저장
+    monkeypatch.setattr(password_hasher, "PASSWORD_BCRYPT_ROUNDS", 5)
+    monkeypatch.setattr(password_hasher, "_worker_context", None)
+    client = make_client(users_controller.router)
+    assert client.post("/login", json={"username": "rehash", "password": PASSWORD}).status_code == 200
+    new_hash = _stored_hash(790)
+    assert new_hash.startswith("$2b$05$")
+
+    # 설정이 같으면 그대로, 틀린 비밀번호로는 갱신하지 않음
+    assert client.post("/login", json={"username": "rehash", "password": PASSWORD}).status_code == 200
+    assert _stored_hash(790) == new_hash
+    monkeypatch.setattr(password_hasher, "PASSWORD_SCHEME", "argon2")
+    monkeypatch.setattr(password_hasher, "_worker_context", None)
+    assert client.post("/login", json={"username": "rehash", "password": "wrong"}).status_code == 401
+    assert _stored_hash(790) == new_hash
+
+    # 기본 방식을 바꾸면 예전 방식 해시로 로그인한 뒤 새 방식으로 교체
+    pytest.importorskip("argon2")
+    assert client.post("/login", json={"username": "rehash", "password": PASSWORD}).status_code == 200
+    assert _stored_hash(790).startswith("$argon2")
@@ -0,0 +1,19 @@
+# 경로별 SQL 통계 테스트
+from models_dir import query_monitor
+from models_dir.query_monitor import QueryStats, UNMATCHED_ROUTE
+
+
+def test_unmatched_requests_share_one_route(monkeypatch):
+    monkeypatch.setattr(query_monitor, "SQL_MAX_ROUTES", 2)
+    stats = QueryStats()
+    # 라우트가 없는 요청(404, 스캐너)은 URL 이 달라도 하나로 집계
+    for path in ("/wp-login.php", "/.env", "/admin/config.php"):
+        token = stats.start_request(path)
+        assert stats.finish_request(token, None).route == UNMATCHED_ROUTE
+
+    token = stats.start_request(UNMATCHED_ROUTE)
+    stats.finish_request(token, "/babies/delete/{baby_id}")
+
+    routes = stats.snapshot()["routes"]
+    assert set(routes) == {UNMATCHED_ROUTE, "/babies/delete/{baby_id}"}
+    assert routes[UNMATCHED_ROUTE]["requests"] == 3
@@ -0,0 +1,82 @@
+# 인증 요청 제한 테스트 (토큰 버킷, 429 + Retry-After)
+import pytest
+
+from controllers import rate_limit, users_controller
+from controllers.rate_limit import MemoryRateLimitBackend, RedisRateLimitBackend, RateLimitBackend, RateLimiter, parse_rate
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_parse_rate():
+    assert parse_rate("5/300") == (5, 300.0)
+    assert parse_rate("20") == (20, 60.0)
+
+
+def test_bucket_refills_over_time(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock.monotonic)
+    backend = MemoryRateLimitBackend()
+    assert [backend.take("login:ip:1", 3, 60)[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = backend.take("login:ip:1", 3, 60)
+    assert not allowed and retry_after == pytest.approx(20)
+    # 20초마다 토큰 하나 충전, 다른 키는 따로 계산
+    clock.now += 20
+    assert backend.take("login:ip:1", 3, 60)[0]
+    assert not backend.take("login:ip:1", 3, 60)[0]
+    assert backend.take("login:ip:2", 3, 60)[0]
+
+
+def test_memory_backend_keeps_recent_buckets_only():
+    backend = MemoryRateLimitBackend(max_keys=2)
+    for key in ("a", "b", "c"):
+        backend.take(key, 1, 60)
+    assert list(backend._buckets) == ["b", "c"]
+
+
+def test_redis_backend_shares_limits():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    first = RedisRateLimitBackend(client=fakeredis.FakeRedis(server=server))
+    second = RedisRateLimitBackend(client=fakeredis.FakeRedis(server=server))
+    assert first.take("login:account:rabbit", 2, 60)[0]
+    assert second.take("login:account:rabbit", 2, 60)[0]
+    allowed, retry_after = first.take("login:account:rabbit", 2, 60)
+    assert not allowed and 0 < retry_after <= 30
+
+
+@pytest.fixture
+def client(make_client, monkeypatch):
+    rules = {"login": [("ip", (5, 60)), ("account", (2, 300))]}
+    limiter = RateLimiter(backend=MemoryRateLimitBackend(), rules=rules, enabled=True)
+    monkeypatch.setattr(users_controller, "rate_limiter", limiter)
+    return make_client(users_controller.router), limiter
+
+
+def test_login_is_limited_per_account_then_per_ip(client):
+    client, limiter = client
+    login = lambda username: client.post("/login", json={"username": username, "password": "wrong"})
+    # 없는 사용자도 DB 조회 전에 횟수를 셈
+    assert [login("Nobody").status_code for _ in range(2)] == [404, 404]
+    response = login("nobody")
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) == 150
+    # 다른 계정은 IP 한도까지 허용
+    assert [login(f"other{index}").status_code for index in range(3)] == [404, 404, 429]
+    assert limiter.snapshot() == {"login:account": 1, "login:ip": 1}
+
+
+def test_limiter_fails_open_when_backend_is_down(client):
+    client, limiter = client
+
+    class BrokenBackend(RateLimitBackend):
+        def take(self, key, capacity, period):
+            raise ConnectionError("redis down")
+
+    limiter._backend = BrokenBackend()
+    assert all(client.post("/login", json={"username": "nobody", "password": "x"}).status_code == 404 for _ in range(5))
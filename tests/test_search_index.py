@@ -0,0 +1,66 @@
+# 동화 전문 검색 인덱스 테스트 (SQLite FTS5)
+import pytest
+
+from models_dir.database import SessionLocal
+from models_dir.search_index import tokenize, build_query, index_stories, remove_stories, remove_user_stories, search_story_ids
+
+
+def test_korean_words_are_split_into_bigrams():
+    assert tokenize("토끼가 달님을") == ["토끼", "끼가", "달님", "님을"]
+    # 한 글자 단어는 그대로, 영문/숫자는 소문자 단어 단위
+    assert tokenize("곰 Moon 42번") == ["곰", "moon", "42", "번"]
+    assert tokenize("!!") == [] and tokenize(None) == []
+
+
+def test_sqlite_query_joins_tokens_with_and():
+    db = SessionLocal()
+    try:
+        assert build_query(db, "토끼 토끼") == '"토끼"'
+        assert build_query(db, "숲속 곰") == '"숲속" AND "곰"*'
+        assert build_query(db, "...") == ""
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def indexed():
+    db = SessionLocal()
+    try:
+        index_stories(db, [
+            (9001, 780, "숲", "아기 토끼가 달님을 만났어요"),
+            (9002, 780, "바다", "거북이는 토끼와 경주를 했어요"),
+            (9003, 780, "토끼", "숲속 친구들 이야기"),
+            (9004, 781, "숲", "다른 아이의 토끼 이야기"),
+        ])
+        db.commit()
+        yield db
+        remove_user_stories(db, 780)
+        remove_user_stories(db, 781)
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_search_matches_words_with_particles(indexed):
+    # 조사가 붙은 "토끼가", "토끼와" 도 "토끼" 로 검색되고, 테마 일치가 먼저 옴
+    results = search_story_ids(indexed, 780, "토끼", limit=10)
+    assert results[0] == 9003 and set(results) == {9001, 9002, 9003}
+    assert search_story_ids(indexed, 780, "달님", limit=10) == [9001]
+    # 한 글자 검색어는 앞부분 일치
+    assert set(search_story_ids(indexed, 780, "달", limit=10)) == {9001}
+    assert search_story_ids(indexed, 780, "토끼 경주", limit=10) == [9002]
+    assert search_story_ids(indexed, 780, "호랑이", limit=10) == []
+    assert len(search_story_ids(indexed, 780, "토끼", limit=2)) == 2
+    assert len(search_story_ids(indexed, 780, "토끼", limit=2, offset=2)) == 1
+
+
+def test_search_is_scoped_to_user_and_follows_deletes(indexed):
+    assert search_story_ids(indexed, 781, "토끼", limit=10) == [9004]
+    remove_stories(indexed, [9001])
+    assert search_story_ids(indexed, 780, "달님", limit=10) == []
+    # 다시 색인하면 기존 항목을 교체
+    index_stories(indexed, [(9002, 780, "바다", "고래 이야기")])
+    assert search_story_ids(indexed, 780, "경주", limit=10) == []
+    assert search_story_ids(indexed, 780, "고래", limit=10) == [9002]
+    remove_user_stories(indexed, 780)
+    assert search_story_ids(indexed, 780, "숲속", limit=10) == []
@@ -0,0 +1,29 @@
+# S3 저장소 테스트 (moto 로 S3 대체)
+import hashlib
+
+import boto3
+from moto import mock_aws
+
+from controllers.storage_s3 import S3Storage
+
+
+@mock_aws
+def test_write_file_records_sha256_so_checksum_skips_download(tmp_path, monkeypatch):
+    client = boto3.client("s3", region_name="us-east-1")
+    client.create_bucket(Bucket="fairytale-test")
+    storage = S3Storage("fairytale-test", client=client, prefix="images")
+    source = tmp_path / "story.png"
+    source.write_bytes(b"story image bytes")
+
+    storage.write_file(str(source), "ab/cd/story.png")
+    head = client.head_object(Bucket="fairytale-test", Key="images/ab/cd/story.png")
+    assert head["ContentType"] == "image/png"
+
+    # 메타데이터가 있으면 객체를 내려받지 않고 체크섬을 돌려줌
+    def fail_read(key):
+        raise AssertionError("checksum 이 객체 전체를 내려받았습니다")
+
+    monkeypatch.setattr(storage, "read", fail_read)
+    expected = storage.checksum("ab/cd/story.png")
+    assert head["Metadata"]["sha256"] == expected
+    assert expected == hashlib.sha256(b"story image bytes").hexdigest()
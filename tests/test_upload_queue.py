@@ -0,0 +1,30 @@
+# S3 업로드 대기열 테스트
+from datetime import datetime
+
+from models_dir.database import Base, engine, SessionLocal
+from models_dir.models import Role, User, Story, UploadJob
+from controllers.upload_queue import UploadWorker, enqueue_story_uploads
+
+
+def test_new_upload_job_is_claimed_right_away(tmp_path):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        db.query(UploadJob).delete()
+        db.merge(Role(id=1, role_name="user"))
+        db.merge(User(id=900, username="upload", nickname="upload", email="upload@example.com", hashed_password="x"))
+        image = tmp_path / "story.png"
+        image.write_bytes(b"image")
+        story = Story(user_id=900, theme="숲", voice="alloy", voice_content="v.mp3", image=str(image), bw_image="")
+        db.add(story)
+        db.flush()
+        job, = enqueue_story_uploads(db, story)
+        db.commit()
+
+        # DB 기본값(UTC)이 아니라 워커와 같은 시계로 기록되어 바로 가져갈 수 있어야 함
+        assert abs((job.next_attempt_at - datetime.now()).total_seconds()) < 5
+        assert UploadWorker()._claim_jobs() == [job.id]
+        db.expire_all()
+        assert db.get(UploadJob, job.id).status == "running"
+    finally:
+        db.close()
@@ -0,0 +1,83 @@
+# 사용자별 동화 통계 테스트
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from models_dir.database import SessionLocal
+from models_dir.models import Story
+from models_dir.migrations import m0004_user_stats
+from controllers.user_stats import (
+    record_story_created, record_stories_deleted, reset_user_stats, bump_version, get_user_stats, get_user_version,
+)
+
+
+def _create_story(db, user_id, theme, voice, size):
+    story = Story(user_id=user_id, theme=theme, voice=voice, voice_content="v.mp3", image="", bw_image="")
+    db.add(story)
+    record_story_created(db, user_id, theme, voice, size)
+    db.flush()
+    return story
+
+
+def test_counters_follow_creates_and_deletes(add_user):
+    db = SessionLocal()
+    try:
+        add_user(db, 770)
+        assert get_user_stats(db, 770)["story_count"] == 0
+        forest = _create_story(db, 770, "숲", "alloy", 100)
+        _create_story(db, 770, "숲", "nova", 50)
+        sea = _create_story(db, 770, "바다", "alloy", 30)
+        db.commit()
+
+        stats = get_user_stats(db, 770)
+        assert stats["story_count"] == 3
+        assert stats["theme_counts"] == {"숲": 2, "바다": 1}
+        assert stats["voice_counts"] == {"alloy": 2, "nova": 1}
+        assert stats["content_bytes"] == 180
+        assert stats["last_created_at"] is not None
+
+        # 0 이 된 항목은 목록에서 빠짐
+        for story, size in ((forest, 100), (sea, 30)):
+            db.delete(story)
+            db.flush()
+            record_stories_deleted(db, 770, [(story.theme, story.voice, size)])
+        db.commit()
+        stats = get_user_stats(db, 770)
+        assert (stats["story_count"], stats["content_bytes"]) == (1, 50)
+        assert stats["theme_counts"] == {"숲": 1} and stats["voice_counts"] == {"nova": 1}
+
+        # 데이터가 바뀔 때마다 ETag 용 버전 증가
+        version = get_user_version(db, 770)
+        bump_version(db, 770)
+        reset_user_stats(db, 770)
+        db.commit()
+        stats = get_user_stats(db, 770)
+        assert (stats["story_count"], stats["theme_counts"], stats["last_created_at"]) == (0, {}, None)
+        assert get_user_version(db, 770) == version + 2
+    finally:
+        db.close()
+
+
+def test_migration_backfills_existing_stories(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    metadata = m0004_user_stats.metadata
+    with engine.begin() as conn:
+        for name in ("users", "story", "story_contents"):
+            metadata.tables[name].create(conn)
+        conn.execute(metadata.tables["users"].insert(), [{"id": 1}, {"id": 2}])
+        conn.execute(m0004_user_stats.contents.insert(), [{"hash": "a", "size": 10}, {"hash": "b", "size": 7}])
+        conn.execute(m0004_user_stats.story.insert(), [
+            {"user_id": 1, "theme": "숲", "voice": "alloy", "content_hash": "a", "created_at": datetime(2024, 1, 1)},
+            {"user_id": 1, "theme": "숲", "voice": "nova", "content_hash": "b", "created_at": datetime(2024, 2, 1)},
+            {"user_id": 2, "theme": "바다", "voice": "alloy", "content_hash": None, "created_at": datetime(2024, 3, 1)},
+        ])
+        m0004_user_stats.upgrade(conn)
+        # 다시 실행해도 이미 만든 행은 그대로
+        m0004_user_stats.upgrade(conn)
+        rows = {row.user_id: row for row in conn.execute(sa.select(m0004_user_stats.user_stats))}
+
+    assert set(rows) == {1, 2}
+    assert (rows[1].story_count, rows[1].content_bytes) == (2, 17)
+    assert rows[1].theme_counts == {"숲": 2} and rows[1].voice_counts == {"alloy": 1, "nova": 1}
+    assert rows[1].last_created_at == datetime(2024, 2, 1)
+    assert (rows[2].story_count, rows[2].content_bytes) == (1, 0)
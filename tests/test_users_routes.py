@@ -0,0 +1,53 @@
+# 사용자 라우트 테스트 (비동기 세션으로 가입/로그인/비밀번호 변경)
+import pytest
+
+from models_dir.database import SessionLocal, AsyncSessionLocal, to_async_url
+from models_dir.models import User, EmailOutbox
+from controllers import users_controller
+from controllers.rate_limit import RateLimiter, MemoryRateLimitBackend
+
+PASSWORD = "Rabbit-Moon-42"
+NEW_PASSWORD = "Turtle-Star-43"
+
+
+@pytest.fixture
+def client(make_client, fast_hasher, monkeypatch):
+    monkeypatch.setattr(users_controller, "rate_limiter", RateLimiter(backend=MemoryRateLimitBackend()))
+    return make_client(users_controller.router)
+
+
+def signup(client, username):
+    return client.post("/signup", json={"username": username, "nickname": f"{username}-nick", "email": f"{username}@example.com",
+                                        "password": PASSWORD, "password_confirm": PASSWORD})
+
+
+def test_async_url_uses_async_drivers():
+    assert to_async_url("postgresql://u:p@db:5432/fairy") == "postgresql+asyncpg://u:p@db:5432/fairy"
+    assert to_async_url("postgresql+psycopg2://u:p@db/fairy") == "postgresql+asyncpg://u:p@db/fairy"
+    assert to_async_url("sqlite:///test.db") == "sqlite+aiosqlite:///test.db"
+    assert AsyncSessionLocal.kw["bind"].dialect.is_async
+
+
+def test_signup_login_and_change_password(client):
+    assert signup(client, "asyncrabbit").status_code == 200
+    assert signup(client, "asyncrabbit").status_code == 400
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter_by(username="asyncrabbit").one()
+        assert user.hashed_password != PASSWORD
+        # 환영 메일은 가입과 같은 트랜잭션으로 대기열에 등록
+        assert db.query(EmailOutbox).filter_by(recipient="asyncrabbit@example.com", kind="welcome").count() == 1
+    finally:
+        db.close()
+
+    response = client.post("/login", json={"username": "asyncrabbit", "password": PASSWORD})
+    assert response.status_code == 200 and response.json()["user_id"] == user.id
+    assert client.post("/login", json={"username": "asyncrabbit", "password": "wrong"}).status_code == 401
+    assert client.post("/login", json={"username": "nobody", "password": PASSWORD}).status_code == 404
+
+    response = client.put("/change_pw", json={"username": "asyncrabbit", "current_password": PASSWORD,
+                                              "new_password": NEW_PASSWORD, "new_password_confirm": NEW_PASSWORD})
+    assert response.status_code == 200
+    assert client.post("/login", json={"username": "asyncrabbit", "password": PASSWORD}).status_code == 401
+    assert client.post("/login", json={"username": "asyncrabbit", "password": NEW_PASSWORD}).status_code == 200